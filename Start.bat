@@ -8,8 +8,8 @@ echo  AVVIO SIMULATORE IN CORSO...
 echo ------------------------------------------------
 echo.
 
-:: Lancia l'app usando il comando python
-python -m streamlit run app.py
+:: Prepara le cache (banche compilate, sfondi, figure) e lancia l'app nello stesso processo
+python warmup.py
 
 :: Se c'è un errore, non chiudere subito la finestra
 if %errorlevel% neq 0 pause
\ No newline at end of file
@@ -1,30 +1,39 @@
 # FILE: app.py
-# VERSION: v119.0 (UX: Instant Start on Topic Selection)
-# DATE: 2026-01-12
+# VERSION: v127.0 (Answer Score Rule)
+# DATE: 2026-10-18
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import time
 import datetime
 import random
 import urllib.parse
-from PIL import Image
+from streamlit.errors import StreamlitAPIException
 
 # Import moduli personalizzati
 import database as db_engine
 import logic as brain
 import ui 
+import assets
+import metrics
 
 # --- CONFIGURAZIONE PAGINA ---
 st.set_page_config(page_title="Patente Nautica", page_icon="⚓", layout="wide", initial_sidebar_state="expanded")
 
+# --- METRICHE (solo con PATENTE_METRICS=1) ---
+run_started = metrics.start_run()
+metrics_endpoint = metrics.serve()  # Endpoint locale avviato una volta per processo
+
 # --- PERCORSI FILE ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FILE_QUIZ_BASE_P = os.path.join(BASE_DIR, "Quiz_Patente_Base_Finale_OK.parquet")
 FILE_QUIZ_BASE_X = os.path.join(BASE_DIR, "Quiz_Patente_Base_Finale_OK.xlsx")
 FILE_QUIZ_VELA_P = os.path.join(BASE_DIR, "Quiz_Patente_Vela_Finale_OK.parquet")
 FILE_QUIZ_VELA_X = os.path.join(BASE_DIR, "Quiz_Patente_Vela_Finale_OK.xlsx")
+FILE_QUIZ_CARTEGGIO_P = os.path.join(BASE_DIR, "Quiz_Carteggio_Finale_OK.parquet")
+FILE_QUIZ_CARTEGGIO_X = os.path.join(BASE_DIR, "Quiz_Carteggio_Finale_OK.xlsx")
 FILE_RACCORDO_P = os.path.join(BASE_DIR, "Raccordoimmagini.parquet")
 FILE_RACCORDO_X = os.path.join(BASE_DIR, "Raccordoimmagini.xlsx")
 CARTELLA_IMMAGINI = os.path.join(BASE_DIR, "Immagini_Quiz")
@@ -43,23 +52,21 @@ ui.load_css()
 
 # --- GESTIONE STATO ---
 brain.initialize_app_state()
+# In un rerun completo la pagina si ridisegna comunque: la richiesta delle callback della sidebar è già soddisfatta
+st.session_state.pop('refresh_app', None)
 
 # --- LOGICA CARICAMENTO DATI ---
 if hasattr(brain, 'smart_load_data'):
+    def bank_sources(mode):
+        if "Vela" in mode: return FILE_QUIZ_VELA_P, FILE_QUIZ_VELA_X
+        if "Carteggio" in mode: return FILE_QUIZ_CARTEGGIO_P, FILE_QUIZ_CARTEGGIO_X
+        return FILE_QUIZ_BASE_P, FILE_QUIZ_BASE_X
+
     def load_data(mode):
-        if "Vela" in mode: return brain.smart_load_data(FILE_QUIZ_VELA_P, FILE_QUIZ_VELA_X)
-        return brain.smart_load_data(FILE_QUIZ_BASE_P, FILE_QUIZ_BASE_X)
+        return brain.smart_load_data(*bank_sources(mode))
     
     def load_raccordo_map():
-        df = brain.smart_load_data(FILE_RACCORDO_P, FILE_RACCORDO_X)
-        if df.empty: return {}
-        try:
-            col_id = 'ID Progressivo' if 'ID Progressivo' in df.columns else ('Progressivo' if 'Progressivo' in df.columns else None)
-            col_img = 'Immagine' if 'Immagine' in df.columns else None
-            if col_id and col_img:
-                return dict(zip(df[col_id].astype(str).str.replace(r'\.0$', '', regex=True).str.strip(), df[col_img].astype(str).str.strip()))
-        except: pass
-        return {}
+        return brain.load_raccordo_map(FILE_RACCORDO_P, FILE_RACCORDO_X)
 else:
     def load_data(mode):
         path = FILE_QUIZ_VELA_X if "Vela" in mode else FILE_QUIZ_BASE_X
@@ -67,18 +74,31 @@ else:
         return pd.DataFrame()
     def load_raccordo_map(): return {}
 
+def topic_maps():
+    """ID -> Argomento per ogni materia (una volta per processo): base dei contatori di sessione."""
+    return {mode: brain.load_topic_map(*bank_sources(mode)) for mode in ("Quiz Base", "Quiz Vela")}
+
+# Banche in cui cerca la sidebar (il Carteggio si consulta soltanto: non ha un allenamento a quiz)
+SEARCH_BANKS = ("Quiz Base", "Quiz Vela", "Carteggio")
+SEARCH_RESULTS = 8
+
+def search_indexes():
+    """Indice di ricerca di ogni banca consultabile (costruito una volta per processo)."""
+    return {mode: brain.load_search_index(*bank_sources(mode)) for mode in SEARCH_BANKS}
+
+def session_bank():
+    """Banca condivisa della materia corrente: le sessioni ne tengono solo le posizioni di riga."""
+    return brain.load_bank(*bank_sources(st.session_state.quiz_mode))
+
+def get_counters():
+    """Contatori della sessione: costruiti una volta dalla history, poi aggiornati in answer()."""
+    if st.session_state.get('counters') is None:
+        st.session_state.counters = brain.build_session_counters(st.session_state.history, topic_maps())
+    return st.session_state.counters
+
 def get_image_path_for_question(question_id):
-    if not question_id: return None
-    raccordo_map = load_raccordo_map()
-    clean_id = str(question_id).replace('.0','').strip()
-    img_name = raccordo_map.get(clean_id)
-    if not img_name: return None 
-    target_path = os.path.join(CARTELLA_IMMAGINI, img_name)
-    if os.path.exists(target_path): return target_path
-    name_no_ext = os.path.splitext(img_name)[0].lower()
-    for f in os.listdir(CARTELLA_IMMAGINI):
-        if os.path.splitext(f)[0].lower() == name_no_ext: return os.path.join(CARTELLA_IMMAGINI, f)
-    return None
+    # Indice ID -> percorso costruito una volta (e ricostruito solo se cambia la cartella)
+    return assets.get_image_path(question_id, CARTELLA_IMMAGINI, load_raccordo_map)
 
 # --- FUNZIONI QUIZ E RESET ---
 def get_user_rank(mastered_count):
@@ -90,6 +110,19 @@ def get_user_rank(mastered_count):
 
 def finalize_exam(): st.session_state.exam_finished = True
 
+# Timer esame: solo questo fragment si riesegue ogni secondo, non l'intero script
+EXAM_TIMER_TICK = 1  # Secondi tra due aggiornamenti del timer
+
+@st.fragment(run_every=EXAM_TIMER_TICK)
+@metrics.traced("fragment.exam_timer")
+def exam_timer():
+    if not st.session_state.exam_mode or st.session_state.exam_finished or st.session_state.end_timestamp <= 0: return
+    seconds_left = st.session_state.end_timestamp - time.time()
+    ui.draw_exam_timer(seconds_left)
+    if seconds_left <= 0:
+        # Tempo scaduto: chiude l'esame lato server e ridisegna una volta la pagina con l'esito
+        finalize_exam(); st.rerun(scope="app")
+
 def check_time_limit():
     if st.session_state.exam_mode and st.session_state.end_timestamp > 0:
         if time.time() > (st.session_state.end_timestamp + 2): finalize_exam(); return False
@@ -102,6 +135,21 @@ def start_filtered_training():
     selected = st.session_state.topic_filter
     # Avvia il reset del gioco passando il topic
     reset_game(exam=False, topic=selected)
+    st.session_state.refresh_app = True
+
+def sidebar_action(**kwargs):
+    """Callback dei pulsanti della sidebar: cambia sessione e ridisegna l'intera pagina, non solo la sidebar."""
+    reset_game(**kwargs)
+    st.session_state.refresh_app = True
+
+def open_search_result(mode, pos):
+    """Callback di un risultato della ricerca: allenamento sulla sua materia che parte da quella domanda."""
+    st.session_state.quiz_mode = mode; st.session_state.current_row = None
+    reset_game(exam=False)
+    rest = st.session_state.exam_questions
+    st.session_state.exam_questions = np.concatenate(([pos], rest[rest != pos])).astype(brain.SESSION_POS_DTYPE)
+    load_question()
+    st.session_state.refresh_app = True
 
 def reset_game(exam=False, review=False, stats=False, topic=None):
     st.session_state.exam_mode = exam
@@ -112,7 +160,7 @@ def reset_game(exam=False, review=False, stats=False, topic=None):
     st.session_state.exam_index = 0
     st.session_state.answered = False
     st.session_state.exam_finished = False
-    st.session_state.exam_questions = [] 
+    st.session_state.exam_questions = brain.empty_session()
     st.session_state.start_time = time.time()
     st.session_state.total_pending_errors = 0 
     
@@ -124,45 +172,48 @@ def reset_game(exam=False, review=False, stats=False, topic=None):
     else: 
         st.session_state.end_timestamp = 0
 
-    db = load_data(st.session_state.quiz_mode)
-    if db.empty: st.error("Database vuoto o non trovato."); return
+    bank = session_bank()
+    if bank.empty: st.error("Database vuoto o non trovato."); return
+    db = bank.frame
 
     if not stats:
         if review:
-            curr_ids = set(db['ID Progressivo'].astype(str))
-            total_errs = 0
-            for k, v in st.session_state.history.items():
-                if v['score'] == -1 and str(k).replace('.0','').strip() in curr_ids:
-                    total_errs += 1
-            st.session_state.total_pending_errors = total_errs
-
-            subset = brain.get_next_session_questions(db, st.session_state.history, mode="Ripasso")
-            if len(subset) == 0: 
+            st.session_state.total_pending_errors = get_counters()["errors"].get(st.session_state.quiz_mode, 0)
+
+            positions = brain.get_next_session_positions(db, st.session_state.history, mode="Ripasso")
+            if len(positions) == 0: 
                 st.success("🎉 Nessun errore da ripassare!"); 
                 st.session_state.review_mode = False; 
                 return
-            st.session_state.exam_questions = subset.to_dict('records'); load_question()
+            st.session_state.exam_questions = positions; load_question()
         
         elif exam:
             if "Vela" in st.session_state.quiz_mode: 
-                st.session_state.exam_questions = db.sample(min(5, len(db))).to_dict('records')
+                st.session_state.exam_questions = brain.get_vela_exam_positions(len(bank))
             else: 
-                st.session_state.exam_questions = brain.get_balanced_exam_questions(db).to_dict('records')
+                # Indice per argomento costruito una volta per banca: solo campionamento di posizioni
+                st.session_state.exam_questions = brain.get_balanced_exam_positions(brain.load_exam_index(*bank_sources(st.session_state.quiz_mode)))
             load_question()
         else:
             # ALLENAMENTO CON FILTRO
-            if topic and topic != "Tutti gli argomenti" and "Argomento" in db.columns:
-                db = db[db['Argomento'] == topic]
-                if db.empty:
+            candidates = None
+            if topic and topic != "Tutti gli argomenti" and "Argomento" in bank.columns:
+                candidates = np.flatnonzero(bank.topics == topic)
+                if candidates.size == 0:
                     st.warning(f"Nessuna domanda trovata per l'argomento: {topic}")
                     return
+                db = db.iloc[candidates]
 
-            subset = brain.get_next_session_questions(db, st.session_state.history, mode="Allenamento")
-            st.session_state.exam_questions = subset.to_dict('records'); load_question()
+            positions = brain.get_next_session_positions(db, st.session_state.history, mode="Allenamento")
+            # Posizioni nel sottoinsieme filtrato -> posizioni nella banca
+            if candidates is not None: positions = candidates[positions].astype(positions.dtype)
+            st.session_state.exam_questions = positions; load_question()
 
 def load_question():
-    if st.session_state.exam_questions and st.session_state.exam_index < len(st.session_state.exam_questions):
-        st.session_state.current_row = st.session_state.exam_questions[st.session_state.exam_index]
+    order = st.session_state.exam_questions
+    if st.session_state.exam_index < len(order):
+        # Solo la domanda corrente diventa un dict; la sessione tiene posizioni nella banca
+        st.session_state.current_row = session_bank().record(int(order[st.session_state.exam_index]))
         prepare_options()
     else: finalize_exam()
 
@@ -189,9 +240,12 @@ def answer(is_correct, selected_idx):
         st.session_state.selected_option_index = selected_idx
         
         id_dom = str(st.session_state.current_row.get('ID Progressivo')).strip()
-        item_data = st.session_state.history.get(id_dom, {'score': 0, 'date': ''})
-        new_score = item_data['score'] + 1 if (is_correct and item_data['score'] > 0) else (1 if is_correct else -1)
+        previous = st.session_state.history.get(id_dom)
+        old_score = None if previous is None else previous['score']
+        new_score = brain.next_score(old_score, is_correct)
         st.session_state.history[id_dom] = {'score': new_score, 'date': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        st.session_state.history_version += 1
+        brain.update_session_counters(get_counters(), topic_maps(), id_dom, old_score, new_score)
         db_engine.upsert_answer(st.session_state.current_user, id_dom, new_score)
         
         if is_correct: st.session_state.score_ok += 1
@@ -199,10 +253,10 @@ def answer(is_correct, selected_idx):
 
 def skip_current_question():
     if not check_time_limit(): return
-    remaining = len(st.session_state.exam_questions) - st.session_state.exam_index
-    if remaining <= 1: st.warning("⚠️ È l'ultima!"); return
-    current_q = st.session_state.exam_questions.pop(st.session_state.exam_index)
-    st.session_state.exam_questions.append(current_q); st.session_state.answered = False; st.toast("Saltata!"); load_question()
+    order, i = st.session_state.exam_questions, st.session_state.exam_index
+    if len(order) - i <= 1: st.warning("⚠️ È l'ultima!"); return
+    order[i:] = np.roll(order[i:], -1)  # La domanda saltata va in fondo
+    st.session_state.answered = False; st.toast("Saltata!"); load_question()
 
 def next_question():
     if not check_time_limit(): return
@@ -212,7 +266,13 @@ def next_question():
     else: finalize_exam()
 
 # --- SIDEBAR (LOGIN & MENU) ---
-with st.sidebar:
+# Fragment: le interazioni che riguardano solo la sidebar (nome, segnalazioni) non rieseguono la pagina.
+# Le azioni che cambiano la sessione chiedono il rerun completo (st.rerun() o refresh_app nelle callback).
+@st.fragment
+@metrics.traced("fragment.sidebar")
+def sidebar():
+    if st.session_state.pop('refresh_app', False): st.rerun()
+
     st.title("⚓ Patente Nautica")
     
     if st.session_state.current_user == "Comandante":
@@ -235,7 +295,10 @@ with st.sidebar:
                 st.session_state.current_user = nome_clean
                 st.toast(f"Bentornato, {nome_clean.title()}!")
                 raw_hist = db_engine.fetch_user_history(nome_clean)
-                st.session_state.history = {str(k).replace('.0','').strip(): v for k, v in raw_hist.items()}
+                # Storico compatto (array allineati al registro delle domande), vista compatibile con il dict
+                st.session_state.history = brain.compact_history({str(k).replace('.0','').strip(): v for k, v in raw_hist.items()})
+                st.session_state.history_version += 1
+                st.session_state.counters = None
                 
                 # 2. AVVIO DIRETTO SIMULAZIONE ESAME BASE
                 st.session_state.quiz_mode = "Quiz Base"
@@ -250,23 +313,31 @@ with st.sidebar:
     else:
         st.success(f"👤 **{st.session_state.current_user.title()}**")
         if st.button("🚪 ESCI (Cambia Utente)", use_container_width=True):
+            # Scrive subito le risposte ancora in coda prima di cambiare utente
+            db_engine.flush_answers()
             st.session_state.current_user = "Comandante"
-            st.session_state.history = {} 
+            st.session_state.history = brain.compact_history({})
+            st.session_state.history_version += 1
+            st.session_state.counters = None
             st.rerun()
 
     if st.session_state.current_user != "Comandante":
-        mastered = len([v for v in st.session_state.history.values() if v['score'] > 0])
+        # Contatori incrementali: costo indipendente dalla dimensione della history
+        counters = get_counters()
+        mastered = counters["mastered"]
         rank_n, rank_t = get_user_rank(mastered)
         ui.draw_rank_box(rank_n, mastered, rank_t)
         st.progress(min(mastered / rank_t, 1.0))
         
         st.write("---")
         st.markdown("**📚 Materia:**")
-        mode = st.radio("Seleziona:", ["Quiz Base", "Quiz Vela"], label_visibility="collapsed")
+        subjects = ["Quiz Base", "Quiz Vela"]
+        # Allineato alla materia corrente anche quando la cambia un risultato della ricerca
+        mode = st.radio("Seleziona:", subjects, index=subjects.index(st.session_state.quiz_mode), label_visibility="collapsed")
         
         if mode != st.session_state.quiz_mode:
             st.session_state.quiz_mode = mode; st.session_state.current_row = None
-            st.session_state.exam_questions = []; st.session_state.exam_mode = False; st.session_state.stats_mode = False; st.rerun()
+            st.session_state.exam_questions = brain.empty_session(); st.session_state.exam_mode = False; st.session_state.stats_mode = False; st.rerun()
 
         st.write("---")
         
@@ -292,18 +363,13 @@ with st.sidebar:
                     on_change=start_filtered_training 
                 )
         
-        st.button("🎓 SIMULAZIONE ESAME", type="primary", use_container_width=True, on_click=reset_game, kwargs={'exam': True})
+        st.button("🎓 SIMULAZIONE ESAME", type="primary", use_container_width=True, on_click=sidebar_action, kwargs={'exam': True})
         
         # Il pulsante rimane per chi vuole cliccare, ma il selectbox già avvia tutto.
-        st.button("♾️ ALLENAMENTO SMART", use_container_width=True, on_click=reset_game, kwargs={'exam': False, 'topic': selected_topic})
+        st.button("♾️ ALLENAMENTO SMART", use_container_width=True, on_click=sidebar_action, kwargs={'exam': False, 'topic': selected_topic})
         
-        db = load_data(st.session_state.quiz_mode)
-        if not db.empty:
-            curr_ids = set(db['ID Progressivo'].astype(str))
-            errs_count = 0
-            for k, v in st.session_state.history.items():
-                if v['score'] == -1 and str(k).replace('.0','').strip() in curr_ids: 
-                    errs_count += 1
+        if topic_maps()[st.session_state.quiz_mode]:
+            errs_count = counters["errors"][st.session_state.quiz_mode]
             
             if errs_count > 0: 
                 st.warning(f"⚠️ **{errs_count} Errori in memoria**")
@@ -313,7 +379,24 @@ with st.sidebar:
             else:
                 st.success("✅ Nessun errore in sospeso")
         
-        st.button("📊 STATISTICHE", use_container_width=True, on_click=reset_game, kwargs={'stats': True})
+        st.button("📊 STATISTICHE", use_container_width=True, on_click=sidebar_action, kwargs={'stats': True})
+
+        # --- RICERCA DOMANDE (non durante l'esame) ---
+        if not st.session_state.exam_mode:
+            st.write("---")
+            query = st.text_input("🔎 Cerca domanda:", key="search_query", placeholder="es. ancora, fanale, vento")
+            if query.strip():
+                results = brain.search_banks(search_indexes(), query, SEARCH_RESULTS)
+                if not results: st.caption("Nessuna domanda trovata.")
+                for bank_mode, pos, _ in results:
+                    row = brain.load_bank(*bank_sources(bank_mode)).record(pos)
+                    if bank_mode == "Carteggio":
+                        ui.draw_carteggio_result(row)
+                    else:
+                        bank_icon = '⛵' if "Vela" in bank_mode else '🛥️'
+                        st.button(f"{bank_icon} {ui.search_label(row.get('ID Progressivo'), row.get('Domanda', ''))}",
+                                  key=f"search_{bank_mode}_{pos}", use_container_width=True,
+                                  on_click=open_search_result, args=(bank_mode, pos))
     
     st.write("---")
     with st.expander("ℹ️ Info & Regole d'uso"):
@@ -342,8 +425,13 @@ with st.sidebar:
                 else:
                     st.warning("Scrivi un messaggio.")
 
+    if metrics.ENABLED and st.query_params.get("admin") == "metriche":
+        ui.draw_metrics_panel(metrics.snapshot(), metrics_endpoint)
+
     st.markdown("""<div class='credits-box'><b>Developed by Vincenzo Autolitano</b><br>v119.0 • Powered by Gemini AI</div>""", unsafe_allow_html=True)
 
+with st.sidebar: sidebar()
+
 
 # --- GATEKEEPER ---
 if st.session_state.current_user == "Comandante":
@@ -359,31 +447,36 @@ if st.session_state.current_user == "Comandante":
         </div>
     </div>
     """, unsafe_allow_html=True)
+    metrics.end_run(run_started)
     st.stop()
 
 # --- APP PRINCIPALE ---
 icon = {'Vela': '⛵', 'Base': '🛥️'}.get(st.session_state.quiz_mode, '⚓')
 
-if st.session_state.stats_mode:
+# Pagina statistiche: fragment a sé (il ritorno ai quiz ridisegna l'intera pagina)
+@st.fragment
+@metrics.traced("fragment.stats_page")
+def stats_page():
     full_db = load_data(st.session_state.quiz_mode)
-    stats_df = brain.calculate_topic_stats(full_db, st.session_state.history)
-    ui.draw_stats_dashboard_advanced(stats_df)
+    # Ricalcolate solo dopo una nuova risposta (chiave: utente, materia, token e versione della history)
+    stats_key = brain.stats_cache_key(st.session_state)
+    stats_df = brain.calculate_topic_stats(full_db, st.session_state.history, cache_key=stats_key)
+    voce_df = brain.calculate_subtopic_stats(full_db, st.session_state.history, cache_key=stats_key)
+    ui.draw_stats_dashboard_advanced(stats_df, voce_df)
     if st.button("⬅️ Torna ai Quiz", type="primary"): st.session_state.stats_mode = False; st.rerun()
 
-else:
-    # HEADER (TITOLO + TIMER)
-    if st.session_state.exam_mode:
-        c_head, c_time = st.columns([3, 1])
-        with c_head: 
-            st.markdown(f"<h3 style='margin-top:0; margin-bottom:5px;'>🎓 {st.session_state.quiz_mode} - SIMULAZIONE ESAME</h3>", unsafe_allow_html=True)
-        with c_time:
-            if st.session_state.end_timestamp > 0 and not st.session_state.exam_finished:
-                ui.display_exam_timer(st.session_state.end_timestamp)
-                if time.time() > (st.session_state.end_timestamp + 2): finalize_exam(); st.rerun()
-    else:
-        t_suffix = "Ripasso" if st.session_state.review_mode else "Allenamento"
-        st.markdown(f"## {icon} {st.session_state.quiz_mode} - *{t_suffix}*")
-    
+def rerun_panel():
+    """Ridisegna il solo pannello domanda; se siamo in un rerun completo, ridisegna la pagina."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+# Status bar + domanda: un click su una risposta riesegue solo questo fragment,
+# non la sidebar (login, lista utenti, contatore errori) né l'header
+@st.fragment
+@metrics.traced("fragment.quiz_panel")
+def quiz_panel():
     # METRICHE E STATUS BAR
     if not st.session_state.exam_finished:
         done = st.session_state.score_ok + st.session_state.score_ko
@@ -423,7 +516,8 @@ else:
             else: 
                 st.markdown(f"<div class='exam-fail'><h1>🚫 NON SUPERATO</h1><p>Errori commessi: {st.session_state.score_ko} (Max consentiti: {limit})</p></div>", unsafe_allow_html=True)
         else: st.markdown("<div class='review-end'><h1>✅ Fine Sessione</h1></div>", unsafe_allow_html=True)
-        st.button("🔄 NUOVA SESSIONE", type="primary", on_click=reset_game, kwargs={'exam': st.session_state.exam_mode})
+        if st.button("🔄 NUOVA SESSIONE", type="primary"):
+            reset_game(exam=st.session_state.exam_mode); st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
 
     # DOMANDA E RISPOSTE
@@ -431,8 +525,15 @@ else:
         row = st.session_state.current_row
         c1, c2 = st.columns([1, 2])
         with c1:
+            fig_width = assets.get_figure_width()
             path = get_image_path_for_question(row.get('ID Progressivo'))
-            if path: st.image(Image.open(path))
+            if path:
+                with metrics.span("app.st_image"): st.image(assets.get_figure_bytes(path, fig_width), output_format="PNG")
+            # Prepara già la figura della prossima domanda
+            next_idx = st.session_state.exam_index + 1
+            if next_idx < len(st.session_state.exam_questions):
+                next_id = session_bank().ids[st.session_state.exam_questions[next_idx]]
+                assets.prefetch_figure(get_image_path_for_question(next_id), fig_width)
         with c2:
             ui.draw_question_card(row.get('ID Progressivo'), row.get('Argomento'), row.get('Voce', ''), row.get('Domanda'))
             
@@ -457,7 +558,7 @@ else:
                 
                 st.markdown("<br>", unsafe_allow_html=True)
                 if st.button("PROSSIMA DOMANDA ➡", type="primary", use_container_width=True): 
-                    next_question(); st.rerun()
+                    next_question(); rerun_panel()
 
             else:
                 # MOSTRA OPZIONI
@@ -465,17 +566,38 @@ else:
                     btn_label = opt['txt']
                     if "Vela" in st.session_state.quiz_mode: btn_label = f"⚪ {opt['txt']}"
                     if st.button(btn_label, key=f"btn_{i}", use_container_width=True):
-                        answer(opt['ok'], i); st.rerun()
+                        answer(opt['ok'], i); rerun_panel()
                 
                 st.markdown("<br>", unsafe_allow_html=True)
                 c_skip, c_idk = st.columns(2)
                 with c_skip:
                     if st.session_state.exam_mode:
-                        if st.button("⏭️ SALTA", use_container_width=True): skip_current_question(); st.rerun()
+                        if st.button("⏭️ SALTA", use_container_width=True): skip_current_question(); rerun_panel()
                 with c_idk:
-                    if st.button("🚩 Non la so!", use_container_width=True): answer(False, -1); st.rerun()
+                    if st.button("🚩 Non la so!", use_container_width=True): answer(False, -1); rerun_panel()
     
     if st.session_state.current_row is None: 
         if not st.session_state.exam_finished and st.session_state.current_user != "Comandante":
              # Non dovrebbe mai arrivare qui se l'autostart funziona, ma per sicurezza:
-             st.info("👈 Seleziona un argomento per iniziare.")
\ No newline at end of file
+             st.info("👈 Seleziona un argomento per iniziare.")
+
+
+if st.session_state.stats_mode:
+    stats_page()
+
+else:
+    # HEADER (TITOLO + TIMER)
+    if st.session_state.exam_mode:
+        c_head, c_time = st.columns([3, 1])
+        with c_head: 
+            st.markdown(f"<h3 style='margin-top:0; margin-bottom:5px;'>🎓 {st.session_state.quiz_mode} - SIMULAZIONE ESAME</h3>", unsafe_allow_html=True)
+        with c_time:
+            if st.session_state.end_timestamp > 0 and not st.session_state.exam_finished:
+                exam_timer()
+    else:
+        t_suffix = "Ripasso" if st.session_state.review_mode else "Allenamento"
+        st.markdown(f"## {icon} {st.session_state.quiz_mode} - *{t_suffix}*")
+    
+    quiz_panel()
+
+metrics.end_run(run_started)
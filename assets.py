@@ -0,0 +1,250 @@
+# FILE: assets.py
+# VERSION: v1.4 (Lazy Imports)
+# DATE: 2026-10-18
+
+import os
+import io
+import base64
+import re
+import types
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+import metrics
+
+# --- CONFIGURAZIONE COSTANTI ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Cartella servita da Streamlit (server.enableStaticServing) all'URL "app/static/..."
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+STATIC_URL = "app/static"
+
+# Gli sfondi sono coperti da card e sidebar: 1280px bastano anche su tablet/desktop
+BG_MAX_WIDTH = 1280
+BG_QUALITY = {"webp": 70, "jpg": 75}
+BG_MIME = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+# Figure dei quiz: larghezze di destinazione (px reali, già pensate per schermi ad alta densità)
+FIGURE_WIDTHS = {"tablet": 640, "desktop": 960}
+FIGURE_CACHE_MAX_BYTES = 32 * 1024 * 1024   # Budget della cache LRU in memoria
+
+
+# --- 1. GENERAZIONE VARIANTI (UNA VOLTA ALL'AVVIO) ---
+def _file_hash(path, extra=""):
+    """Hash breve del contenuto del file (+ parametri di codifica) per URL immutabili."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(extra.encode())
+    return h.hexdigest()[:12]
+
+def build_background_variants(src_path, max_width=BG_MAX_WIDTH):
+    """
+    Crea le varianti ridimensionate e ricompresse (WebP + JPEG) di uno sfondo.
+    Il nome del file contiene l'hash del sorgente: se esiste già non viene rigenerato.
+    Restituisce {'webp': percorso, 'jpg': percorso} oppure None se il sorgente manca.
+    """
+    if not os.path.exists(src_path): return None
+
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    digest = _file_hash(src_path, f"{max_width}-{BG_QUALITY}")
+    targets = {fmt: os.path.join(STATIC_DIR, f"{stem}.{digest}.{fmt}") for fmt in BG_QUALITY}
+
+    if all(os.path.exists(p) for p in targets.values()):
+        return targets
+
+    try:
+        from PIL import Image  # Import al primo uso: serve solo se mancano le varianti
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        with Image.open(src_path) as im:
+            im = im.convert("RGB")
+            if im.width > max_width:
+                ratio = max_width / im.width
+                im = im.resize((max_width, int(im.height * ratio)), Image.LANCZOS)
+
+            for fmt, path in targets.items():
+                buf = io.BytesIO()
+                if fmt == "webp":
+                    im.save(buf, "WEBP", quality=BG_QUALITY[fmt], method=6)
+                else:
+                    im.save(buf, "JPEG", quality=BG_QUALITY[fmt], optimize=True, progressive=True)
+                # Scrittura atomica: un altro processo non vede mai un file a metà
+                tmp = f"{path}.tmp{os.getpid()}"
+                with open(tmp, 'wb') as f: f.write(buf.getvalue())
+                os.replace(tmp, path)
+        return targets
+    except Exception as e:
+        print(f"⚠️ Errore generazione sfondo {src_path}: {e}")
+        return None
+
+
+# --- 2. URL DEGLI SFONDI ---
+def _static_serving_enabled():
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+def _variant_urls(variants):
+    """URL statici (se il server li serve) o, in ripiego, data-URI delle varianti compresse."""
+    if _static_serving_enabled():
+        return {fmt: f"{STATIC_URL}/{os.path.basename(p)}" for fmt, p in variants.items()}
+    urls = {}
+    for fmt, p in variants.items():
+        with open(p, 'rb') as f:
+            urls[fmt] = f"data:{BG_MIME[fmt]};base64,{base64.b64encode(f.read()).decode()}"
+    return urls
+
+def _background_rule(variants):
+    """Dichiarazione CSS con JPEG di ripiego e image-set() per i browser che supportano WebP."""
+    urls = _variant_urls(variants)
+    return (f"background-image: url('{urls['jpg']}') !important; "
+            f"background-image: image-set(url('{urls['webp']}') type('image/webp'), "
+            f"url('{urls['jpg']}') type('image/jpeg')) !important;")
+
+
+# --- 3. CSS SFONDI (COSTRUITO UNA VOLTA PER PROCESSO) ---
+@st.cache_resource(show_spinner=False)
+def get_background_css(main_bg, sidebar_bg):
+    """
+    Restituisce il blocco <style> degli sfondi.
+    Le immagini vengono servite come file statici: il CSS pesa poche centinaia di byte
+    invece dei ~5.7 MB di base64 reinviati a ogni rerun.
+    """
+    css = ""
+    main_variants = build_background_variants(main_bg)
+    if main_variants:
+        css += f".stApp {{ {_background_rule(main_variants)} background-size: cover !important; background-attachment: fixed !important; }}"
+
+    side_variants = build_background_variants(sidebar_bg)
+    if side_variants:
+        css += (f' section[data-testid="stSidebar"] {{ {_background_rule(side_variants)} background-size: cover !important; }}'
+                ' section[data-testid="stSidebar"] > div:first-child { background-color: rgba(255, 255, 255, 0.95); }')
+
+    return f"<style>{css}</style>" if css else ""
+
+
+# --- 4. INDICE IMMAGINI DEI QUIZ ---
+def _clean_id(question_id):
+    return re.sub(r'\.0$', '', str(question_id).strip())
+
+# Indici già costruiti: cartella -> (mtime, indice). Un dict semplice: il lookup è sul
+# percorso caldo di ogni render e l'hashing degli argomenti di st.cache_* costerebbe di più.
+_image_indexes = {}
+_image_index_lock = threading.Lock()
+
+def _build_image_index(images_dir, raccordo_loader):
+    """
+    Costruisce la mappa ID domanda -> percorso assoluto delle immagini.
+    Il confronto con i file è indipendente da maiuscole ed estensione.
+    """
+    raccordo = raccordo_loader() or {}
+    by_name, by_stem = {}, {}
+    try:
+        for f in os.listdir(images_dir):
+            path = os.path.join(images_dir, f)
+            by_name[f.lower()] = path
+            by_stem.setdefault(os.path.splitext(f)[0].lower(), path)
+    except FileNotFoundError:
+        pass
+
+    index, missing = {}, []
+    for q_id, img_name in raccordo.items():
+        name = str(img_name).strip().lower()
+        if not name or name == "nan": continue
+        path = by_name.get(name) or by_stem.get(os.path.splitext(name)[0])
+        if path: index[_clean_id(q_id)] = path
+        else: missing.append(f"{q_id} -> {img_name}")
+
+    # Segnalate una volta sola, qui, invece di cercarle a ogni render
+    if missing:
+        print(f"⚠️ {len(missing)} immagini mancanti in {images_dir}: {', '.join(missing[:10])}{' ...' if len(missing) > 10 else ''}")
+    return types.MappingProxyType(index)
+
+def get_image_index(images_dir, raccordo_loader):
+    """Indice immutabile delle immagini, ricostruito solo se cambia la cartella (mtime)."""
+    try:
+        dir_mtime = os.stat(images_dir).st_mtime_ns
+    except FileNotFoundError:
+        dir_mtime = 0
+    cached = _image_indexes.get(images_dir)
+    if cached and cached[0] == dir_mtime: return cached[1]
+    with _image_index_lock:
+        cached = _image_indexes.get(images_dir)
+        if not cached or cached[0] != dir_mtime:
+            cached = (dir_mtime, _build_image_index(images_dir, raccordo_loader))
+            _image_indexes[images_dir] = cached
+    return cached[1]
+
+def get_image_path(question_id, images_dir, raccordo_loader):
+    if not question_id: return None
+    return get_image_index(images_dir, raccordo_loader).get(_clean_id(question_id))
+
+
+# --- 5. CACHE FIGURE DEI QUIZ (BYTE GIÀ RIDIMENSIONATI) ---
+# LRU per byte: (percorso, larghezza) -> PNG pronto da servire
+_figure_cache = OrderedDict()
+_figure_cache_bytes = 0
+_figure_lock = threading.Lock()
+_figure_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="figure-prefetch")
+
+def _encode_figure(path, width):
+    """Decodifica una volta il PNG originale, lo riduce a `width` (mai ingrandito) e lo ricodifica."""
+    from PIL import Image
+    with Image.open(path) as im:
+        im = im.convert("RGB")
+        if im.width > width:
+            im = im.resize((width, int(im.height * width / im.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.save(buf, "PNG", optimize=True)
+        return buf.getvalue()
+
+@metrics.traced("assets.get_figure_bytes")
+def get_figure_bytes(path, width=FIGURE_WIDTHS["desktop"]):
+    """
+    Byte PNG della figura alla larghezza richiesta, dalla cache se presenti.
+    Da passare a st.image(..., output_format="PNG") così Streamlit non la ridecodifica.
+    """
+    global _figure_cache_bytes
+    key = (path, width)
+    with _figure_lock:
+        data = _figure_cache.get(key)
+        if data is not None:
+            _figure_cache.move_to_end(key)
+            _figure_stats["hits"] += 1
+            return data
+        _figure_stats["misses"] += 1
+
+    data = _encode_figure(path, width)
+
+    with _figure_lock:
+        if key not in _figure_cache:
+            _figure_cache[key] = data
+            _figure_cache_bytes += len(data)
+            while _figure_cache_bytes > FIGURE_CACHE_MAX_BYTES and len(_figure_cache) > 1:
+                _, old = _figure_cache.popitem(last=False)
+                _figure_cache_bytes -= len(old)
+                _figure_stats["evictions"] += 1
+    return data
+
+def prefetch_figure(path, width=FIGURE_WIDTHS["desktop"]):
+    """Prepara in background la figura (es. della prossima domanda) mentre si mostra quella attuale."""
+    if not path or (path, width) in _figure_cache: return
+    _prefetch_pool.submit(get_figure_bytes, path, width)
+
+def get_figure_width():
+    """Larghezza di destinazione in base al dispositivo (User-Agent della sessione)."""
+    try:
+        agent = st.context.headers.get("User-Agent", "")
+    except Exception:
+        agent = ""
+    if any(k in agent for k in ("iPad", "Tablet", "Android", "Mobile")):
+        return FIGURE_WIDTHS["tablet"]
+    return FIGURE_WIDTHS["desktop"]
+
+def get_figure_cache_stats():
+    with _figure_lock:
+        return dict(_figure_stats, items=len(_figure_cache), bytes=_figure_cache_bytes)
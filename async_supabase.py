@@ -0,0 +1,154 @@
+# FILE: async_supabase.py
+# VERSION: v1.1 (Bounded Waits)
+# DATE: 2026-10-18
+#
+# Accesso asincrono a Supabase per il codice sincrono di Streamlit: un solo event loop per
+# processo in un thread di background, un client httpx con pool di connessioni keep-alive
+# (niente handshake TCP/TLS a ogni richiesta), un tetto alle richieste in volo e un timeout
+# per chiamata. PooledSupabase ha la stessa interfaccia del client sincrono usata da
+# database.py (table(...).select/eq/.../execute()), più submit() che avvia la richiesta
+# e restituisce subito un Future: più richieste indipendenti viaggiano insieme.
+
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+# --- CONFIGURAZIONE COSTANTI ---
+MAX_CONNECTIONS = 10      # Connessioni HTTP aperte al massimo verso Supabase
+MAX_KEEPALIVE = 10        # Connessioni inattive tenute aperte per il riuso
+KEEPALIVE_EXPIRY = 60.0   # Secondi di inattività prima di chiudere una connessione
+MAX_IN_FLIGHT = 8         # Richieste contemporanee; le altre aspettano il loro turno
+CALL_TIMEOUT = 15.0       # Secondi per chiamata, attesa del turno compresa
+CONNECT_TIMEOUT = 5.0     # Secondi per aprire una nuova connessione
+RESULT_MARGIN = 5.0       # Secondi oltre CALL_TIMEOUT prima che execute() smetta di attendere il loop
+
+
+# --- 1. EVENT LOOP IN BACKGROUND ---
+class EventLoopThread:
+    """Event loop asyncio in un thread daemon, a cui il codice sincrono passa coroutine."""
+
+    def __init__(self, name="supabase-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Pianifica la coroutine sul loop; restituisce un concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Esegue la coroutine e ne attende il risultato (mai dal thread del loop: si bloccherebbe)."""
+        if threading.current_thread() is self.thread:
+            coro.close()
+            raise RuntimeError("run() chiamato dal thread dell'event loop")
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+
+# --- 2. CLIENT CON POOL DI CONNESSIONI ---
+class _PooledQuery:
+    """Avvolge un request builder di postgrest-py: i filtri restano sincroni, l'esecuzione va sul loop."""
+    __slots__ = ("_pool", "_builder")
+
+    def __init__(self, pool, builder):
+        self._pool = pool
+        self._builder = builder
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr): return attr
+
+        def chain(*args, **kwargs):
+            return _PooledQuery(self._pool, attr(*args, **kwargs))
+        return chain
+
+    def execute(self):
+        """
+        Esegue la richiesta e ne attende la risposta (come il client sincrono). L'attesa ha un
+        limite anche se l'event loop è bloccato: oltre timeout + RESULT_MARGIN solleva TimeoutError.
+        """
+        future = self.submit()
+        try:
+            return future.result(self._pool.timeout + RESULT_MARGIN)
+        except FutureTimeout:
+            future.cancel()
+            raise TimeoutError(f"Nessuna risposta dal loop Supabase entro {self._pool.timeout + RESULT_MARGIN:.0f} s")
+
+    def submit(self):
+        """Avvia la richiesta senza attenderla: Future con la risposta (o l'eccezione)."""
+        return self._pool.submit(self._builder.execute())
+
+
+class PooledSupabase:
+    """
+    Client Supabase asincrono condiviso dal processo, usabile da codice sincrono.
+    Tutte le richieste passano da un unico httpx.AsyncClient (pool keep-alive) sull'event
+    loop di background; al massimo max_in_flight sono in volo, ognuna entro `timeout` secondi.
+    """
+
+    def __init__(self, url, key, max_connections=MAX_CONNECTIONS, max_keepalive=MAX_KEEPALIVE,
+                 keepalive_expiry=KEEPALIVE_EXPIRY, max_in_flight=MAX_IN_FLIGHT, timeout=CALL_TIMEOUT, runner=None):
+        self.timeout = timeout
+        self.runner = runner or EventLoopThread()
+        self.stats = {"calls": 0, "errors": 0, "timeouts": 0, "in_flight": 0, "max_in_flight": 0}
+        limits = {"max_connections": max_connections, "max_keepalive_connections": max_keepalive,
+                  "keepalive_expiry": keepalive_expiry}
+        # Client, pool e semaforo nascono nel loop che li userà
+        self._client, self._http, self._slots = self.runner.run(self._connect(url, key, limits, max_in_flight), timeout)
+
+    async def _connect(self, url, key, limits, max_in_flight):
+        import httpx
+        from supabase import AsyncClientOptions, acreate_client
+        http = httpx.AsyncClient(limits=httpx.Limits(**limits),
+                                 timeout=httpx.Timeout(self.timeout, connect=CONNECT_TIMEOUT))
+        # Solo chiave di servizio: nessuna sessione utente da salvare o rinnovare
+        options = AsyncClientOptions(httpx_client=http, auto_refresh_token=False, persist_session=False)
+        client = await acreate_client(url, key, options)
+        client.postgrest  # Creato qui (è pigro): table() può essere chiamato da più thread
+        return client, http, asyncio.Semaphore(max_in_flight)
+
+    async def _call(self, awaitable):
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            awaitable.close()  # Annullata (o scaduta) in attesa del turno: la richiesta non parte
+            raise
+        self.stats["in_flight"] += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+        try:
+            return await awaitable
+        finally:
+            self.stats["in_flight"] -= 1
+            self._slots.release()
+
+    async def _guarded(self, awaitable):
+        self.stats["calls"] += 1
+        try:
+            return await asyncio.wait_for(self._call(awaitable), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise TimeoutError(f"Richiesta Supabase oltre {self.timeout:.0f} s")
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+
+    def table(self, name):
+        return _PooledQuery(self, self._client.table(name))
+
+    def submit(self, awaitable):
+        """Esegue una coroutine del client sul loop con tetto e timeout; restituisce un Future."""
+        return self.runner.submit(self._guarded(awaitable))
+
+    def get_stats(self):
+        """Chiamate, errori, timeout e richieste in volo (attuali e massimo raggiunto)."""
+        return dict(self.stats)
+
+    def close(self):
+        self.runner.run(self._http.aclose(), self.timeout)
@@ -0,0 +1,279 @@
+# FILE: banks.py
+# VERSION: v1.5 (Zero-Copy Archive Load)
+# DATE: 2026-10-18
+#
+# Compila le banche dati (Base, Vela, Carteggio, Raccordo immagini) in un unico
+# archivio Arrow tipizzato, letto a runtime in memory-map senza alcuna pulizia.
+# L'archivio si compila solo da qui o da warmup.py, mai dall'app mentre serve richieste:
+# se a runtime manca o non corrisponde alle sorgenti, l'app legge Parquet/Excel.
+# Uso: python banks.py [--force]
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURAZIONE COSTANTI ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILED_PATH = os.path.join(BASE_DIR, "banks.arrow")
+COMPILER_VERSION = "1"  # Da incrementare se cambia il formato dell'archivio
+
+# Banca -> (sorgente Parquet, sorgente Excel di ripiego)
+SOURCES = {
+    "Base": ("Quiz_Patente_Base_Finale_OK.parquet", "Quiz_Patente_Base_Finale_OK.xlsx"),
+    "Vela": ("Quiz_Patente_Vela_Finale_OK.parquet", "Quiz_Patente_Vela_Finale_OK.xlsx"),
+    "Carteggio": ("Quiz_Carteggio_Finale_OK.parquet", "Quiz_Carteggio_Finale_OK.xlsx"),
+    "Raccordo": ("Raccordoimmagini.parquet", "Raccordoimmagini.xlsx"),
+}
+
+CATEGORY_COLUMNS = ["Argomento", "Voce"]
+ANSWER_INDEX = {"A": 0, "B": 1, "C": 2}
+TRUE_ANSWERS = {"A", "V", "VERO", "TRUE"}
+
+# La banca condivisa si protegge col Copy-on-Write (sempre attivo da pandas 3): nella 2.x lo si accende qui
+if int(pd.__version__.split(".")[0]) < 3: pd.set_option("mode.copy_on_write", True)
+
+
+# --- 1. LETTURA E PULIZIA DELLE SORGENTI ---
+def read_bank_file(file_path_parquet, file_path_excel):
+    """
+    Legge una banca provando prima il Parquet, poi Excel, e normalizza le colonne.
+    Restituisce None se nessun file esiste; solleva l'eccezione se l'Excel è illeggibile.
+    """
+    df = None
+
+    # Tentativo 1: Parquet (Veloce)
+    if os.path.exists(file_path_parquet):
+        try:
+            df = pd.read_parquet(file_path_parquet)
+        except Exception:
+            pass # Se fallisce, prova Excel
+
+    # Tentativo 2: Excel (Fallback)
+    if df is None and os.path.exists(file_path_excel):
+        df = pd.read_excel(file_path_excel)
+        # Pulizia specifica per Excel (che spesso ha NaN)
+        df = df.fillna("")
+        df = df.astype(str)
+        # Rimuove le stringhe 'nan' se presenti
+        df = df.replace(["nan", "NaN"], "")
+
+    if df is None:
+        return None
+
+    # --- PULIZIA FINALE COMUNE ---
+    # 1. Normalizza nomi colonne (toglie spazi extra)
+    df.columns = [str(c).strip() for c in df.columns]
+
+    # 2. Pulisce ID Progressivo (toglie .0 finale se esiste)
+    if 'ID Progressivo' in df.columns:
+        df['ID Progressivo'] = df['ID Progressivo'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
+
+    # 3. Assicura che la colonna Argomento esista
+    if 'Argomento' not in df.columns:
+        df['Argomento'] = 'Generale'
+
+    return df
+
+def source_paths(bank):
+    return tuple(os.path.join(BASE_DIR, f) for f in SOURCES[bank])
+
+def source_hash():
+    """Hash del contenuto di tutte le sorgenti: cambia solo se cambia un file."""
+    h = hashlib.sha256(COMPILER_VERSION.encode())
+    for bank in sorted(SOURCES):
+        for path in source_paths(bank):
+            if not os.path.exists(path): continue
+            h.update(os.path.basename(path).encode())
+            with open(path, 'rb') as f: h.update(f.read())
+    return h.hexdigest()
+
+
+# --- 2. COMPILAZIONE ---
+def _add_answer_keys(df):
+    """Colonne chiave precalcolate: indice della risposta esatta e, per il Vero/Falso, l'esito."""
+    if 'Risposta Esatta' not in df.columns: return df
+    key = df['Risposta Esatta'].astype(str).str.strip().str.upper()
+    df['Indice Esatta'] = key.map(ANSWER_INDEX).fillna(-1).astype("int8")
+    df['Vero'] = key.isin(TRUE_ANSWERS)
+    return df
+
+def compile_banks(force=False, path=COMPILED_PATH):
+    """
+    Scrive l'archivio compilato se manca o se le sorgenti sono cambiate.
+    Restituisce True se l'archivio è stato (ri)scritto.
+    """
+    import pyarrow as pa
+
+    digest = source_hash()
+    if not force and read_metadata(path).get("source_hash") == digest:
+        return False
+
+    frames, layout = [], {}
+    for bank in SOURCES:
+        df = read_bank_file(*source_paths(bank))
+        if df is None or df.empty: continue
+        layout[bank] = {"columns": list(df.columns), "sources": list(SOURCES[bank])}
+        df = _add_answer_keys(df)
+        df.insert(0, "Banca", bank)
+        frames.append(df)
+
+    all_df = pd.concat(frames, ignore_index=True)
+    # Le colonne ripetitive diventano categoriche, il testo resta stringa
+    for col in CATEGORY_COLUMNS + ["Banca"]:
+        all_df[col] = all_df[col].astype("category")
+    all_df['Indice Esatta'] = all_df['Indice Esatta'].fillna(-1).astype("int8")
+    all_df['Vero'] = all_df['Vero'].astype("boolean").fillna(False).astype(bool)
+
+    table = pa.Table.from_pandas(all_df, preserve_index=False)
+    meta = {"source_hash": digest, "version": COMPILER_VERSION, "banks": layout}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"banks": json.dumps(meta).encode()})
+
+    # Scrittura atomica: i processi in lettura vedono sempre un archivio completo
+    tmp = f"{path}.tmp{os.getpid()}-{threading.get_ident()}"
+    try:
+        with pa.OSFile(tmp, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+    return True
+
+
+# --- 3. LETTURA A RUNTIME ---
+def read_metadata(path=COMPILED_PATH):
+    """Metadati dell'archivio (hash sorgenti, layout delle banche); {} se manca o è illeggibile."""
+    if not os.path.exists(path): return {}
+    try:
+        import pyarrow as pa
+        with pa.memory_map(path) as source:
+            meta = pa.ipc.open_file(source).schema.metadata or {}
+        return json.loads(meta.get(b"banks", b"{}"))
+    except Exception:
+        return {}
+
+_store = {"loaded": False, "banks": {}}
+_store_lock = threading.Lock()
+
+def _load_store():
+    """
+    Legge l'archivio (una volta per processo) se corrisponde alle sorgenti. Non lo scrive mai:
+    se manca o è superato le banche vengono dalle sorgenti (load_compiled_bank restituisce None).
+    """
+    with _store_lock:
+        if _store["loaded"]: return _store["banks"]
+        _store["loaded"] = True
+        try:
+            meta = read_metadata()
+            if meta.get("source_hash") != source_hash():
+                print(f"⚠️ Archivio compilato {'superato' if meta else 'assente'} (python banks.py), uso le sorgenti")
+                return _store["banks"]
+            import pyarrow as pa
+            # I buffer della tabella puntano alla mappa del file: nessuna lettura né copia qui
+            with pa.memory_map(COMPILED_PATH) as source:
+                table = pa.ipc.open_file(source).read_all()
+            # compile_banks scrive le banche una dopo l'altra: ogni banca è un intervallo contiguo
+            banca = table.column("Banca").to_pandas().to_numpy()
+            for bank, info in meta.get("banks", {}).items():
+                rows = np.flatnonzero(banca == bank)
+                if rows.size == 0: continue
+                if rows[-1] - rows[0] + 1 != rows.size: raise ValueError(f"banca {bank} non contigua nell'archivio")
+                keep = info["columns"] + [c for c in ("Indice Esatta", "Vero") if c in table.column_names and "Risposta Esatta" in info["columns"]]
+                df = table.slice(rows[0], rows.size).select(keep).to_pandas(split_blocks=True)
+                for col in CATEGORY_COLUMNS:
+                    if col in df.columns: df[col] = df[col].cat.remove_unused_categories()
+                _store["banks"][tuple(info["sources"])] = df
+        except Exception as e:
+            print(f"⚠️ Archivio compilato non disponibile ({e}), uso le sorgenti")
+            _store["banks"] = {}
+        return _store["banks"]
+
+def load_compiled_bank(file_path_parquet, file_path_excel):
+    """DataFrame già pulito e tipizzato della banca con queste sorgenti, o None se non compilata."""
+    key = (os.path.basename(file_path_parquet), os.path.basename(file_path_excel))
+    df = _load_store().get(key)
+    return None if df is None else df.copy(deep=False)  # Copy-on-Write: la copia avviene solo se il chiamante scrive
+
+
+# --- 4. BANCA CONDIVISA IN SOLA LETTURA ---
+class QuestionBank:
+    """
+    Banca caricata una volta per processo e condivisa da tutte le sessioni.
+    Il DataFrame interno non viene mai restituito: `frame` è una vista (copia superficiale);
+    con il Copy-on-Write di pandas (acceso all'import di questo modulo) chi la modifica copia
+    solo ciò che tocca, mai la banca.
+    ID e Argomento sono precalcolati in array di sola lettura, con ricerca per ID in O(1).
+    """
+
+    __slots__ = ("_df", "ids", "topics", "_positions", "_fingerprint")
+
+    def __init__(self, df):
+        self._df = pd.DataFrame() if df is None else df
+        n = len(self._df)
+        if 'ID Progressivo' in self._df.columns: ids = self._df['ID Progressivo'].astype(str).to_numpy(dtype=object)
+        else: ids = np.full(n, "", dtype=object)
+        if 'Argomento' in self._df.columns: topics = self._df['Argomento'].astype(str).to_numpy(dtype=object)
+        else: topics = np.full(n, "Generale", dtype=object)
+        ids.flags.writeable = False
+        topics.flags.writeable = False
+        self.ids, self.topics = ids, topics
+        positions = {}
+        for pos, q_id in enumerate(ids.tolist()):
+            positions.setdefault(q_id, pos)  # ID duplicati: vale la prima riga
+        self._positions = positions
+        self._fingerprint = self.fingerprint()
+
+    def __len__(self):
+        return len(self._df)
+
+    @property
+    def empty(self):
+        return self._df.empty
+
+    @property
+    def columns(self):
+        return list(self._df.columns)
+
+    @property
+    def frame(self):
+        """Vista del DataFrame (nessuna copia dei dati)."""
+        return self._df.copy(deep=False)
+
+    # --- Ricerca per ID ---
+    def position(self, q_id):
+        """Riga della domanda con questo ID (-1 se non esiste)."""
+        return self._positions.get(str(q_id).strip(), -1)
+
+    def record(self, pos):
+        """Riga `pos` come nuovo dict (modificarlo non tocca la banca)."""
+        return self._df.iloc[[pos]].to_dict('records')[0]
+
+    def records(self, positions):
+        return self._df.iloc[np.asarray(positions, dtype=np.intp)].to_dict('records')
+
+    # --- Controllo di integrità ---
+    def fingerprint(self):
+        """Hash del contenuto (righe, colonne, valori)."""
+        if self._df.empty: return 0
+        return int(pd.util.hash_pandas_object(self._df, index=True).to_numpy().sum()) ^ hash(tuple(self._df.columns))
+
+    def verify(self):
+        """True se nessun chiamante ha modificato la banca dal caricamento."""
+        return self.fingerprint() == self._fingerprint
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compila le banche dati in un archivio Arrow tipizzato")
+    parser.add_argument("--force", action="store_true", help="ricompila anche se le sorgenti non sono cambiate")
+    args = parser.parse_args()
+    written = compile_banks(force=args.force)
+    meta = read_metadata()
+    print(("✅ Archivio compilato: " if written else "✔️ Archivio già aggiornato: ") + COMPILED_PATH)
+    for bank, info in meta.get("banks", {}).items():
+        print(f"   {bank}: {len(info['columns'])} colonne")
+    sys.exit(0)
@@ -0,0 +1,528 @@
+# FILE: benchmark.py
+# VERSION: v1.13 (Bank Benchmark Only)
+# DATE: 2026-10-18
+#
+# Micro-benchmark degli hot path dell'app, eseguibili senza avviare Streamlit.
+# Uso: python benchmark.py <nome>   (python benchmark.py --help per l'elenco)
+
+import os
+import sys
+import time
+import base64
+import random
+import argparse
+import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BG_MAIN = os.path.join(BASE_DIR, "background.jpg")
+BG_SIDE = os.path.join(BASE_DIR, "background2.jpg")
+
+
+# --- UTILITY ---
+def _timeit(fn, repeat):
+    """Esegue fn `repeat` volte e restituisce (ultimo risultato, ms medi per chiamata)."""
+    start = time.perf_counter()
+    for _ in range(repeat): out = fn()
+    return out, (time.perf_counter() - start) * 1000 / repeat
+
+def _fmt_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024: return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+# --- 1. SFONDI ---
+def _legacy_background_css(main_bg, sidebar_bg):
+    """Riproduce il vecchio ui.set_backgrounds: base64 degli originali a ogni rerun."""
+    css = ""
+    for path in (main_bg, sidebar_bg):
+        with open(path, 'rb') as f:
+            css += f"<style>.x {{ background-image: url(data:image/jpg;base64,{base64.b64encode(f.read()).decode()}) }}</style>"
+    return css
+
+def bench_backgrounds(repeat):
+    import assets
+
+    legacy, t_legacy = _timeit(lambda: _legacy_background_css(BG_MAIN, BG_SIDE), repeat)
+
+    start = time.perf_counter()
+    assets.get_background_css(BG_MAIN, BG_SIDE)
+    t_cold = (time.perf_counter() - start) * 1000
+    new, t_new = _timeit(lambda: assets.get_background_css(BG_MAIN, BG_SIDE), repeat)
+
+    print(f"{'':<22}{'byte/rerun':>14}{'ms/rerun':>12}")
+    print(f"{'prima (base64)':<22}{_fmt_bytes(len(legacy.encode())):>14}{t_legacy:>12.3f}")
+    print(f"{'dopo (statici)':<22}{_fmt_bytes(len(new.encode())):>14}{t_new:>12.3f}")
+    print(f"generazione varianti (una tantum): {t_cold:.1f} ms")
+
+
+# --- 2. SCHEDULER SRS ---
+def _synthetic_bank(n):
+    """Banca sintetica di n domande e history di pari dimensione (score e date casuali)."""
+    import pandas as pd
+    ids = [f"{i // 1000}.{(i // 100) % 10}.{(i // 10) % 10}-{i}" for i in range(n)]
+    df = pd.DataFrame({"ID Progressivo": ids, "Argomento": [f"T{i % 8}" for i in range(n)],
+                       "Domanda": ["?"] * n})
+    today = datetime.datetime.now()
+    history = {q: {"score": random.randint(-1, 5),
+                   "date": (today - datetime.timedelta(days=random.randint(0, 30))).strftime("%Y-%m-%d %H:%M:%S")}
+               for q in random.sample(ids, n * 2 // 3)}
+    return df, history
+
+def bench_srs(repeat):
+    import logic
+
+    print(f"{'banca':>8}{'history':>10}{'Allenamento ms':>17}{'Ripasso ms':>13}")
+    for n in (1_000, 10_000, 100_000):
+        df, history = _synthetic_bank(n)
+        reps = max(1, repeat // (n // 1000))
+        _, t_train = _timeit(lambda: logic.get_next_session_questions(df, history, mode="Allenamento"), reps)
+        _, t_review = _timeit(lambda: logic.get_next_session_questions(df, history, mode="Ripasso"), reps)
+        print(f"{n:>8}{len(history):>10}{t_train:>17.2f}{t_review:>13.2f}")
+
+
+# --- 3. LETTURA STORICO A PAGINE ---
+HISTORY_BENCH_ROWS = 20_000
+HISTORY_BENCH_LATENCY = 0.03  # Round trip simulato per richiesta (secondi)
+
+def bench_history(repeat):
+    import database
+    import fake_supabase
+
+    # Server finto con tetto di 1000 righe per risposta, come PostgREST
+    fake = fake_supabase.FakeSupabase(max_rows=1000, latency=HISTORY_BENCH_LATENCY)
+    fake.tables["history"] = [{"user_id": "bench", "question_id": f"{i // 100}.{i % 100}-{i}", "score": 1,
+                               "timestamp": "2026-01-01 10:00:00"} for i in range(HISTORY_BENCH_ROWS)]
+    reps = max(1, repeat // 10)
+
+    def single_request():
+        return fake.table("history").select(database.HISTORY_COLUMNS).eq("user_id", "bench").execute().data
+
+    def paged():
+        rows = 0
+        for page in database.iter_history_pages(fake, "bench"): rows += len(page)
+        return rows
+
+    print(f"{HISTORY_BENCH_ROWS} righe, {HISTORY_BENCH_LATENCY * 1000:.0f} ms per richiesta")
+    print(f"{'':<26}{'righe':>8}{'ms':>10}")
+    out, t = _timeit(single_request, reps)
+    print(f"{'richiesta unica (prima)':<26}{len(out):>8}{t:>10.1f}")
+    out, t = _timeit(paged, reps)
+    print(f"{'pagine per chiave':<26}{out:>8}{t:>10.1f}")
+
+
+# --- 4. CPU DEL SERVER PER CLICK SU UNA RISPOSTA ---
+NON_ANSWER_BUTTONS = ("SALTA", "Non la so", "PROSSIMA", "NUOVA SESSIONE")
+
+def _answer_button(session):
+    """Primo pulsante di risposta nell'area principale (delta_path che inizia con 0)."""
+    for path in sorted(session.elements):
+        etype, element, _ = session.elements[path]
+        if path[0] == 0 and etype == "button" and not any(b in element.label for b in NON_ANSWER_BUTTONS):
+            return element.label
+    raise LookupError("Nessun pulsante di risposta")
+
+async def _click_session(url, pid, clicks):
+    import asyncio
+    import session_client
+
+    async with session_client.ScriptedSession(url) as s:
+        await s.run()
+        await s.set_value("Scrivi il tuo nome", f"bench {os.getpid()}", "text_input")
+        await s.click("ENTRA")  # Avvia direttamente la simulazione d'esame
+        cpu, wall, deltas = [], [], []
+        for _ in range(clicks):
+            before = session_client.process_cpu_seconds(pid)
+            run = await s.click(_answer_button(s))
+            cpu.append(session_client.process_cpu_seconds(pid) - before)
+            wall.append(run["seconds"])
+            deltas.append(run["deltas"])
+            await s.click("PROSSIMA")
+            await asyncio.sleep(0.5)  # Lascia finire il prefetch della figura: non va contato nel click
+    return cpu, wall, deltas
+
+def bench_clicks(repeat):
+    import asyncio
+    import statistics
+    import session_client
+
+    clicks = min(repeat, 25)  # Una simulazione d'esame Base ha 30 domande
+    proc, url = session_client.start_server(APP_PATH)
+    try:
+        cpu, wall, deltas = asyncio.run(_click_session(url, proc.pid, clicks))
+    finally:
+        proc.kill()
+    print(f"app: {APP_PATH}")
+    print(f"{clicks} click su una risposta (sessione websocket su server reale)")
+    print(f"CPU server per click: {statistics.mean(cpu) * 1000:.1f} ms (media)")
+    print(f"latenza per click:    {statistics.mean(wall) * 1000:.1f} ms (media), {max(wall) * 1000:.1f} ms (max)")
+    print(f"elementi inviati:     {statistics.mean(deltas):.0f} per click")
+
+
+# --- 5. MEMORIA DELLE HISTORY DI SESSIONE ---
+MEMORY_BENCH_QUESTIONS = 1_800   # Domande nel registro (circa Base + Vela + Carteggio)
+MEMORY_BENCH_ANSWERED = 1_500    # Risposte per sessione
+
+def _measure_sessions(build, n_sessions):
+    """Byte allocati (tracemalloc) per tenere in vita n_sessions history create da build()."""
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    sessions = [build(i) for i in range(n_sessions)]
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del sessions
+    return used
+
+def bench_memory(repeat):
+    from history import QuestionRegistry, CompactHistory
+
+    ids = [f"{i // 100}.{(i // 10) % 10}.{i % 10}-{i}" for i in range(MEMORY_BENCH_QUESTIONS)]
+    registry = QuestionRegistry(ids)
+    today = datetime.datetime.now()
+
+    def legacy(seed):
+        rnd = random.Random(seed)
+        return {q: {"score": rnd.randint(-1, 5),
+                    "date": (today - datetime.timedelta(seconds=rnd.randint(0, 30 * 86400))).strftime("%Y-%m-%d %H:%M:%S")}
+                for q in rnd.sample(ids, MEMORY_BENCH_ANSWERED)}
+
+    def compact(seed):
+        return CompactHistory.from_dict(registry, legacy(seed))
+
+    print(f"{MEMORY_BENCH_ANSWERED} risposte per sessione, registro di {MEMORY_BENCH_QUESTIONS} domande")
+    print(f"{'sessioni':>9}{'dict di dict':>16}{'compatta':>14}{'per sessione':>24}")
+    for n in (100, 500, 1_000):
+        old = _measure_sessions(legacy, n)
+        new = _measure_sessions(compact, n)
+        print(f"{n:>9}{_fmt_bytes(old):>16}{_fmt_bytes(new):>14}{_fmt_bytes(old / n):>12} -> {_fmt_bytes(new / n)}")
+
+
+# --- 6. BANCA CONDIVISA ---
+BANK_CALLS_PER_RERUN = 4  # Selettore argomento, contatore errori, reset_game, statistiche
+
+def _traced(fn):
+    """(risultato, byte allocati e ancora vivi, picco) di una chiamata."""
+    import tracemalloc
+    tracemalloc.start()
+    out = fn()
+    used, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, used, peak
+
+def bench_bank(repeat):
+    import pickle
+    import banks
+
+    bank = banks.QuestionBank(banks.load_compiled_bank(*banks.source_paths("Base")))
+    # st.cache_data conserva il DataFrame serializzato e lo deserializza a ogni chiamata
+    blob = pickle.dumps(bank.frame)
+
+    def legacy_rerun():
+        return [pickle.loads(blob) for _ in range(BANK_CALLS_PER_RERUN)]
+
+    def shared_rerun():
+        return [bank.frame for _ in range(BANK_CALLS_PER_RERUN)]
+
+    print(f"banca Base: {len(bank)} domande, {BANK_CALLS_PER_RERUN} letture per rerun")
+    print(f"{'':<26}{'ms/rerun':>10}{'allocati':>12}{'picco':>12}")
+    for label, fn in (("cache_data (prima)", legacy_rerun), ("banca condivisa", shared_rerun)):
+        _, t = _timeit(fn, repeat)
+        _, used, peak = _traced(fn)
+        print(f"{label:<26}{t:>10.2f}{_fmt_bytes(used):>12}{_fmt_bytes(peak):>12}")
+
+    # Che le scritture sulle viste non tocchino la banca lo verifica tests/test_banks.py
+    lookup = bank.ids[len(bank) // 2]
+    _, t_lookup = _timeit(lambda: bank.position(lookup), repeat * 1000)
+    print(f"ricerca per ID: {t_lookup * 1000:.2f} µs")
+
+
+# --- 7. DOMANDE DELLA SESSIONE ---
+def bench_session_questions(repeat):
+    import banks
+    import exams
+    import logic
+
+    bank = banks.QuestionBank(banks.load_compiled_bank(*banks.source_paths("Base")))
+    index = exams.build_exam_index(bank.frame)
+
+    def legacy(_):
+        # Vecchio reset_game: le righe scelte copiate in dict (una per domanda)
+        return bank.records(logic.get_balanced_exam_positions(index))
+
+    def positions(_):
+        return logic.get_balanced_exam_positions(index)
+
+    print(f"scheda Base di {exams.EXAM_SIZE_BASE} domande")
+    print(f"{'sessioni':>9}{'dict per domanda':>20}{'posizioni int32':>18}")
+    for n in (1, 100, 1_000):
+        old = _measure_sessions(legacy, n)
+        new = _measure_sessions(positions, n)
+        print(f"{n:>9}{_fmt_bytes(old):>20}{_fmt_bytes(new):>18}")
+
+
+# --- 8. COSTO DELLE METRICHE ---
+METRICS_SPANS_PER_CLICK = 10      # Span registrati in un click (fragment, caricamenti, Supabase), per eccesso
+METRICS_CLICK_CPU_MS = 12.0       # CPU del server per click misurata con `benchmark.py click`
+
+def bench_metrics(repeat):
+    import metrics
+
+    def work():
+        return sum(range(50))
+
+    calls = repeat * 5_000
+    enabled = metrics.ENABLED
+    try:
+        metrics.ENABLED = False
+        plain = metrics.traced("bench")(work)
+        _, t_off = _timeit(lambda: [plain() for _ in range(100)], calls // 100)
+        metrics.ENABLED = True
+        metrics.reset()
+        wrapped = metrics.traced("bench")(work)
+        _, t_on = _timeit(lambda: [wrapped() for _ in range(100)], calls // 100)
+    finally:
+        metrics.ENABLED = enabled
+        metrics.reset()
+
+    per_span_us = (t_on - t_off) * 1000 / 100
+    per_click = per_span_us * METRICS_SPANS_PER_CLICK / 1000
+    print(f"chiamata misurata: {t_on * 10:.2f} µs (spente: {t_off * 10:.2f} µs)")
+    print(f"costo per span: {per_span_us:.2f} µs")
+    print(f"per click ({METRICS_SPANS_PER_CLICK} span): {per_click * 1000:.1f} µs = "
+          f"{per_click / METRICS_CLICK_CPU_MS * 100:.2f}% di {METRICS_CLICK_CPU_MS:.0f} ms di CPU")
+
+
+# --- 9. AVVIO A FREDDO E A CALDO ---
+def _module_import_seconds():
+    """Secondi per importare i moduli dell'app in un interprete nuovo."""
+    import subprocess
+    code = "import time; t = time.perf_counter(); import logic, database, assets, ui; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, capture_output=True, text=True, timeout=120)
+    return float(out.stdout.strip().splitlines()[-1])
+
+async def _first_visitor(url):
+    import session_client
+    async with session_client.ScriptedSession(url) as s:
+        first = await s.run()
+        await s.set_value("Scrivi il tuo nome", f"avvio {os.getpid()}", "text_input")
+        login = await s.click("ENTRA")
+    return first["seconds"], login["seconds"]
+
+def _startup(command):
+    import asyncio
+    import session_client
+    start = time.perf_counter()
+    proc, url = session_client.start_server(APP_PATH, command=command)
+    listening = time.perf_counter() - start
+    try:
+        first, login = asyncio.run(_first_visitor(url))
+    finally:
+        proc.kill()
+        proc.wait()
+    return listening, first, login
+
+def bench_startup(repeat):
+    print(f"import moduli dell'app: {_module_import_seconds() * 1000:.0f} ms")
+    print(f"{'':<24}{'server pronto s':>16}{'primo run ms':>14}{'primo login ms':>16}")
+    for label, command in (("streamlit run app.py", None),
+                           ("python warmup.py", [sys.executable, os.path.join(BASE_DIR, "warmup.py")])):
+        listening, first, login = _startup(command)
+        print(f"{label:<24}{listening:>16.2f}{first * 1000:>14.0f}{login * 1000:>16.0f}")
+
+
+# --- 10. CLIENT HTTP: SINCRONO CONTRO POOL ASINCRONO ---
+HTTP_BENCH_LATENCY = 0.03     # Tempo di servizio del server locale per richiesta (secondi)
+HTTP_BENCH_REQUESTS = 200     # Richieste indipendenti per la misura di throughput
+HTTP_BENCH_ROWS = 5_000       # Righe di history dell'allievo (5 pagine)
+HTTP_BENCH_USERS = 300        # Allievi nel registro
+HTTP_BENCH_THREADS = 8        # Thread del confronto sincrono (come il tetto del pool asincrono)
+
+def _http_workload(server, run):
+    """(risultato, secondi, connessioni aperte sul server) di run()."""
+    opened = server.connections
+    start = time.perf_counter()
+    out = run()
+    return out, time.perf_counter() - start, server.connections - opened
+
+def _independent_requests(client, mode):
+    """Stesse richieste in sequenza, da un pool di thread o tutte avviate insieme sul loop."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def query(i):
+        return client.table("users").select("user_id").order("user_id").range(i % 50, i % 50)
+    if mode == "sequenza": return [query(i).execute() for i in range(HTTP_BENCH_REQUESTS)]
+    if mode == "thread":
+        with ThreadPoolExecutor(HTTP_BENCH_THREADS) as pool:
+            return list(pool.map(lambda i: query(i).execute(), range(HTTP_BENCH_REQUESTS)))
+    futures = [query(i).submit() for i in range(HTTP_BENCH_REQUESTS)]
+    return [f.result() for f in futures]
+
+def _login(concurrent):
+    """Storico completo di un allievo più lista utenti, come al primo run di una sessione."""
+    import database
+    database.invalidate_history_cache()
+    database.invalidate_users_cache()
+    if not concurrent:
+        history = database.get_user_history("bench")
+        users = database.get_all_users()
+    else:
+        pending = database.prefetch_history("bench")
+        users = database.get_all_users()
+        history = pending.result()
+    return len(history), len(users)
+
+def bench_http(repeat):
+    import tempfile
+    import database
+    import fake_supabase
+    import async_supabase
+    from journal import AnswerJournal
+    from supabase import create_client
+
+    fake = fake_supabase.FakeSupabase(max_rows=1000, latency=HTTP_BENCH_LATENCY)
+    fake.tables["history"] = [{"user_id": "bench", "question_id": f"{i // 100}.{i % 100}-{i}", "score": 1,
+                               "timestamp": "2026-01-01 10:00:00"} for i in range(HTTP_BENCH_ROWS)]
+    fake.tables["users"] = [{"user_id": f"allievo {i:03d}"} for i in range(HTTP_BENCH_USERS)]
+    server = fake_supabase.serve_http(fake)
+    sync = create_client(server.url, "bench-key")
+    pooled = async_supabase.PooledSupabase(server.url, "bench-key")
+    reps = max(1, repeat // 10)
+
+    print(f"server PostgREST locale, {HTTP_BENCH_LATENCY * 1000:.0f} ms per richiesta")
+    print(f"\n{HTTP_BENCH_REQUESTS} richieste indipendenti")
+    print(f"{'':<34}{'richieste/s':>12}{'connessioni':>13}")
+    for label, client, mode in (("client sincrono, in sequenza", sync, "sequenza"),
+                                (f"client sincrono, {HTTP_BENCH_THREADS} thread", sync, "thread"),
+                                ("pool asincrono, in sequenza", pooled, "sequenza"),
+                                ("pool asincrono, tutte insieme", pooled, "loop")):
+        _, seconds, opened = _http_workload(server, lambda: _independent_requests(client, mode))
+        print(f"{label:<34}{HTTP_BENCH_REQUESTS / seconds:>12.1f}{opened:>13}")
+
+    print(f"\naccesso: storico di {HTTP_BENCH_ROWS} righe + lista di {HTTP_BENCH_USERS} utenti")
+    print(f"{'':<34}{'ms':>12}{'connessioni':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        database.use_journal(AnswerJournal(os.path.join(tmp, "journal.sqlite3")))
+        try:
+            for label, client, concurrent in (("client sincrono, in sequenza", sync, False),
+                                              ("pool asincrono, in sequenza", pooled, False),
+                                              ("pool asincrono, in parallelo", pooled, True)):
+                database.use_connection(client)
+                total, opened = 0.0, 0
+                for _ in range(reps):
+                    _, seconds, new = _http_workload(server, lambda: _login(concurrent))
+                    total += seconds
+                    opened += new
+                print(f"{label:<34}{total * 1000 / reps:>12.1f}{opened:>13}")
+        finally:
+            database.use_connection(None)
+    print(f"richieste in volo al massimo: {pooled.get_stats()['max_in_flight']} (tetto {async_supabase.MAX_IN_FLIGHT})")
+    pooled.close()
+    server.shutdown()
+
+
+# --- 11. ARCHIVIO LOCALE SQLITE ---
+STORE_BENCH_USERS = 99         # Allievi nell'archivio
+STORE_BENCH_SIZES = (100, 500, 1_500)  # Risposte per allievo, a rotazione (1500 = tutta la banca Base)
+
+def bench_local_store(repeat):
+    import tempfile
+    import statistics
+    import local_store
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = local_store.LocalStore(os.path.join(tmp, "bench.sqlite3"))
+        ts = "2026-01-01 10:00:00"
+        total = 0
+        start = time.perf_counter()
+        for u in range(STORE_BENCH_USERS):
+            answers = STORE_BENCH_SIZES[u % len(STORE_BENCH_SIZES)]
+            total += answers
+            for q in range(answers):
+                store.upsert_answer({"user_id": f"allievo {u:03d}", "question_id": f"{q // 100}.{q % 100}-{q}",
+                                     "score": q % 5, "timestamp": ts})
+        store.flush(timeout=120)
+        seconds = time.perf_counter() - start
+        stats = store.get_stats()
+        print(f"scrittura: {total} risposte in {seconds:.2f} s = {total / seconds:,.0f} risposte/s, "
+              f"{stats['batches']} transazioni (max {stats['max_batch_size']} righe)")
+
+        # Una risposta alla volta, come i click degli allievi: tempo fino alla scrittura su disco
+        single = []
+        for i in range(repeat):
+            t = time.perf_counter()
+            store.upsert_answer({"user_id": "allievo 000", "question_id": f"0.{i}-{i}", "score": 1, "timestamp": ts})
+            store.flush()
+            single.append(time.perf_counter() - t)
+        print(f"risposta singola fino al commit: {statistics.median(single) * 1000:.2f} ms (mediana)")
+
+        reads = max(100, repeat * 10)
+        print(f"{'lettura':<34}{'righe':>8}{'ms':>10}")
+        for u in range(len(STORE_BENCH_SIZES), 2 * len(STORE_BENCH_SIZES)):  # Un allievo per dimensione
+            history, t_hist = _timeit(lambda: store.get_user_history(f"allievo {u:03d}"), reads)
+            print(f"{'storico di un allievo':<34}{len(history):>8}{t_hist:>10.3f}")
+        users, t_users = _timeit(store.get_all_users, reads)
+        print(f"{'lista utenti':<34}{len(users):>8}{t_users:>10.3f}")
+        store.close()
+
+
+# --- 12. RICERCA DOMANDE ---
+SEARCH_BENCH_QUERIES = ("ancora", "vento apparente", "fanali di via", "luce rossa a dritta", "an", "precedenza unita")
+
+def _scan_search(frames, query):
+    """Ricerca senza indice: str.contains di ogni parola su tutte le colonne di testo, a ogni ricerca."""
+    import search
+    results = []
+    words = search.tokenize(query)
+    for bank, df in frames.items():
+        text = df[[c for c in search.FIELD_WEIGHTS if c in df.columns]].astype(str).agg(" ".join, axis=1).map(search.normalize)
+        mask = text.str.len() > 0
+        for word in words: mask &= text.str.contains(word, regex=False)
+        results.extend((bank, pos) for pos in mask.to_numpy().nonzero()[0])
+    return results
+
+def bench_search(repeat):
+    import banks
+    import search
+
+    frames = {bank: banks.load_compiled_bank(*banks.source_paths(bank)) for bank in ("Base", "Vela", "Carteggio")}
+    start = time.perf_counter()
+    indexes = {bank: search.SearchIndex(df) for bank, df in frames.items()}
+    t_build = (time.perf_counter() - start) * 1000
+    print(f"indici: {sum(len(df) for df in frames.values())} righe, "
+          f"{sum(len(i) for i in indexes.values())} radici, costruiti in {t_build:.0f} ms (una volta per processo)")
+    print(f"{'ricerca':<24}{'risultati':>10}{'scansione ms':>14}{'indice ms':>12}")
+    for query in SEARCH_BENCH_QUERIES:
+        scan, t_scan = _timeit(lambda: _scan_search(frames, query), max(1, repeat // 10))
+        found, t_index = _timeit(lambda: search.search_banks(indexes, query), repeat * 10)
+        print(f"{query!r:<24}{len(found):>10}{t_scan:>14.1f}{t_index:>12.3f}")
+
+
+BENCHMARKS = {
+    "sfondi": bench_backgrounds,
+    "srs": bench_srs,
+    "storico": bench_history,
+    "click": bench_clicks,
+    "memoria": bench_memory,
+    "banca": bench_bank,
+    "sessione": bench_session_questions,
+    "metriche": bench_metrics,
+    "avvio": bench_startup,
+    "http": bench_http,
+    "archivio": bench_local_store,
+    "ricerca": bench_search,
+}
+APP_PATH = os.path.join(BASE_DIR, "app.py")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Patente Nautica")
+    parser.add_argument("nome", choices=sorted(BENCHMARKS), help="benchmark da eseguire")
+    parser.add_argument("--repeat", type=int, default=20, help="ripetizioni per misura")
+    parser.add_argument("--app", default=APP_PATH, help="app.py da misurare (benchmark click)")
+    args = parser.parse_args()
+    APP_PATH = os.path.abspath(args.app)
+    sys.path.insert(0, BASE_DIR)
+    BENCHMARKS[args.nome](args.repeat)
@@ -1,25 +1,72 @@
 # FILE: database.py
-# VERSION: v96.0 (Complete Fix - Threading + Dropdown + History)
-# DATE: 2026-01-11
+# VERSION: v108.0 (Guarded Journal Writer)
+# DATE: 2026-10-18
 
+import os
 import streamlit as st
-from supabase import create_client
 import datetime
 import threading
+import queue
+import time
+import atexit
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from journal import AnswerJournal, JOURNAL_PATH
+import metrics
 
-# Import magico per gestire i Thread in Streamlit senza errori
-try:
-    from streamlit.runtime.scriptrunner import add_script_run_ctx
-except ImportError:
-    from streamlit.scriptrunner import add_script_run_ctx
+# --- CONFIGURAZIONE COSTANTI ---
+# Backend di archiviazione (vedi get_backend): "supabase", "sqlite" o "auto" (predefinito)
+STORAGE_ENV = "PATENTE_STORAGE"            # Ha la precedenza su [storage] backend in secrets.toml
+STORAGE_PATH_ENV = "PATENTE_STORAGE_PATH"  # File SQLite locale (ha la precedenza su [storage] path)
+REPORTS_TABLE = "reports"                  # Segnalazioni di errori nelle domande
+
+# Registro utenti dedicato (vedi supabase_schema.sql): una riga per allievo
+USERS_TABLE = "users"
+USERS_PAGE_SIZE = 1000      # Righe per richiesta (PostgREST tronca le risposte troppo grandi)
+USERS_CACHE_TTL = 300       # Secondi di validità della lista utenti in cache
+
+# Scrittura risposte a lotti (un solo writer per processo)
+WRITE_QUEUE_MAX = 5000      # Notifiche in coda al writer (le risposte sono comunque nel giornale)
+WRITE_BATCH_SIZE = 200      # Righe per singolo upsert multi-riga
+WRITE_FLUSH_INTERVAL = 2.0  # Secondi massimi di attesa prima di scrivere un lotto
+WRITE_RETRY_BASE = 0.5      # Backoff iniziale dopo un errore (raddoppia a ogni tentativo)
+WRITE_RETRY_MAX = 30.0      # Backoff massimo
+LOGOUT_FLUSH_TIMEOUT = 1.0  # Secondi di attesa al logout: il resto lo scrivono writer e giornale
+
+# Cache history condivisa tra sessioni (una voce per utente, sincronizzata per differenza)
+HISTORY_COLUMNS = "question_id, score, timestamp, updated_at"  # Solo le colonne usate dall'app
+HISTORY_DELTA_OVERLAP = 60  # Secondi riletti prima del watermark (transazioni confermate in ritardo)
+HISTORY_CACHE_MAX_BYTES = 64 * 1024 * 1024          # Oltre questa soglia esce l'utente usato meno di recente
+HISTORY_ROW_BYTES = 400                             # Stima dell'occupazione di una risposta in memoria
+HISTORY_PAGE_SIZE = 1000    # Righe per pagina: non oltre il tetto del server (max-rows di PostgREST)
+HISTORY_PAGE_TIMEOUT = 15.0 # Secondi di attesa al massimo per una pagina
+HISTORY_FETCH_WORKERS = 4   # Richieste del client sincrono in volo insieme (pool condiviso dal processo)
+HISTORY_PREFETCH_WORKERS = 4  # Letture di storico avviate in background (vedi prefetch_history)
+HISTORY_PREFETCH_TIMEOUT = 10.0  # Secondi di attesa di una lettura in background prima di ripiegare su quella diretta
+
+# Utenti già registrati da questo processo (evita un upsert sul registro a ogni risposta)
+_registered_users = set()
+_registered_lock = threading.Lock()
+
+# Client sostitutivo (es. finto client locale per test e benchmark) e il suo backend, vedi use_connection
+_client_override = None
+_client_backend = None
 
 # --- 1. CONNESSIONE SUPABASE ---
 @st.cache_resource
-def init_connection():
+def _create_connection():
     try:
         if "supabase" in st.secrets["connections"]:
             url = st.secrets["connections"]["supabase"]["url"]
             key = st.secrets["connections"]["supabase"]["key"]
+            try:
+                # Client asincrono con pool keep-alive, usato da qui come quello sincrono
+                import async_supabase
+                return async_supabase.PooledSupabase(url, key)
+            except Exception as e:
+                print(f"⚠️ Client asincrono non disponibile ({e}), uso il client sincrono")
+            # Import al primo uso: il client supabase da solo costa ~0.6 s di import
+            from supabase import create_client
             return create_client(url, key)
         else:
             print("❌ Manca [connections.supabase] in secrets.toml")
@@ -28,81 +75,602 @@ def init_connection():
         print(f"❌ Errore Configurazione Supabase: {e}")
         return None
 
-# --- 2. WORKER (SALVATAGGIO IN BACKGROUND) ---
-def _upsert_worker(username, question_id, result):
-    supabase = init_connection()
-    if not supabase: return
+def init_connection():
+    """Client Supabase condiviso dal processo (o il sostituto impostato con use_connection)."""
+    if _client_override is not None: return _client_override
+    return _create_connection()
 
-    try:
-        user_clean = username.strip().lower()
-        q_clean = str(question_id).strip()
-        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        data = {
-            "user_id": user_clean,
-            "question_id": q_clean,
-            "score": result,
-            "timestamp": ts
+def use_connection(client):
+    """Sostituisce il client Supabase con un oggetto compatibile (None = torna a Supabase)."""
+    global _client_override, _client_backend
+    _client_override = client
+    _client_backend = None if client is None else SupabaseBackend(client)
+
+def _execute(query, label):
+    """Esegue una richiesta Supabase registrandone latenza ed esito (metrics.py, es. supabase.history.select)."""
+    with metrics.span(f"supabase.{label}"):
+        return query.execute()
+
+def _submit(query, label):
+    """
+    Avvia una richiesta senza attenderla e restituisce un Future con la risposta.
+    Con il client asincrono va sull'event loop (nessun thread in più), altrimenti nel pool di lettura.
+    """
+    submit = getattr(query, "submit", None)
+    if submit is None: return _fetch_pool.submit(_execute, query, label)
+    start = time.perf_counter()
+
+    def done(future):
+        if future.cancelled(): return
+        error = future.exception()
+        metrics.record(f"supabase.{label}", time.perf_counter() - start, "ok" if error is None else type(error).__name__)
+    future = submit()
+    future.add_done_callback(done)
+    return future
+
+def use_journal(journal):
+    """Sostituisce il giornale locale delle risposte (es. un file temporaneo nei test di carico)."""
+    with _writer.lock:
+        _writer.journal = journal
+
+# --- 2. WRITER (SALVATAGGIO IN BACKGROUND A LOTTI) ---
+class _AnswerWriter:
+    """
+    Unico thread di scrittura per processo.
+    Ogni risposta viene prima registrata nel giornale locale (journal.py), poi il writer
+    la invia a Supabase: le risposte alla stessa (user_id, question_id) vengono fuse
+    (vince l'ultima) e scritte con upsert multi-riga quando il lotto è pieno o scade
+    l'intervallo. Solo dopo la conferma del server le righe escono dal giornale.
+    In caso di errore restano nel giornale e si riprova con backoff esponenziale;
+    al riavvio il writer riparte da ciò che è rimasto nel giornale.
+    Anche gli errori del giornale (SQLite) contano come fallimenti: il thread non si ferma mai.
+    """
+
+    def __init__(self, journal=None):
+        self.queue = queue.Queue(maxsize=WRITE_QUEUE_MAX)
+        self.journal = journal
+        self.supabase = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.retry_delay = 0.0
+        self.stats = {
+            "enqueued": 0, "coalesced": 0,
+            "batches": 0, "rows_written": 0, "last_batch_size": 0, "max_batch_size": 0,
+            "last_flush_ms": 0.0, "total_flush_ms": 0.0, "failures": 0,
         }
 
-        # Scrive su Supabase
-        supabase.table("history").upsert(data, on_conflict="user_id, question_id").execute()
-        print(f"✅ Saved: {user_clean} -> {q_clean}")
+    def get_journal(self):
+        with self.lock:
+            if self.journal is None: self.journal = AnswerJournal()
+            return self.journal
 
-    except Exception as e:
-        print(f"⚠️ Background Save Error: {e}")
+    def start(self, supabase):
+        self.get_journal()
+        with self.lock:
+            self.supabase = supabase
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="answer-writer", daemon=True)
+                self.thread.start()
+
+    def submit(self, row):
+        """Registra la risposta nel giornale (durevole) e sveglia il writer."""
+        self.get_journal().append(row)
+        with self.lock:  # Chiamata dai thread delle sessioni: += non è atomico
+            self.stats["enqueued"] += 1
+        if self.thread is not None:
+            try:
+                self.queue.put_nowait(("row", None))
+            except queue.Full:
+                pass  # Il writer è già sveglio: leggerà la riga dal giornale
+        return True
+
+    def flush(self, timeout=10):
+        """Scrive subito tutto ciò che è in attesa. Restituisce True se il server ha confermato."""
+        if self.thread is None or not self.thread.is_alive(): return False
+        done = threading.Event()
+        result = {"ok": False}
+        try:
+            self.queue.put(("flush", (done, result)), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout) and result["ok"]
+
+    def get_stats(self):
+        s = dict(self.stats)
+        s["queue_depth"] = self.queue.qsize()
+        s["pending"] = self.journal.count() if self.journal else 0
+        s["avg_batch_size"] = round(s["rows_written"] / s["batches"], 1) if s["batches"] else 0
+        s["avg_flush_ms"] = round(s["total_flush_ms"] / s["batches"], 1) if s["batches"] else 0
+        return s
+
+    def _run(self):
+        # Al riavvio: tiene solo l'ultima versione di ogni risposta rimasta nel giornale
+        try:
+            self.journal.compact()
+            pending = self.journal.count()
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"⚠️ Errore giornale all'avvio del writer: {e}")
+            pending = 1  # Stato ignoto: si prova subito a svuotarlo
+        deadline = time.monotonic() if pending else None   # Istante entro cui scrivere
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            waiters = []
+            try:
+                kind, payload = self.queue.get(timeout=timeout)
+                while True:
+                    if kind == "row": pending += 1
+                    else: waiters.append(payload)
+                    kind, payload = self.queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            if pending and deadline is None:
+                deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if waiters or due or pending >= WRITE_BATCH_SIZE:
+                try:
+                    ok = self._flush_pending()
+                except Exception as e:  # Qualunque errore: il writer non deve fermarsi
+                    self.stats["failures"] += 1
+                    print(f"⚠️ Errore giornale (le risposte restano in attesa): {e}")
+                    ok = False
+                if ok:
+                    pending, deadline = 0, None
+                    self.retry_delay = 0.0
+                else:
+                    self.retry_delay = min(max(WRITE_RETRY_BASE, self.retry_delay * 2), WRITE_RETRY_MAX)
+                    deadline = time.monotonic() + self.retry_delay
+                for done, result in waiters:
+                    result["ok"] = ok
+                    done.set()
+
+    def _flush_pending(self):
+        """Replay del giornale verso Supabase a lotti; ogni lotto confermato esce dal giornale."""
+        while True:
+            entries = self.journal.pending(limit=WRITE_BATCH_SIZE * 10)
+            if not entries: return True
+
+            # Fusione per (user_id, question_id): resta l'ultima, si confermano tutte
+            latest, seqs = {}, {}
+            for seq, row in entries:
+                key = (row["user_id"], row["question_id"])
+                if key in latest: self.stats["coalesced"] += 1
+                latest[key] = row
+                seqs.setdefault(key, []).append(seq)
+
+            keys = list(latest)
+            for i in range(0, len(keys), WRITE_BATCH_SIZE):
+                chunk = keys[i:i + WRITE_BATCH_SIZE]
+                batch = [latest[k] for k in chunk]
+                start = time.perf_counter()
+                try:
+                    for user_clean in {r["user_id"] for r in batch}:
+                        # Primo salvataggio di un nuovo allievo: lo aggiunge al registro utenti
+                        _register_user(self.supabase, user_clean)
+                    _execute(self.supabase.table("history").upsert(batch, on_conflict="user_id, question_id"), "history.upsert")
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    print(f"⚠️ Background Save Error ({len(batch)} righe restano nel giornale): {e}")
+                    return False
+
+                self.journal.ack([seq for k in chunk for seq in seqs[k]])
+                elapsed = (time.perf_counter() - start) * 1000
+                self.stats["batches"] += 1
+                self.stats["rows_written"] += len(batch)
+                self.stats["last_batch_size"] = len(batch)
+                self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+                self.stats["last_flush_ms"] = round(elapsed, 1)
+                self.stats["total_flush_ms"] += elapsed
+                print(f"✅ Saved: {len(batch)} risposte in {elapsed:.0f} ms")
+
+_writer = _AnswerWriter()
+# Alla chiusura del processo prova a scrivere le risposte ancora in attesa
+atexit.register(lambda: _writer.flush(timeout=5))
+
+# --- 3. FUNZIONI DI SALVATAGGIO (CHIAMATE DALL'APP) ---
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-# --- 3. FUNZIONE DI SALVATAGGIO (CHIAMATA DALL'APP) ---
 def upsert_answer(username, question_id, result):
-    # Avvia il thread separato per non bloccare l'app
-    thread = threading.Thread(target=_upsert_worker, args=(username, question_id, result))
-    add_script_run_ctx(thread)
-    thread.start()
-    return True
+    """
+    Registra la risposta sul backend attivo. Con Supabase passa dal giornale locale e dal writer
+    di processo: senza connessione resta nel giornale e viene inviata al primo avvio connesso.
+    """
+    row = {
+        "user_id": username.strip().lower(),
+        "question_id": str(question_id).strip(),
+        "score": result,
+        "timestamp": _now(),
+    }
+    return get_backend().upsert_answer(row)
+
+def save_report(username, question_id, message):
+    """Segnalazione di un errore in una domanda. True se il backend l'ha registrata."""
+    row = {
+        "user_id": username.strip().lower(),
+        "question_id": str(question_id).strip(),
+        "message": message.strip(),
+        "timestamp": _now(),
+    }
+    try:
+        return get_backend().save_report(row)
+    except Exception as e:
+        print(f"⚠️ Errore invio segnalazione: {e}")
+        return False
+
+def flush_answers(timeout=LOGOUT_FLUSH_TIMEOUT):
+    """
+    Forza la scrittura delle risposte in attesa (es. al logout). True se confermate dal backend.
+    L'attesa è breve: le risposte sono già nel giornale, se il server è lento le invia il writer.
+    """
+    return get_backend().flush(timeout)
+
+def get_writer_stats():
+    """Contatori del writer: profondità coda, risposte nel giornale, dimensione lotti, latenza."""
+    return _writer.get_stats()
 
 # --- 4. LETTURA STORICO (RECUPERO DATI UTENTE) ---
-def get_user_history(username):
-    supabase = init_connection()
-    if not supabase: return {}
+class _HistoryCache:
+    """
+    History degli utenti condivisa da tutte le sessioni del processo.
+    Per ogni utente tiene le risposte e il watermark: il più recente updated_at letto, assegnato
+    dal server a ogni scrittura (vedi supabase_schema.sql). Ai login successivi si scaricano solo
+    le righe scritte da allora, comprese quelle con un `timestamp` vecchio (giornale rinviato,
+    altro dispositivo con l'orologio indietro). Le nuove risposte entrano subito in cache
+    (write-through da upsert_answer) ma non spostano il watermark, che segue solo il server.
+    Eviction LRU sulla memoria stimata (HISTORY_ROW_BYTES per risposta).
+    """
 
-    try:
-        user_clean = username.strip().lower()
-        # Scarica tutte le risposte di questo utente
-        response = supabase.table("history").select("*").eq("user_id", user_clean).execute()
-        
-        history = {}
-        if response.data:
-            for row in response.data:
+    def __init__(self, max_bytes=HISTORY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()   # user -> {"rows": {q_id: {...}}, "watermark": str}
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "delta_rows": 0, "full_rows": 0, "evictions": 0}
+
+    def lookup(self, user_clean):
+        """Watermark dell'utente se è in cache (hit), altrimenti None (miss)."""
+        with self.lock:
+            entry = self.entries.get(user_clean)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.entries.move_to_end(user_clean)
+            return entry["watermark"]
+
+    def reset(self, user_clean):
+        """Voce vuota per un download completo (il watermark riparte da zero)."""
+        with self.lock:
+            entry = self.entries.pop(user_clean, None)
+            if entry is not None: self.bytes -= len(entry["rows"]) * HISTORY_ROW_BYTES
+            self.entries[user_clean] = {"rows": {}, "watermark": ""}
+
+    def merge(self, user_clean, server_rows, full=False):
+        """
+        Applica una pagina di righe lette dal server. Restituisce l'updated_at più recente
+        della pagina: il watermark si aggiorna (set_watermark) solo a lettura completata.
+        """
+        newest = ""
+        with self.lock:
+            entry = self.entries.get(user_clean)
+            if entry is None:
+                entry = self.entries[user_clean] = {"rows": {}, "watermark": ""}
+            rows = entry["rows"]
+            before = len(rows)
+            for row in server_rows:
                 q_id = str(row["question_id"])
-                history[q_id] = {
-                    "score": row["score"],
-                    "date": row["timestamp"]
-                }
-        return history
+                ts = row["timestamp"] or ""
+                current = rows.get(q_id)
+                # Una risposta locale più recente (write-through) vince su quella del server
+                if current is None or ts >= current["date"]:
+                    rows[q_id] = {"score": row["score"], "date": ts}
+                written = _server_time(row.get("updated_at"))
+                if written > newest: newest = written
+            self.stats["full_rows" if full else "delta_rows"] += len(server_rows)
+            self.bytes += (len(rows) - before) * HISTORY_ROW_BYTES
+            self.entries.move_to_end(user_clean)
+            self._evict()
+        return newest
+
+    def set_watermark(self, user_clean, ts):
+        with self.lock:
+            entry = self.entries.get(user_clean)
+            if entry is not None and ts > entry["watermark"]: entry["watermark"] = ts
+
+    def snapshot(self, user_clean):
+        """Copia delle risposte in cache ({} se l'utente non c'è), senza toccare i contatori."""
+        with self.lock:
+            entry = self.entries.get(user_clean)
+            return {} if entry is None else {q: dict(v) for q, v in entry["rows"].items()}
+
+    def write_through(self, row):
+        """Aggiorna la voce dell'utente (se in cache) con una risposta appena data."""
+        with self.lock:
+            entry = self.entries.get(row["user_id"])
+            if entry is None: return
+            if row["question_id"] not in entry["rows"]: self.bytes += HISTORY_ROW_BYTES
+            entry["rows"][row["question_id"]] = {"score": row["score"], "date": row["timestamp"]}
+            self._evict()
+
+    def invalidate(self, user_clean=None):
+        with self.lock:
+            users = list(self.entries) if user_clean is None else [user_clean]
+            for u in users:
+                entry = self.entries.pop(u, None)
+                if entry is not None: self.bytes -= len(entry["rows"]) * HISTORY_ROW_BYTES
+
+    def _evict(self):
+        # Mai l'ultimo utente usato, anche se da solo supera la soglia
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, entry = self.entries.popitem(last=False)
+            self.bytes -= len(entry["rows"]) * HISTORY_ROW_BYTES
+            self.stats["evictions"] += 1
 
+    def get_stats(self):
+        with self.lock:
+            s = dict(self.stats)
+            s["users"] = len(self.entries)
+            s["bytes"] = self.bytes
+        lookups = s["hits"] + s["misses"]
+        s["hit_rate"] = round(s["hits"] / lookups, 3) if lookups else 0
+        return s
+
+_history_cache = _HistoryCache()
+
+def _server_time(value):
+    """updated_at del server in forma confrontabile come stringa (UTC, microsecondi); "" se assente."""
+    if not value: return ""
+    try:
+        ts = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return ""
+    if ts.tzinfo is None: ts = ts.replace(tzinfo=datetime.timezone.utc)
+    return ts.astimezone(datetime.timezone.utc).isoformat(timespec="microseconds")
+
+def _delta_since(watermark):
+    """Inizio della lettura per differenza: il watermark meno HISTORY_DELTA_OVERLAP secondi."""
+    since = datetime.datetime.fromisoformat(watermark) - datetime.timedelta(seconds=HISTORY_DELTA_OVERLAP)
+    return since.isoformat(timespec="microseconds")
+
+_fetch_pool = ThreadPoolExecutor(max_workers=HISTORY_FETCH_WORKERS, thread_name_prefix="history-fetch")
+# Pool separato: una lettura completa che aspetta le sue pagine non deve occupare i worker delle pagine
+_prefetch_pool = ThreadPoolExecutor(max_workers=HISTORY_PREFETCH_WORKERS, thread_name_prefix="history-prefetch")
+
+def iter_history_pages(supabase, user_clean, since=None, page_size=HISTORY_PAGE_SIZE, timeout=HISTORY_PAGE_TIMEOUT):
+    """
+    Righe della history dal server (solo le colonne usate), a pagine di page_size righe.
+    Paginazione per chiave: ogni pagina riparte dopo l'ultimo question_id letto, quindi le
+    risposte salvate nel frattempo dallo stesso utente non fanno saltare o ripetere righe.
+    La prima pagina basta quasi sempre (nessuna richiesta in più per chi ha poco storico);
+    ci si ferma alla prima pagina non piena. Una pagina che non arriva entro `timeout`
+    secondi solleva TimeoutError.
+    Con `since` (watermark) legge solo le righe scritte sul server da poco prima di allora.
+    """
+    last = None
+    while True:
+        query = supabase.table("history").select(HISTORY_COLUMNS).eq("user_id", user_clean)
+        # Con un margine: now() è l'inizio della transazione, che può confermare dopo la lettura precedente
+        if since: query = query.gte("updated_at", _delta_since(since))
+        if last is not None: query = query.gt("question_id", last)
+        future = _submit(query.order("question_id").range(0, page_size - 1), "history.select")
+        try:
+            rows = future.result(timeout).data or []
+        except FutureTimeout:
+            future.cancel()
+            raise TimeoutError(f"Pagina dello storico oltre {timeout:.0f} s")
+        yield rows
+        if len(rows) < page_size: break
+        last = rows[-1]["question_id"]
+
+def get_user_history(username):
+    """Storico dell'utente dal backend attivo: {question_id: {"score", "date"}}."""
+    return get_backend().get_user_history(username.strip().lower())
+
+def prefetch_history(username):
+    """
+    Avvia la lettura dello storico in background e restituisce un Future con lo stesso dict di
+    get_user_history: intanto lo script può fare altre richieste indipendenti (es. la lista utenti).
+    """
+    backend = get_backend()  # Nel thread dello script: le cache di Streamlit restano nel loro contesto
+    return _prefetch_pool.submit(backend.get_user_history, username.strip().lower())
+
+@metrics.traced("database.get_user_history")
+def _load_history(supabase, user_clean):
+    """
+    Storico da Supabase: dalla cache di processo, aggiornata con le sole righe nuove del server,
+    con sopra le risposte del giornale non ancora confermate.
+    """
+    history = {}
+
+    if supabase:
+        # Avvia il writer: invia subito eventuali risposte rimaste nel giornale
+        _writer.start(supabase)
+        watermark = _history_cache.lookup(user_clean)
+        full = watermark is None
+        if full: _history_cache.reset(user_clean)
+        try:
+            newest = ""
+            # Ogni pagina entra in cache appena arriva
+            for rows in iter_history_pages(supabase, user_clean, since=watermark):
+                newest = max(newest, _history_cache.merge(user_clean, rows, full=full))
+            _history_cache.set_watermark(user_clean, newest)
+            history = _history_cache.snapshot(user_clean)
+        except Exception as e:
+            print(f"Errore lettura DB: {e}")
+            # Download completo interrotto: la voce parziale non va riusata
+            if full: _history_cache.invalidate(user_clean)
+            else: history = _history_cache.snapshot(user_clean)  # Meglio la copia in cache che niente
+
+    # Le risposte ancora nel giornale sono più recenti di quelle sul server
+    try:
+        history.update(_writer.get_journal().unacked_for_user(user_clean))
     except Exception as e:
-        print(f"Errore lettura DB: {e}")
-        return {}
+        print(f"Errore lettura giornale: {e}")
+    return history
+
+def get_history_cache_stats():
+    """Contatori della cache history: hit, miss, righe scaricate (complete/delta), utenti, memoria."""
+    return _history_cache.get_stats()
+
+def invalidate_history_cache(username=None):
+    """Scarta la history in cache di un utente (o di tutti): il prossimo accesso la riscarica intera."""
+    _history_cache.invalidate(None if username is None else username.strip().lower())
 
 # --- 5. RECUPERO LISTA UTENTI (PER IL MENU A TENDINA) ---
+def _register_user(supabase, user_clean):
+    """Inserisce l'utente nel registro (una volta per processo) e invalida la cache della lista."""
+    with _registered_lock:
+        if user_clean in _registered_users: return
+    try:
+        # Con ignore_duplicates il server restituisce la riga solo se è stata davvero inserita
+        response = _execute(supabase.table(USERS_TABLE).upsert({"user_id": user_clean}, on_conflict="user_id", ignore_duplicates=True), "users.upsert")
+        with _registered_lock:
+            _registered_users.add(user_clean)
+        if response.data:
+            invalidate_users_cache()
+    except Exception as e:
+        print(f"⚠️ Errore registrazione utente: {e}")
+
+def get_users_page(offset=0, limit=USERS_PAGE_SIZE, supabase=None):
+    """Una pagina della lista utenti, già distinta e ordinata lato server."""
+    supabase = supabase or init_connection()
+    if not supabase: return []
+    response = _execute(supabase.table(USERS_TABLE).select("user_id")
+                        .order("user_id").range(offset, offset + limit - 1), "users.select")
+    return [r['user_id'] for r in (response.data or [])]
+
+def _get_all_users_legacy(supabase):
+    """Ripiego se il registro non esiste ancora: scansione della history (lenta)."""
+    response = _execute(supabase.table("history").select("user_id"), "history.select_users")
+    return sorted(set(r['user_id'] for r in (response.data or [])))
+
 def get_all_users():
-    """Scarica la lista di tutti gli utenti unici per il login"""
-    supabase = init_connection()
+    """Lista degli allievi per il login (menu a tendina), dal backend attivo."""
+    # Filtra nomi vuoti o troppo corti
+    return [u for u in get_backend().get_all_users() if u and len(u) > 2]
+
+@st.cache_data(ttl=USERS_CACHE_TTL, show_spinner=False)
+@metrics.traced("database.get_all_users")  # Dentro la cache: misura solo i caricamenti veri
+def _fetch_all_users(_supabase, client_key):
+    """
+    Scarica dal client dato la lista di tutti gli utenti unici (cache condivisa tra sessioni).
+    Il client non entra nella chiave della cache: la distingue client_key (id del client).
+    """
+    supabase = _supabase
     if not supabase: return []
-    
+
     try:
-        # Chiede solo la colonna user_id
-        response = supabase.table("history").select("user_id").execute()
-        
-        if response.data:
-            # Rimuove duplicati e ordina
-            users = sorted(list(set(r['user_id'] for r in response.data)))
-            # Filtra nomi vuoti o troppo corti
-            return [u for u in users if u and len(u) > 2]
-        return []
+        users = []
+        offset = 0
+        # Pagine successive finché il server restituisce pagine piene
+        while True:
+            page = get_users_page(offset, USERS_PAGE_SIZE, supabase)
+            users.extend(page)
+            if len(page) < USERS_PAGE_SIZE: break
+            offset += USERS_PAGE_SIZE
     except Exception as e:
-        print(f"Errore get_users: {e}")
-        return []
+        print(f"⚠️ Registro utenti non disponibile ({e}), uso la history")
+        try:
+            users = _get_all_users_legacy(supabase)
+        except Exception as e:
+            print(f"Errore get_users: {e}")
+            return []
+    return users
+
+def invalidate_users_cache():
+    """Svuota la cache della lista utenti (es. dopo il primo salvataggio di un nuovo allievo)."""
+    _fetch_all_users.clear()
+
+# --- 6. BACKEND DI ARCHIVIAZIONE ---
+# Interfaccia comune (vedi anche local_store.LocalStore): upsert_answer(row), get_user_history(user),
+# get_all_users(), save_report(row), flush(timeout), più l'attributo `name`.
+class SupabaseBackend:
+    """Supabase remoto: giornale locale e writer a lotti in scrittura, cache di processo in lettura."""
+    name = "supabase"
+
+    def __init__(self, client):
+        self.client = client  # None = non configurato: le risposte restano nel giornale
+
+    def upsert_answer(self, row):
+        if self.client: _writer.start(self.client)
+        _history_cache.write_through(row)
+        return _writer.submit(row)
+
+    def get_user_history(self, user_clean):
+        return _load_history(self.client, user_clean)
+
+    def get_all_users(self):
+        return _fetch_all_users(self.client, id(self.client)) if self.client else []
+
+    def save_report(self, row):
+        if not self.client: return False
+        _execute(self.client.table(REPORTS_TABLE).insert(row), "reports.insert")
+        return True
+
+    def flush(self, timeout=10):
+        return _writer.flush(timeout)
+
+# Backend sostitutivo (es. un LocalStore su file temporaneo nei test), vedi use_backend
+_backend_override = None
+
+def _storage_setting(name, env, default=None):
+    """Impostazione dell'archivio: variabile d'ambiente, poi [storage] in secrets.toml, poi il default."""
+    value = os.environ.get(env, "").strip()
+    if value: return value
+    try:
+        return st.secrets.get("storage", {}).get(name, default)
+    except Exception:
+        return default  # Nessun secrets.toml
+
+def _import_journal(store):
+    """
+    Copia nell'archivio locale le risposte del giornale non ancora confermate da Supabase
+    (es. date prima di un riavvio senza rete), così restano nello storico anche su SQLite.
+    Restano anche nel giornale: al primo avvio di nuovo connesso partono comunque verso Supabase.
+    """
+    if _writer.journal is None and not os.path.exists(JOURNAL_PATH): return 0
+    try:
+        rows = [row for _, row in _writer.get_journal().pending()]
+    except Exception as e:
+        print(f"⚠️ Giornale delle risposte non leggibile: {e}")
+        return 0
+    if not rows: return 0
+    if store.import_answers(rows):
+        print(f"💾 {len(rows)} risposte del giornale importate nell'archivio locale")
+    else:
+        print(f"⚠️ Import del giornale non completato ({len(rows)} risposte restano solo nel giornale)")
+    return len(rows)
+
+@st.cache_resource(show_spinner=False)
+def _create_backend():
+    kind = str(_storage_setting("backend", STORAGE_ENV, "auto")).strip().lower()
+    client = None if kind == "sqlite" else _create_connection()
+    if kind == "sqlite" or (kind == "auto" and client is None):
+        import local_store
+        path = _storage_setting("path", STORAGE_PATH_ENV, local_store.LOCAL_DB_PATH)
+        print(f"💾 Archivio locale SQLite: {path}")
+        store = local_store.LocalStore(path)
+        _import_journal(store)
+        return store
+    return SupabaseBackend(client)
+
+def get_backend():
+    """
+    Backend attivo, scelto da PATENTE_STORAGE o da [storage] backend in secrets.toml:
+    "supabase", "sqlite" oppure "auto" (Supabase se configurato, altrimenti SQLite locale).
+    Un sostituto impostato con use_backend, o un client impostato con use_connection, ha la precedenza.
+    """
+    if _backend_override is not None: return _backend_override
+    if _client_backend is not None: return _client_backend
+    return _create_backend()
+
+def use_backend(backend):
+    """Sostituisce il backend di archiviazione con un oggetto compatibile (None = torna alla configurazione)."""
+    global _backend_override
+    _backend_override = backend
 
-# --- 6. ALIAS (IMPORTANTE: QUESTO RISOLVE IL TUO ERRORE) ---
+# --- 7. ALIAS (IMPORTANTE: QUESTO RISOLVE IL TUO ERRORE) ---
 fetch_user_history = get_user_history
\ No newline at end of file
@@ -0,0 +1,227 @@
+# FILE: exams.py
+# VERSION: v1.2 (Sheet Tests)
+# DATE: 2026-10-18
+#
+# Generazione delle schede d'esame senza Streamlit (usata anche da logic.py).
+# Uso da riga di comando, es. 10.000 schede Base riproducibili su 8 processi:
+#   python exams.py --banca base --schede 10000 --seed 42 --workers 8 --out schede.parquet
+# Formati di uscita (dall'estensione): .parquet, .csv, .jsonl
+
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# --- CONFIGURAZIONE COSTANTI ---
+# Distribuzione domande esame (Regole Ministeriali Base)
+RULES_BASE = {
+    "Scafo": 1, "Motori": 1, "Sicurezza": 3, "Manovra": 4,
+    "Colreg": 2, "Meteorologia": 2, "Navigazione": 4, "Normativa": 3
+}
+EXAM_SIZE_BASE = 30
+EXAM_SIZE_VELA = 5
+
+# Colonne esportate per ogni domanda (se presenti nella banca)
+EXPORT_COLUMNS = ["ID Progressivo", "Argomento", "Voce", "Domanda",
+                  "Risposta A", "Risposta B", "Risposta C", "Risposta Esatta"]
+CHUNK_SHEETS = 500  # Schede per blocco di lavoro (e per scrittura)
+
+# Generatore casuale condiviso per il campionamento delle schede
+_rng = np.random.default_rng()
+
+
+# --- 1. INDICE PER ARGOMENTO ---
+def build_exam_index(df):
+    """
+    Indice per la generazione degli esami, costruito una volta per banca:
+    per ogni categoria di RULES_BASE l'array delle posizioni di riga corrispondenti.
+    """
+    index = {"n": 0 if df is None else len(df), "topics": {}}
+    if df is None or df.empty: return index
+
+    if 'Argomento' in df.columns:
+        # Il confronto per parola chiave si fa sulle poche categorie distinte, non sulle righe
+        codes, topics = pd.factorize(df['Argomento'].astype(str))
+        for keyword in RULES_BASE:
+            matching = [i for i, t in enumerate(topics) if keyword.lower() in t.lower()]
+            index["topics"][keyword] = np.flatnonzero(np.isin(codes, matching))
+    return index
+
+
+# --- 2. CAMPIONAMENTO ---
+def sample_exam_positions(exam_index, rng=None, size=EXAM_SIZE_BASE):
+    """Posizioni di riga di una scheda bilanciata: solo campionamento di indici, senza ripetizioni."""
+    rng = rng or _rng
+    n = exam_index["n"]
+    if n == 0: return np.empty(0, dtype=np.intp)
+
+    taken = np.zeros(n, dtype=bool)
+    # Pesca per argomento (se mancano domande, prende tutte quelle disponibili)
+    for keyword, count in RULES_BASE.items():
+        pool = exam_index["topics"].get(keyword)
+        if pool is None or pool.size == 0: continue
+        pool = pool[~taken[pool]]  # Una domanda può cadere in più categorie: mai due volte
+        taken[rng.choice(pool, min(pool.size, count), replace=False)] = True
+
+    # Se mancano domande per arrivare a `size`, riempi con casuali tra quelle non prese
+    missing = size - int(taken.sum())
+    if missing > 0:
+        rest = np.flatnonzero(~taken)
+        taken[rng.choice(rest, min(rest.size, missing), replace=False)] = True
+
+    # Mescola
+    return rng.permutation(np.flatnonzero(taken))
+
+def sample_vela_positions(n, rng=None, size=EXAM_SIZE_VELA):
+    """Scheda Vela: `size` domande a caso tra tutte le `n` righe."""
+    rng = rng or _rng
+    return rng.choice(n, min(n, size), replace=False)
+
+def get_balanced_exam_questions(df, rng=None):
+    """Genera una scheda esame bilanciata secondo le regole ministeriali"""
+    if df is None or df.empty: return pd.DataFrame()
+    positions = sample_exam_positions(build_exam_index(df), rng)
+    return df.iloc[positions].reset_index(drop=True)
+
+
+# --- 3. SCHEDE A SOVRAPPOSIZIONE MINIMA ---
+def _take_cyclic(perm, start, count, taken):
+    """Prende `count` elementi non ancora presi da `perm`, a partire da `start` (circolare)."""
+    out = []
+    for j in range(perm.size):
+        if len(out) == count: break
+        p = perm[(start + j) % perm.size]
+        if not taken[p]:
+            taken[p] = True
+            out.append(p)
+    return out
+
+def spread_exam_positions(exam_index, perms, sheet_no, size=EXAM_SIZE_BASE):
+    """
+    Scheda `sheet_no` a sovrapposizione minima: ogni categoria scorre una permutazione fissa
+    delle sue domande, quindi le domande vengono riusate solo dopo aver esaurito la categoria.
+    Dipende solo da (permutazioni, numero scheda): calcolabile in parallelo e riproducibile.
+    """
+    taken = np.zeros(exam_index["n"], dtype=bool)
+    picked = []
+    for keyword, count in RULES_BASE.items():
+        perm = perms.get(keyword)
+        if perm is None or perm.size == 0: continue
+        picked += _take_cyclic(perm, sheet_no * count, count, taken)
+    missing = size - len(picked)
+    if missing > 0:
+        picked += _take_cyclic(perms["_all"], sheet_no * missing, missing, taken)
+    rng = np.random.default_rng([perms["_seed"], sheet_no])
+    return rng.permutation(np.array(picked, dtype=np.intp))
+
+def make_spread_permutations(exam_index, seed):
+    rng = np.random.default_rng([seed, 0xC1C1])
+    perms = {k: rng.permutation(v) for k, v in exam_index["topics"].items()}
+    perms["_all"] = rng.permutation(exam_index["n"])
+    perms["_seed"] = seed
+    return perms
+
+
+# --- 4. GENERAZIONE IN PARALLELO ---
+_worker = {}
+
+def _load_bank(bank):
+    """Banca pulita dall'archivio compilato (banks.py) o, in ripiego, dalle sorgenti."""
+    import banks
+    paths = banks.source_paths(bank)
+    df = banks.load_compiled_bank(*paths)
+    if df is None: df = banks.read_bank_file(*paths)
+    if df is None or df.empty: raise SystemExit(f"❌ Banca {bank} vuota o non trovata")
+    return df.reset_index(drop=True)
+
+def _worker_init(bank, seed, spread):
+    df = _load_bank(bank)
+    index = build_exam_index(df)
+    _worker.update(bank=bank, n=len(df), index=index, seed=seed,
+                   perms=make_spread_permutations(index, seed) if spread else None)
+
+def _worker_chunk(start, stop):
+    """Posizioni delle schede [start, stop): matrice (schede x domande), -1 dove mancano."""
+    size = EXAM_SIZE_VELA if _worker["bank"] == "Vela" else EXAM_SIZE_BASE
+    out = np.full((stop - start, size), -1, dtype=np.int32)
+    for row, sheet_no in enumerate(range(start, stop)):
+        if _worker["bank"] == "Vela":
+            if _worker["perms"] is not None:
+                perm = _worker["perms"]["_all"]
+                pos = perm[(sheet_no * size + np.arange(min(size, perm.size))) % perm.size]
+            else:
+                pos = sample_vela_positions(_worker["n"], np.random.default_rng([_worker["seed"], sheet_no]), size)
+        elif _worker["perms"] is not None:
+            pos = spread_exam_positions(_worker["index"], _worker["perms"], sheet_no, size)
+        else:
+            # Un generatore per scheda: il risultato non dipende da come si dividono i blocchi
+            pos = sample_exam_positions(_worker["index"], np.random.default_rng([_worker["seed"], sheet_no]), size)
+        out[row, :len(pos)] = pos
+    return start, out
+
+def _open_writer(path):
+    fmt = os.path.splitext(path)[1].lower().lstrip(".")
+    if fmt not in ("parquet", "csv", "jsonl"):
+        raise SystemExit(f"❌ Formato non supportato: .{fmt} (usa .parquet, .csv o .jsonl)")
+    state = {"fmt": fmt, "first": True, "pq": None}
+
+    def write(df):
+        if fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if state["pq"] is None: state["pq"] = pq.ParquetWriter(path, table.schema)
+            state["pq"].write_table(table)
+        elif fmt == "csv":
+            df.to_csv(path, mode="w" if state["first"] else "a", header=state["first"], index=False)
+        else:
+            with open(path, "w" if state["first"] else "a", encoding="utf-8") as f:
+                for rec in df.to_dict('records'):
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        state["first"] = False
+
+    def close():
+        if state["pq"] is not None: state["pq"].close()
+    return write, close
+
+def generate_sheets(bank, n_sheets, out_path, seed=0, workers=None, spread=False):
+    """Genera `n_sheets` schede e le scrive in streaming su out_path. Restituisce le righe scritte."""
+    df = _load_bank(bank)
+    cols = [c for c in EXPORT_COLUMNS if c in df.columns]
+    table = df[cols]
+    write, close = _open_writer(out_path)
+    chunks = [(s, min(s + CHUNK_SHEETS, n_sheets)) for s in range(0, n_sheets, CHUNK_SHEETS)]
+    rows = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init,
+                                 initargs=(bank, seed, spread)) as pool:
+            # map mantiene l'ordine dei blocchi: il file esce sempre uguale a parità di seed
+            for start, positions in pool.map(_worker_chunk, *zip(*chunks)):
+                sheet_no, order = np.nonzero(positions >= 0)
+                part = table.iloc[positions[sheet_no, order]].reset_index(drop=True)
+                part.insert(0, "Ordine", order + 1)
+                part.insert(0, "Scheda", sheet_no + start + 1)
+                write(part)
+                rows += len(part)
+    finally:
+        close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera schede d'esame in blocco (senza Streamlit)")
+    parser.add_argument("--banca", choices=["base", "vela"], default="base")
+    parser.add_argument("--schede", type=int, default=100, help="numero di schede da generare")
+    parser.add_argument("--seed", type=int, default=0, help="seme: stesse schede a parità di seme")
+    parser.add_argument("--workers", type=int, default=None, help="processi (default: tutti i core)")
+    parser.add_argument("--sovrapposizione-minima", dest="spread", action="store_true",
+                        help="riduce al minimo le domande ripetute tra schede")
+    parser.add_argument("--out", required=True, help="file di uscita (.parquet, .csv, .jsonl)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = generate_sheets(args.banca.title(), args.schede, args.out, args.seed, args.workers, args.spread)
+    print(f"✅ {args.schede} schede ({rows} righe) in {time.perf_counter() - start:.2f} s -> {args.out}")
@@ -0,0 +1,242 @@
+# FILE: fake_supabase.py
+# VERSION: v1.4 (Server Timestamps)
+# DATE: 2026-10-18
+#
+# Sostituto in memoria del client Supabase, per provare database.py senza rete:
+#   import database, fake_supabase
+#   database.use_connection(fake_supabase.FakeSupabase())
+# Implementa solo il sottoinsieme di API usato dall'app (select/eq/gt/gte/order/range/upsert/insert).
+# Come il default e il trigger di supabase_schema.sql, ogni riga scritta riceve updated_at (ora UTC).
+# Latenza e guasti simulati sono configurabili (anche da variabili d'ambiente, vedi from_env).
+# serve_http() espone lo stesso client come un piccolo server PostgREST locale (HTTP/1.1
+# keep-alive), per misurare i client HTTP veri (supabase-py, pool asincrono) senza rete.
+
+import os
+import json
+import time
+import random
+import datetime
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURAZIONE COSTANTI ---
+ENV_LATENCY = "FAKE_SUPABASE_LATENCY"            # Secondi per richiesta
+ENV_FAILURE_RATE = "FAKE_SUPABASE_FAILURE_RATE"  # Probabilità (0-1) che una richiesta fallisca
+ENV_SEED = "FAKE_SUPABASE_SEED"
+
+
+class FakeAPIError(Exception):
+    """Errore simulato del server (come un 5xx o un timeout di rete)."""
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.op = "select"
+        self.columns = None
+        self.filters = []
+        self.order_by = None
+        self.row_range = None
+        self.rows = []
+        self.conflict_keys = []
+        self.ignore_duplicates = False
+
+    # --- LETTURA ---
+    def select(self, *columns):
+        self.op = "select"
+        self.columns = [c.strip() for c in ",".join(columns).split(",") if c.strip() and c.strip() != "*"] or None
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) > value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) >= value)
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def range(self, start, end):
+        self.row_range = (start, end)
+        return self
+
+    # --- SCRITTURA ---
+    def upsert(self, json, on_conflict="", ignore_duplicates=False, **kwargs):
+        self.op = "upsert"
+        self.rows = json if isinstance(json, list) else [json]
+        self.conflict_keys = [k.strip() for k in on_conflict.split(",") if k.strip()]
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def insert(self, json, **kwargs):
+        return self.upsert(json)  # Senza chiavi di conflitto l'upsert aggiunge sempre le righe
+
+    def execute(self):
+        return self.client._execute(self)
+
+
+class FakeSupabase:
+    """Client finto: tabelle come liste di dict, thread-safe, con tetto di righe per risposta."""
+
+    def __init__(self, max_rows=1000, latency=0.0, failure_rate=0.0, seed=None):
+        self.tables = {}
+        self.latency = latency      # Secondi di attesa per richiesta (simula il round trip di rete)
+        self.max_rows = max_rows  # Come PostgREST: le risposte oltre il tetto vengono troncate
+        self.failure_rate = failure_rate  # Frazione di richieste che falliscono con FakeAPIError
+        self.calls = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Client configurato da FAKE_SUPABASE_LATENCY / _FAILURE_RATE / _SEED (es. per il test di carico)."""
+        environ = os.environ if environ is None else environ
+        seed = environ.get(ENV_SEED)
+        return cls(latency=float(environ.get(ENV_LATENCY, 0) or 0),
+                   failure_rate=float(environ.get(ENV_FAILURE_RATE, 0) or 0),
+                   seed=None if seed in (None, "") else int(seed))
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def _execute(self, q):
+        if self.latency: time.sleep(self.latency)  # Fuori dal lock: richieste concorrenti si sovrappongono
+        with self.lock:
+            self.calls += 1
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self.failures += 1
+                raise FakeAPIError(f"Errore simulato su {q.op} {q.table}")
+            rows = self.tables.setdefault(q.table, [])
+            if q.op == "upsert":
+                return FakeResponse(self._upsert(rows, q))
+
+            out = [r for r in rows if all(f(r) for f in q.filters)]
+            if q.order_by:
+                out.sort(key=lambda r: r.get(q.order_by[0]), reverse=q.order_by[1])
+            if q.row_range:
+                out = out[q.row_range[0]:q.row_range[1] + 1]
+            out = out[:self.max_rows]
+            if q.columns:
+                return FakeResponse([{c: r.get(c) for c in q.columns} for r in out])
+            return FakeResponse([dict(r) for r in out])
+
+    def _upsert(self, rows, q):
+        keys = q.conflict_keys
+        index = {tuple(r.get(k) for k in keys): r for r in rows} if keys else {}
+        written = []
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="microseconds")
+        for new in q.rows:
+            new = {**new, "updated_at": now}
+            existing = index.get(tuple(new.get(k) for k in keys)) if keys else None
+            if existing is None:
+                row = dict(new)
+                rows.append(row)
+                if keys: index[tuple(row.get(k) for k in keys)] = row
+                written.append(dict(row))
+            elif not q.ignore_duplicates:
+                existing.update(new)
+                written.append(dict(existing))
+        return written
+
+
+# --- SERVER HTTP LOCALE (SOTTOINSIEME DI POSTGREST) ---
+REST_PREFIX = "/rest/v1/"
+_FILTERS = ("eq", "gt", "gte")  # Operatori di filtro supportati (come i metodi di FakeQuery)
+
+class _PostgrestHandler(BaseHTTPRequestHandler):
+    """Traduce le richieste di postgrest-py (select/filtri/order/offset/limit, upsert) in FakeQuery."""
+    protocol_version = "HTTP/1.1"  # Keep-alive: una connessione serve più richieste
+    disable_nagle_algorithm = True  # Header e corpo partono in due write: senza, +40 ms di ACK ritardato
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def _query(self):
+        url = urlsplit(self.path)
+        if not url.path.startswith(REST_PREFIX): return None, {}
+        return self.server.fake.table(url.path[len(REST_PREFIX):]), dict(parse_qsl(url.query))
+
+    def do_GET(self):
+        query, params = self._query()
+        if query is None: return self._reply(404, {"message": "not found"})
+        query.select(params.pop("select", "*"))
+        order = params.pop("order", "")
+        if order:
+            column, _, direction = order.partition(".")
+            query.order(column, desc=direction.startswith("desc"))
+        if "limit" in params:  # range(start, end) di postgrest-py diventa offset/limit
+            offset = int(params.pop("offset", 0))
+            query.range(offset, offset + int(params.pop("limit")) - 1)
+        for column, condition in params.items():
+            op, _, value = condition.partition(".")
+            if op not in _FILTERS: return self._reply(400, {"message": f"filtro non supportato: {condition}"})
+            getattr(query, op)(column, value)
+        self._run(query)
+
+    def do_POST(self):
+        query, params = self._query()
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        if query is None: return self._reply(404, {"message": "not found"})
+        prefer = self.headers.get("Prefer", "")
+        query.upsert(json.loads(body or b"[]"), on_conflict=params.get("on_conflict", ""),
+                     ignore_duplicates="resolution=ignore-duplicates" in prefer)
+        self._run(query, status=201)
+
+    def _run(self, query, status=200):
+        try:
+            self._reply(status, query.execute().data)
+        except FakeAPIError as e:
+            self._reply(503, {"message": str(e)})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # Il client ha annullato la richiesta (es. pagina oltre la fine)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeSupabaseServer(ThreadingHTTPServer):
+    """Server PostgREST finto su 127.0.0.1; `connections` conta le connessioni TCP aperte dai client."""
+    daemon_threads = True
+
+    def __init__(self, fake, port=0):
+        super().__init__(("127.0.0.1", port), _PostgrestHandler)
+        self.fake = fake
+        self.connections = 0
+        self.stats_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def serve_http(fake, port=0):
+    """Avvia il server in un thread daemon e lo restituisce (server.url per i client, shutdown() per fermarlo)."""
+    server = FakeSupabaseServer(fake, port)
+    threading.Thread(target=server.serve_forever, name="fake-supabase-http", daemon=True).start()
+    return server
@@ -0,0 +1,176 @@
+# FILE: history.py
+# VERSION: v1.0 (Compact History)
+# DATE: 2026-10-18
+#
+# Storico per utente in forma compatta: un int8 (score) e un int32 (secondi dal 2000)
+# per ogni domanda del registro di processo, invece di un dict con stringa data per risposta.
+# CompactHistory si comporta come il vecchio {id: {'score', 'date'}} per i chiamanti esistenti.
+
+import datetime
+import numpy as np
+import pandas as pd
+from collections.abc import MutableMapping
+
+# --- CONFIGURAZIONE COSTANTI ---
+HISTORY_EPOCH = datetime.datetime(2000, 1, 1)   # Origine dei secondi (int32: fino al 2068)
+EPOCH_DAY_OFFSET = (HISTORY_EPOCH - datetime.datetime(1970, 1, 1)).days  # Giorni 1970 -> 2000
+SECONDS_PER_DAY = 86400
+ABSENT = np.iinfo(np.int32).min   # Domanda mai risposta
+NO_DATE = ABSENT + 1              # Risposta presente ma senza data (o data illeggibile)
+SCORE_MIN, SCORE_MAX = -128, 127  # Limiti int8 (lo score oltre 3 non cambia l'SRS)
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# --- 1. REGISTRO DOMANDE (CONDIVISO DAL PROCESSO) ---
+class QuestionRegistry:
+    """ID di tutte le domande -> posizione fissa negli array delle history. Immutabile."""
+
+    def __init__(self, ids):
+        index = {}
+        for q_id in ids:
+            index.setdefault(str(q_id).strip(), len(index))
+        self.index = index
+        self.ids = np.array(list(index), dtype=object)
+        self._pd_index = pd.Index(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, ids):
+        """Posizioni nel registro per un array di ID (-1 se l'ID non è registrato)."""
+        return self._pd_index.get_indexer(ids)
+
+
+# --- 2. CONVERSIONE DATE ---
+def date_to_seconds(date_str):
+    """'YYYY-MM-DD HH:MM:SS' o 'YYYY-MM-DD' -> secondi dal 2000 (NO_DATE se vuota o illeggibile)."""
+    text = str(date_str or "").strip()
+    for fmt, size in ((DATE_FORMAT, 19), ("%Y-%m-%d", 10)):
+        try:
+            return int((datetime.datetime.strptime(text[:size], fmt) - HISTORY_EPOCH).total_seconds())
+        except ValueError:
+            continue
+    return NO_DATE
+
+def seconds_to_date(seconds):
+    if seconds == NO_DATE: return ""
+    return (HISTORY_EPOCH + datetime.timedelta(seconds=int(seconds))).strftime(DATE_FORMAT)
+
+
+# --- 3. HISTORY COMPATTA ---
+class CompactHistory(MutableMapping):
+    """
+    History di un utente allineata al registro: scores (int8) e secondi (int32) per posizione.
+    Vista mapping compatibile: history[id] restituisce un nuovo {'score', 'date'} (modificarlo
+    non cambia lo storico: si riassegna, history[id] = {...}, come già fa l'app).
+    Gli ID fuori registro (es. domande rimosse dalla banca) finiscono in un piccolo dict a parte.
+    """
+
+    __slots__ = ("registry", "scores", "seconds", "extra")
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.scores = np.zeros(len(registry), dtype=np.int8)
+        self.seconds = np.full(len(registry), ABSENT, dtype=np.int32)
+        self.extra = {}
+
+    @classmethod
+    def from_dict(cls, registry, user_history):
+        """Costruzione vettoriale da {id: {'score', 'date'}} (es. la risposta di database.get_user_history)."""
+        history = cls(registry)
+        if not user_history: return history
+        keys = list(user_history.keys())
+        values = list(user_history.values())
+        pos = registry.positions(keys)
+        found = pos >= 0
+        for k, v, ok in zip(keys, values, found):
+            if not ok: history.extra[k] = dict(v)
+
+        values = [v for v, ok in zip(values, found) if ok]
+        pos = pos[found]
+        scores = np.fromiter((v.get('score', 0) or 0 for v in values), dtype=np.int64, count=len(values))
+        history.scores[pos] = np.clip(scores, SCORE_MIN, SCORE_MAX)
+        # Accetta sia "YYYY-MM-DD HH:MM:SS" sia "YYYY-MM-DD"
+        dates = pd.to_datetime(pd.Series([str(v.get('date') or '') for v in values], dtype=object),
+                               format="ISO8601", errors="coerce")
+        secs = (dates - pd.Timestamp(HISTORY_EPOCH)).dt.total_seconds()
+        history.seconds[pos] = secs.fillna(NO_DATE).to_numpy(dtype=np.int64).astype(np.int32)
+        return history
+
+    # --- Interfaccia mapping ---
+    def __getitem__(self, q_id):
+        pos = self.registry.index.get(q_id)
+        if pos is None or self.seconds[pos] == ABSENT:
+            return self.extra[q_id]  # KeyError se assente anche qui
+        return {'score': int(self.scores[pos]), 'date': seconds_to_date(self.seconds[pos])}
+
+    def __setitem__(self, q_id, item):
+        pos = self.registry.index.get(q_id)
+        if pos is None:
+            self.extra[q_id] = dict(item)
+            return
+        self.scores[pos] = min(max(int(item.get('score', 0) or 0), SCORE_MIN), SCORE_MAX)
+        self.seconds[pos] = date_to_seconds(item.get('date'))
+
+    def __delitem__(self, q_id):
+        pos = self.registry.index.get(q_id)
+        if pos is None or self.seconds[pos] == ABSENT:
+            del self.extra[q_id]
+            return
+        self.scores[pos] = 0
+        self.seconds[pos] = ABSENT
+
+    def __contains__(self, q_id):
+        pos = self.registry.index.get(q_id)
+        if pos is not None and self.seconds[pos] != ABSENT: return True
+        return q_id in self.extra
+
+    def __iter__(self):
+        yield from self.registry.ids[self.seconds != ABSENT]
+        yield from list(self.extra)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.seconds != ABSENT)) + len(self.extra)
+
+    def __repr__(self):
+        return f"CompactHistory({len(self)} risposte)"
+
+    # --- Accesso vettoriale ---
+    def iter_scores(self):
+        """(id, score) di ogni risposta, senza costruire dict né stringhe data."""
+        pos = np.flatnonzero(self.seconds != ABSENT)
+        yield from zip(self.registry.ids[pos], self.scores[pos].tolist())
+        for q_id, item in list(self.extra.items()):
+            yield q_id, item.get('score', 0)
+
+    def arrays(self, ids, with_dates=True):
+        """
+        (answered bool, score int16, giorno dal 1970 o -1) allineati agli `ids` di una banca:
+        stesso risultato di logic.history_to_arrays, senza passare dai dict.
+        """
+        pos = self.registry.positions(ids)
+        known = pos >= 0
+        secs = np.full(len(ids), ABSENT, dtype=np.int32)
+        secs[known] = self.seconds[pos[known]]
+        scores = np.zeros(len(ids), dtype=np.int16)
+        scores[known] = self.scores[pos[known]]
+        answered = secs != ABSENT
+
+        if self.extra and not known.all():
+            for i in np.flatnonzero(~known):
+                item = self.extra.get(ids[i])
+                if item is None: continue
+                answered[i] = True
+                scores[i] = item.get('score', 0)
+                secs[i] = date_to_seconds(item.get('date'))
+
+        last_day = np.full(len(ids), -1, dtype=np.int32)
+        if with_dates:
+            dated = answered & (secs != NO_DATE)
+            last_day[dated] = secs[dated] // SECONDS_PER_DAY + EPOCH_DAY_OFFSET
+        return answered, scores, last_day
+
+    @property
+    def nbytes(self):
+        """Memoria degli array (il registro è condiviso e non conta)."""
+        return self.scores.nbytes + self.seconds.nbytes
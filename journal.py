@@ -0,0 +1,85 @@
+# FILE: journal.py
+# VERSION: v1.0 (Offline Write-Ahead Journal)
+# DATE: 2026-10-18
+
+import os
+import sqlite3
+import threading
+
+# --- CONFIGURAZIONE COSTANTI ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_PATH = os.path.join(BASE_DIR, "answers_journal.sqlite3")
+
+
+# --- 1. GIORNALE DELLE RISPOSTE (SQLITE, SOLO APPEND) ---
+class AnswerJournal:
+    """
+    Giornale locale delle risposte: ogni risposta viene scritta qui (con fsync) prima di
+    partire verso Supabase, così sopravvive a cadute di rete e riavvii del processo.
+    Le righe confermate dal server vengono eliminate (ack); compact() tiene solo
+    l'ultima versione di ogni (user_id, question_id) ancora da inviare.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL + synchronous=FULL: ogni commit è su disco prima di restituire il controllo
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                question_id TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                timestamp TEXT NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_user ON answers (user_id, question_id)")
+
+    def append(self, row):
+        """Registra una risposta. Restituisce il numero di sequenza assegnato."""
+        with self.lock:
+            cur = self.conn.execute(
+                "INSERT INTO answers (user_id, question_id, score, timestamp) VALUES (?, ?, ?, ?)",
+                (row["user_id"], row["question_id"], row["score"], row["timestamp"]))
+            return cur.lastrowid
+
+    def pending(self, limit=None):
+        """Righe non ancora confermate, in ordine di arrivo: [(seq, riga), ...]"""
+        sql = "SELECT seq, user_id, question_id, score, timestamp FROM answers ORDER BY seq"
+        if limit: sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            rows = self.conn.execute(sql).fetchall()
+        return [(seq, {"user_id": u, "question_id": q, "score": s, "timestamp": ts}) for seq, u, q, s, ts in rows]
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def ack(self, seqs):
+        """Elimina le righe confermate dal server."""
+        if not seqs: return
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("DELETE FROM answers WHERE seq = ?", [(s,) for s in seqs])
+            self.conn.execute("COMMIT")
+
+    def compact(self):
+        """Elimina le versioni superate: per ogni domanda resta solo l'ultima risposta in attesa."""
+        with self.lock:
+            self.conn.execute("""
+                DELETE FROM answers WHERE seq NOT IN (
+                    SELECT MAX(seq) FROM answers GROUP BY user_id, question_id)""")
+
+    def unacked_for_user(self, user_id):
+        """Ultima risposta in attesa per ogni domanda dell'utente, nel formato della history."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT question_id, score, timestamp FROM answers WHERE user_id = ? ORDER BY seq",
+                (user_id,)).fetchall()
+        return {q: {"score": s, "date": ts} for q, s, ts in rows}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
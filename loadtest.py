@@ -0,0 +1,229 @@
+# FILE: loadtest.py
+# VERSION: v1.1 (SQLite Storage Option)
+# DATE: 2026-10-18
+#
+# Test di carico: N allievi simultanei (sessioni websocket scriptate, vedi session_client.py)
+# contro un server Streamlit reale, con Supabase sostituito dal client finto in memoria
+# (latenza e guasti configurabili, vedi loadtest_app.py) o, con --archivio sqlite, dall'archivio
+# locale SQLite su un file temporaneo. Ogni allievo entra, fa la
+# simulazione d'esame (risponde, salta, "non la so"), apre le statistiche e si allena.
+# Riporta latenza dei rerun (p50/p95/p99), throughput, thread e memoria del server;
+# ogni esecuzione si aggiunge a loadtest_results.jsonl per confrontare le versioni nel tempo.
+# Uso: python loadtest.py --allievi 20 --durata 60 --latenza 0.03 --guasti 0.02
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import tempfile
+import subprocess
+import numpy as np
+
+import session_client
+import fake_supabase
+
+# --- CONFIGURAZIONE COSTANTI ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENTRY_POINT = os.path.join(BASE_DIR, "loadtest_app.py")
+RESULTS_PATH = os.path.join(BASE_DIR, "loadtest_results.jsonl")
+PERCENTILES = (50, 95, 99)
+SAMPLE_INTERVAL = 0.5     # Secondi tra due letture di thread/RSS/CPU del server
+ANSWERS_PER_ROUND = 8     # Risposte per giro (esame o allenamento) prima di cambiare attività
+SKIP_RATE = 0.1           # Probabilità di saltare la domanda (solo in esame)
+IDK_RATE = 0.1            # Probabilità di "Non la so!"
+
+
+# --- 1. MISURE ---
+def percentiles(values):
+    if not values: return {f"p{q}": 0.0 for q in PERCENTILES}
+    return {f"p{q}": float(np.percentile(values, q)) * 1000 for q in PERCENTILES}
+
+class RunLog:
+    """Rerun misurati dal lato client: (azione, secondi, elementi ricevuti, eccezioni nell'app)."""
+
+    def __init__(self):
+        self.runs = []
+        self.errors = {"eccezioni_app": 0, "sessioni_interrotte": 0}
+
+    async def timed(self, action, session, coro):
+        run = await coro
+        exceptions = sum(1 for t, _, _ in session.elements.values() if t == "exception")
+        self.errors["eccezioni_app"] += exceptions
+        self.runs.append((action, run["seconds"], run["deltas"], exceptions))
+        return run
+
+    def summary(self):
+        by_action = {}
+        for action, seconds, _, _ in self.runs:
+            by_action.setdefault(action, []).append(seconds)
+        out = {a: {"rerun": len(v), **percentiles(v)} for a, v in sorted(by_action.items())}
+        out["totale"] = {"rerun": len(self.runs), **percentiles([r[1] for r in self.runs])}
+        return out
+
+async def sample_server(pid, samples, stop):
+    """Thread, RSS e CPU del server a intervalli regolari, fino a `stop`."""
+    while not stop.is_set():
+        try:
+            samples.append({"t": time.monotonic(), "cpu": session_client.process_cpu_seconds(pid),
+                            **session_client.process_status(pid)})
+        except OSError:
+            return  # Server terminato
+        try:
+            await asyncio.wait_for(stop.wait(), SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+# --- 2. ALLIEVO SIMULATO ---
+def _buttons(session):
+    return [element for _, element, _ in session.widgets("button")]
+
+def _has_button(session, label):
+    return any(label in b.label for b in _buttons(session))
+
+def _answer_buttons(session):
+    """Pulsanti di risposta (key btn_<i> nel pannello domanda), con il fragment che li contiene."""
+    return [(element, fragment_id) for _, element, fragment_id in session.widgets("button") if "-btn_" in element.id]
+
+async def answer_round(session, log, rnd, think, in_exam):
+    """Un giro di risposte; se la sessione finisce ne avvia una nuova."""
+    for _ in range(ANSWERS_PER_ROUND):
+        await asyncio.sleep(rnd.uniform(0.5, 1.5) * think)
+        answers = _answer_buttons(session)
+        if not answers:
+            if _has_button(session, "NUOVA SESSIONE"): await log.timed("nuova sessione", session, session.click("NUOVA SESSIONE"))
+            continue
+        roll = rnd.random()
+        if in_exam and roll < SKIP_RATE and _has_button(session, "SALTA"):
+            await log.timed("salta", session, session.click("SALTA"))
+            continue
+        if roll > 1 - IDK_RATE:
+            await log.timed("non la so", session, session.click("Non la so"))
+        else:
+            button, fragment_id = rnd.choice(answers)
+            await log.timed("risposta", session, session.run(trigger_id=button.id, fragment_id=fragment_id))
+        await asyncio.sleep(rnd.uniform(0.2, 0.6) * think)
+        if _has_button(session, "PROSSIMA"): await log.timed("prossima", session, session.click("PROSSIMA"))
+
+async def student(url, number, deadline, think, log, seed):
+    rnd = random.Random(seed)
+    try:
+        async with session_client.ScriptedSession(url) as s:
+            await log.timed("avvio", s, s.run())
+            await log.timed("nome", s, s.set_value("Scrivi il tuo nome", f"allievo {number:03d}", "text_input"))
+            await log.timed("login", s, s.click("ENTRA"))  # Avvia la simulazione d'esame
+            while time.monotonic() < deadline:
+                await answer_round(s, log, rnd, think, in_exam=True)
+                await asyncio.sleep(think)
+                await log.timed("statistiche", s, s.click("STATISTICHE"))
+                await asyncio.sleep(think)
+                await log.timed("torna ai quiz", s, s.click("Torna ai Quiz"))
+                await log.timed("allenamento", s, s.click("ALLENAMENTO SMART"))
+                await answer_round(s, log, rnd, think, in_exam=False)
+                await log.timed("esame", s, s.click("SIMULAZIONE ESAME"))
+    except (asyncio.TimeoutError, LookupError, OSError) as e:
+        log.errors["sessioni_interrotte"] += 1
+        print(f"⚠️ Allievo {number}: sessione interrotta ({type(e).__name__}: {e})")
+
+
+# --- 3. ESECUZIONE ---
+async def run_students(url, pid, args):
+    log, samples, stop = RunLog(), [], asyncio.Event()
+    sampler = asyncio.create_task(sample_server(pid, samples, stop))
+    start = time.monotonic()
+    deadline = start + args.durata
+    tasks = []
+    for n in range(args.allievi):
+        # Ingresso scaglionato sulla rampa, come una classe che si collega alla spicciolata
+        tasks.append(asyncio.create_task(student(url, n, deadline, args.pausa, log, args.seed + n)))
+        await asyncio.sleep(args.rampa / max(1, args.allievi))
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - start
+    stop.set()
+    await sampler
+    return log, samples, elapsed
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+def server_summary(samples, idle):
+    if not samples: return {}
+    cpu = (samples[-1]["cpu"] - samples[0]["cpu"]) / max(1e-9, samples[-1]["t"] - samples[0]["t"])
+    return {"thread_max": max(s["threads"] for s in samples), "thread_finali": samples[-1]["threads"],
+            "rss_riposo": idle["rss"], "rss_picco": max(s["rss"] for s in samples),
+            "rss_finale": samples[-1]["rss"], "cpu_media": cpu * 100}
+
+def print_report(result):
+    p = result["parametri"]
+    if p["archivio"] == "sqlite":
+        print(f"\n{p['allievi']} allievi, {p['durata']} s, archivio locale SQLite")
+    else:
+        print(f"\n{p['allievi']} allievi, {p['durata']} s, Supabase finto: latenza {p['latenza'] * 1000:.0f} ms, "
+              f"guasti {p['guasti'] * 100:.0f}%")
+    print(f"{'azione':<16}{'rerun':>7}" + "".join(f"{f'p{q} ms':>10}" for q in PERCENTILES))
+    for action, row in result["latenza"].items():
+        print(f"{action:<16}{row['rerun']:>7}" + "".join(f"{row[f'p{q}']:>10.1f}" for q in PERCENTILES))
+    print(f"throughput: {result['throughput']:.1f} rerun/s")
+    srv = result["server"]
+    if srv:
+        mb = lambda n: f"{n / 1024 / 1024:.0f} MB"
+        print(f"server: thread max {srv['thread_max']} (finali {srv['thread_finali']}), RSS {mb(srv['rss_riposo'])} a riposo, "
+              f"{mb(srv['rss_picco'])} picco, {mb(srv['rss_finale'])} finale, CPU media {srv['cpu_media']:.0f}%")
+    print(f"errori: {result['errori']['eccezioni_app']} eccezioni nell'app, "
+          f"{result['errori']['sessioni_interrotte']} sessioni interrotte")
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({"LOADTEST_APP": os.path.abspath(args.app), "LOADTEST_JOURNAL": os.path.join(tmp, "journal.sqlite3"),
+                    "LOADTEST_STORAGE": args.archivio, "LOADTEST_STORE": os.path.join(tmp, "store.sqlite3"),
+                    fake_supabase.ENV_LATENCY: str(args.latenza), fake_supabase.ENV_FAILURE_RATE: str(args.guasti),
+                    fake_supabase.ENV_SEED: str(args.seed)})
+        proc, url = session_client.start_server(ENTRY_POINT, env=env)
+        try:
+            idle = session_client.process_status(proc.pid)
+            log, samples, elapsed = asyncio.run(run_students(url, proc.pid, args))
+        finally:
+            proc.kill()
+            proc.wait()
+
+    result = {
+        "data": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "revisione": _git_revision(),
+        "parametri": {"allievi": args.allievi, "durata": args.durata, "pausa": args.pausa, "latenza": args.latenza,
+                      "guasti": args.guasti, "archivio": args.archivio,
+                      "app": os.path.relpath(os.path.abspath(args.app), BASE_DIR)},
+        "latenza": log.summary(),
+        "throughput": len(log.runs) / elapsed if elapsed else 0.0,
+        "server": server_summary(samples, idle),
+        "errori": log.errors,
+    }
+    print_report(result)
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f: f.write(json.dumps(result) + "\n")
+        print(f"risultati aggiunti a {args.out}")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test di carico: allievi simultanei su un server locale")
+    parser.add_argument("--allievi", type=int, default=10, help="sessioni simultanee")
+    parser.add_argument("--durata", type=float, default=30, help="secondi di attività per allievo")
+    parser.add_argument("--rampa", type=float, default=5, help="secondi per collegare tutti gli allievi")
+    parser.add_argument("--pausa", type=float, default=0.5, help="secondi medi di riflessione tra due azioni")
+    parser.add_argument("--latenza", type=float, default=0.03, help="secondi per richiesta al Supabase finto")
+    parser.add_argument("--guasti", type=float, default=0.0, help="frazione di richieste che falliscono (0-1)")
+    parser.add_argument("--archivio", choices=("supabase", "sqlite"), default="supabase",
+                        help="Supabase finto in memoria o archivio locale SQLite")
+    parser.add_argument("--seed", type=int, default=0, help="seme per le scelte degli allievi e i guasti")
+    parser.add_argument("--app", default=os.path.join(BASE_DIR, "app.py"), help="app.py da provare")
+    parser.add_argument("--out", default=RESULTS_PATH, help="file JSONL dei risultati ('' per non salvare)")
+    sys.exit(0 if main(parser.parse_args()) else 1)
@@ -0,0 +1,37 @@
+# FILE: loadtest_app.py
+# VERSION: v1.1 (SQLite Storage Option)
+# DATE: 2026-10-18
+#
+# Punto d'ingresso usato da loadtest.py: la stessa app, ma con Supabase sostituito dal
+# client finto in memoria (fake_supabase.py, configurato dalle variabili d'ambiente)
+# e con il giornale delle risposte in un file a parte, mai quello vero.
+# Con LOADTEST_STORAGE=sqlite usa invece l'archivio locale SQLite (local_store.py) sul file del test.
+# Non va lanciato a mano.
+
+import os
+import runpy
+import streamlit as st
+import database
+import fake_supabase
+from journal import AnswerJournal
+
+# --- CONFIGURAZIONE COSTANTI ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_APP = "LOADTEST_APP"          # app.py da eseguire
+ENV_JOURNAL = "LOADTEST_JOURNAL"  # Giornale delle risposte del test
+ENV_STORAGE = "LOADTEST_STORAGE"  # "supabase" (client finto, predefinito) o "sqlite"
+ENV_STORE = "LOADTEST_STORE"      # File SQLite del test (solo con LOADTEST_STORAGE=sqlite)
+
+@st.cache_resource(show_spinner=False)
+def install_fakes():
+    """Client finto (o archivio SQLite) e giornale del test, impostati una volta per processo."""
+    database.use_journal(AnswerJournal(os.environ[ENV_JOURNAL]))
+    if os.environ.get(ENV_STORAGE) == "sqlite":
+        import local_store
+        database.use_backend(local_store.LocalStore(os.environ[ENV_STORE]))
+    else:
+        database.use_connection(fake_supabase.FakeSupabase.from_env())
+    return True
+
+install_fakes()
+runpy.run_path(os.environ.get(ENV_APP, os.path.join(BASE_DIR, "app.py")), run_name="__main__")
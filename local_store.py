@@ -0,0 +1,265 @@
+# FILE: local_store.py
+# VERSION: v1.1 (Writer Recovery)
+# DATE: 2026-10-18
+#
+# Archivio locale SQLite per le aule senza rete (in barca, nell'ufficio del porto): storico,
+# registro utenti e segnalazioni in un solo file, con la stessa interfaccia del backend
+# Supabase di database.py (upsert_answer, get_user_history, get_all_users, save_report, flush).
+# In WAL le letture (pool di connessioni in sola lettura) non aspettano le scritture; un solo
+# writer raccoglie le risposte arrivate insieme e le scrive in un'unica transazione.
+# Con un file temporaneo fa anche da archivio di prova per benchmark e test di carico.
+
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# --- CONFIGURAZIONE COSTANTI ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCAL_DB_PATH = os.path.join(BASE_DIR, "patente_local.sqlite3")
+WRITE_BATCH_MAX = 500     # Operazioni al massimo in una transazione
+WRITE_RETRY_DELAY = 0.5   # Secondi di attesa prima di riprovare un lotto fallito (es. disco pieno)
+WRITE_MAX_RETRIES = 5     # Tentativi per lotto; poi le righe vanno nel file degli scarti
+DEAD_LETTER_SUFFIX = ".scarti.jsonl"  # Righe non scritte (una per riga JSON), accanto al database
+CLOSE_TIMEOUT = 10.0      # Secondi concessi alla chiusura per scrivere ciò che è in coda
+BUSY_TIMEOUT = 5.0        # Secondi di attesa su un lock di SQLite prima dell'errore
+STATEMENT_CACHE = 64      # Istruzioni compilate tenute da ogni connessione
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    user_id     TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    score       INTEGER NOT NULL DEFAULT 0,
+    timestamp   TEXT,
+    PRIMARY KEY (user_id, question_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS users (
+    user_id    TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reports (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id     TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    message     TEXT NOT NULL,
+    timestamp   TEXT NOT NULL
+);
+"""
+
+# Testo fisso con parametri: sqlite3 compila ogni istruzione una volta per connessione e la riusa
+SQL_UPSERT_ANSWER = """
+    INSERT INTO history (user_id, question_id, score, timestamp) VALUES (?, ?, ?, ?)
+    ON CONFLICT (user_id, question_id) DO UPDATE SET score = excluded.score, timestamp = excluded.timestamp"""
+# Import dal giornale di Supabase: una risposta più vecchia non sovrascrive quella già in archivio
+SQL_IMPORT_ANSWER = SQL_UPSERT_ANSWER + "\n    WHERE excluded.timestamp >= history.timestamp"
+SQL_REGISTER_USER = "INSERT OR IGNORE INTO users (user_id, created_at) VALUES (?, ?)"
+SQL_INSERT_REPORT = "INSERT INTO reports (user_id, question_id, message, timestamp) VALUES (?, ?, ?, ?)"
+SQL_USER_HISTORY = "SELECT question_id, score, timestamp FROM history WHERE user_id = ?"  # Sulla chiave primaria
+SQL_ALL_USERS = "SELECT user_id FROM users ORDER BY user_id"
+
+
+# --- 1. ARCHIVIO LOCALE ---
+class LocalStore:
+    """
+    Backend SQLite in WAL. Le scritture vanno in coda a un thread writer, che a ogni giro scrive
+    tutto ciò che trova in coda in una sola transazione (executemany); finché una risposta non è
+    scritta resta visibile alle letture dalla coda in memoria. flush() attende le scritture in corso.
+    Un lotto che fallisce WRITE_MAX_RETRIES volte (file bloccato o corrotto, disco pieno) finisce
+    negli scarti (dead_letter e file .scarti.jsonl) e il writer passa oltre; close(), chiamata anche
+    all'uscita del processo, scrive ciò che resta in coda e chiude le connessioni.
+    """
+    name = "sqlite"
+
+    def __init__(self, path=LOCAL_DB_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.unwritten = {}   # (user_id, question_id) -> risposta in coda, non ancora scritta
+        self.readers = queue.LifoQueue()
+        self.dead_letter = []  # Righe scartate dopo WRITE_MAX_RETRIES tentativi falliti
+        self.closed = False
+        self.stats = {"batches": 0, "rows_written": 0, "last_batch_size": 0, "max_batch_size": 0,
+                      "failures": 0, "dead_letter": 0}
+        self.conn = self._connect()
+        self.conn.executescript(SCHEMA)
+        self.thread = threading.Thread(target=self._run, name="local-store-writer", daemon=True)
+        self.thread.start()
+        # All'uscita del processo le risposte ancora in coda vengono scritte
+        atexit.register(self.close)
+
+    def _connect(self, read_only=False):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL, NORMAL non perde commit se il processo cade; l'fsync avviene al checkpoint
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if read_only: conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def _reader(self):
+        """Connessione di lettura dal pool (una nuova se sono tutte in uso)."""
+        try:
+            conn = self.readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect(read_only=True)
+        try:
+            yield conn
+        finally:
+            self.readers.put(conn)
+
+    # --- SCRITTURA ---
+    def upsert_answer(self, row):
+        with self.lock:
+            self.unwritten[(row["user_id"], row["question_id"])] = row
+        self.queue.put(("answer", row))
+        return True
+
+    def import_answers(self, rows, timeout=30):
+        """
+        Importa risposte salvate altrove (es. il giornale di Supabase): ognuna entra solo se non
+        è più vecchia di quella in archivio, quindi ripetere l'import non cambia nulla. True se scritte.
+        """
+        if not rows: return True
+        self.queue.put(("import", list(rows)))
+        return self.flush(timeout)
+
+    def save_report(self, row, timeout=5):
+        """Segnalazione su una domanda; True quando è scritta su disco."""
+        self.queue.put(("report", row))
+        return self.flush(timeout)
+
+    def flush(self, timeout=10):
+        """Attende che tutto ciò che è in coda sia scritto. True se completato (senza scarti) entro timeout."""
+        if not self.thread.is_alive(): return False
+        done = threading.Event()
+        result = {"ok": False}
+        self.queue.put(("flush", (done, result)))
+        return done.wait(timeout) and result["ok"]
+
+    def _run(self):
+        while True:
+            ops = [self.queue.get()]
+            while len(ops) < WRITE_BATCH_MAX and ops[-1][0] != "stop":
+                try:
+                    ops.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            answers = [payload for kind, payload in ops if kind == "answer"]
+            reports = [payload for kind, payload in ops if kind == "report"]
+            imported = [r for kind, payload in ops if kind == "import" for r in payload]
+            ok = self._write_with_retry(answers, reports, imported)
+            for kind, payload in ops:
+                if kind == "flush":
+                    done, result = payload
+                    result["ok"] = ok
+                    done.set()
+            if ops[-1][0] == "stop": return
+
+    def _write_with_retry(self, answers, reports, imported=()):
+        """Scrive il lotto con al massimo WRITE_MAX_RETRIES tentativi; se non ci riesce lo scarta. True se scritto."""
+        for attempt in range(1, WRITE_MAX_RETRIES + 1):
+            try:
+                self._write(answers, reports, imported)
+                return True
+            except Exception as e:  # Qualunque errore: il writer non deve fermarsi
+                self.stats["failures"] += 1
+                print(f"⚠️ Errore archivio locale ({len(answers)} risposte in attesa, tentativo {attempt}): {e}")
+                if attempt < WRITE_MAX_RETRIES: time.sleep(WRITE_RETRY_DELAY * attempt)
+        self._discard(answers + list(imported), reports)
+        return False
+
+    def _discard(self, answers, reports):
+        """Sposta negli scarti un lotto non scrivibile, così le risposte successive non restano bloccate."""
+        rows = [{"kind": "answer", **r} for r in answers] + [{"kind": "report", **r} for r in reports]
+        if not rows: return
+        self.dead_letter.extend(rows)
+        self.stats["dead_letter"] += len(rows)
+        try:
+            with open(self.path + DEAD_LETTER_SUFFIX, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+        except OSError as e:
+            print(f"⚠️ File degli scarti non scrivibile: {e}")
+        print(f"❌ Archivio locale: {len(rows)} righe scartate dopo {WRITE_MAX_RETRIES} tentativi")
+        with self.lock:
+            for r in answers:
+                key = (r["user_id"], r["question_id"])
+                if self.unwritten.get(key) is r: del self.unwritten[key]
+
+    def _write(self, answers, reports, imported=()):
+        if not answers and not reports and not imported: return
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if imported:
+                conn.executemany(SQL_REGISTER_USER, {(r["user_id"], r["timestamp"]) for r in imported})
+                conn.executemany(SQL_IMPORT_ANSWER, [(r["user_id"], r["question_id"], r["score"], r["timestamp"])
+                                                     for r in imported])
+            if answers:
+                conn.executemany(SQL_REGISTER_USER, {(r["user_id"], r["timestamp"]) for r in answers})
+                conn.executemany(SQL_UPSERT_ANSWER, [(r["user_id"], r["question_id"], r["score"], r["timestamp"])
+                                                     for r in answers])
+            if reports:
+                conn.executemany(SQL_INSERT_REPORT, [(r["user_id"], r["question_id"], r["message"], r["timestamp"])
+                                                     for r in reports])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self.lock:
+            for r in answers:
+                key = (r["user_id"], r["question_id"])
+                # Se nel frattempo è arrivata una risposta più recente resta in coda la sua
+                if self.unwritten.get(key) is r: del self.unwritten[key]
+        self.stats["batches"] += 1
+        self.stats["rows_written"] += len(answers)
+        self.stats["last_batch_size"] = len(answers)
+        self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(answers))
+
+    # --- LETTURA ---
+    def get_user_history(self, user_clean):
+        """Storico nel formato di database.get_user_history: {question_id: {"score", "date"}}."""
+        with self._reader() as conn:
+            rows = conn.execute(SQL_USER_HISTORY, (user_clean,)).fetchall()
+        history = {q: {"score": s, "date": ts} for q, s, ts in rows}
+        with self.lock:
+            pending = [r for (u, _), r in self.unwritten.items() if u == user_clean] if self.unwritten else []
+        for r in pending:
+            history[r["question_id"]] = {"score": r["score"], "date": r["timestamp"]}
+        return history
+
+    def get_all_users(self):
+        with self._reader() as conn:
+            users = [u for (u,) in conn.execute(SQL_ALL_USERS)]
+        with self.lock:
+            pending = {u for u, _ in self.unwritten}
+        return sorted(pending.union(users)) if pending else users
+
+    def get_stats(self):
+        s = dict(self.stats)
+        s["queue_depth"] = self.queue.qsize()
+        s["unwritten"] = len(self.unwritten)
+        return s
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """Scrive ciò che è in coda, ferma il writer e chiude tutte le connessioni (una volta sola)."""
+        with self.lock:
+            if self.closed: return
+            self.closed = True
+        atexit.unregister(self.close)
+        if self.thread.is_alive():
+            self.queue.put(("stop", None))  # Dopo tutto ciò che è già in coda
+            self.thread.join(timeout)
+        if self.thread.is_alive():
+            print(f"⚠️ Archivio locale: writer ancora attivo dopo {timeout:.0f} s, {self.queue.qsize()} operazioni in coda")
+        else:
+            self.conn.close()
+        while True:
+            try:
+                self.readers.get_nowait().close()
+            except queue.Empty:
+                break
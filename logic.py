@@ -1,67 +1,81 @@
 # FILE: logic.py
-# VERSION: v104.0 (Universal Loader & Robust Stats)
-# DATE: 2026-01-11
+# VERSION: v121.0 (Clipped Scores)
+# DATE: 2026-10-18
 
 import pandas as pd
-import random
+import numpy as np
+import uuid
 import datetime
-import os
 import streamlit as st
+import banks
+import metrics
+from history import QuestionRegistry, CompactHistory, SCORE_MAX
+from search import SearchIndex, search_banks
+# Campionamento schede condiviso con il generatore da riga di comando (senza Streamlit)
+from exams import (RULES_BASE, EXAM_SIZE_BASE, EXAM_SIZE_VELA, build_exam_index,
+                   sample_exam_positions, sample_vela_positions, get_balanced_exam_questions)
 
 # --- CONFIGURAZIONE COSTANTI ---
 SRS_INTERVALS = {0: 0, 1: 3, 2: 7, 3: 15}
+# Stessi intervalli in forma vettoriale: indice = min(score, 3)
+SRS_INTERVALS_ARR = np.array([SRS_INTERVALS[i] for i in range(4)], dtype=np.int32)
+NO_DATE_DAYS = 9999  # Giorni "passati" per date mancanti o illeggibili (come get_days_diff)
+EPOCH = pd.Timestamp("1970-01-01")
+SESSION_POS_DTYPE = np.int32  # Domande di una sessione: posizioni di riga nella banca condivisa
 
-# Distribuzione domande esame (Regole Ministeriali Base)
-RULES_BASE = {
-    "Scafo": 1, "Motori": 1, "Sicurezza": 3, "Manovra": 4,
-    "Colreg": 2, "Meteorologia": 2, "Navigazione": 4, "Normativa": 3
-}
+# Generatore casuale condiviso per il campionamento delle sessioni
+_rng = np.random.default_rng()
 
 # --- 1. CARICAMENTO DATI INTELLIGENTE ---
-@st.cache_data(show_spinner=False)
-def smart_load_data(file_path_parquet, file_path_excel):
+@st.cache_resource(show_spinner=False)
+def load_bank(file_path_parquet, file_path_excel):
     """
-    Carica il database provando prima il Parquet, poi Excel.
-    Pulisce i dati e normalizza le colonne.
+    Banca condivisa dal processo, in sola lettura (banks.QuestionBank).
+    Viene dall'archivio compilato (banks.py), già pulito e tipizzato; se la banca
+    non è compilata prova il Parquet, poi Excel, e pulisce i dati.
     """
-    df = None
-    
-    # Tentativo 1: Parquet (Veloce)
-    if os.path.exists(file_path_parquet):
-        try:
-            df = pd.read_parquet(file_path_parquet)
-        except Exception:
-            pass # Se fallisce, prova Excel
+    # Tentativo 0: Archivio compilato (nessuna pulizia a runtime)
+    df = banks.load_compiled_bank(file_path_parquet, file_path_excel)
+    if df is not None:
+        return banks.QuestionBank(df)
 
-    # Tentativo 2: Excel (Fallback)
-    if df is None and os.path.exists(file_path_excel):
-        try:
-            df = pd.read_excel(file_path_excel)
-            # Pulizia specifica per Excel (che spesso ha NaN)
-            df = df.fillna("")
-            df = df.astype(str)
-            # Rimuove le stringhe 'nan' se presenti
-            df = df.replace(["nan", "NaN"], "")
-        except Exception as e:
-            st.error(f"Errore lettura Excel {file_path_excel}: {e}")
-            return pd.DataFrame()
+    try:
+        df = banks.read_bank_file(file_path_parquet, file_path_excel)
+    except Exception as e:
+        st.error(f"Errore lettura Excel {file_path_excel}: {e}")
+        df = None
+    return banks.QuestionBank(df) # Vuota se nessun file trovato
 
-    if df is None:
-        return pd.DataFrame() # Restituisce vuoto se nessun file trovato
+@metrics.traced("logic.smart_load_data")
+def smart_load_data(file_path_parquet, file_path_excel):
+    """DataFrame della banca: vista della banca condivisa, nessuna copia per chiamata."""
+    return load_bank(file_path_parquet, file_path_excel).frame
 
-    # --- PULIZIA FINALE COMUNE ---
-    # 1. Normalizza nomi colonne (toglie spazi extra)
-    df.columns = [str(c).strip() for c in df.columns]
-    
-    # 2. Pulisce ID Progressivo (toglie .0 finale se esiste)
-    if 'ID Progressivo' in df.columns:
-        df['ID Progressivo'] = df['ID Progressivo'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-    
-    # 3. Assicura che la colonna Argomento esista
-    if 'Argomento' not in df.columns:
-        df['Argomento'] = 'Generale'
+def load_raccordo_map(file_path_parquet, file_path_excel):
+    """ID domanda -> nome file della figura, dalla tabella di raccordo."""
+    df = smart_load_data(file_path_parquet, file_path_excel)
+    if df.empty: return {}
+    try:
+        col_id = 'ID Progressivo' if 'ID Progressivo' in df.columns else ('Progressivo' if 'Progressivo' in df.columns else None)
+        col_img = 'Immagine' if 'Immagine' in df.columns else None
+        if col_id and col_img:
+            return dict(zip(df[col_id].astype(str).str.replace(r'\.0$', '', regex=True).str.strip(), df[col_img].astype(str).str.strip()))
+    except: pass
+    return {}
+
+@st.cache_resource(show_spinner=False)
+def load_history_registry():
+    """Registro di tutte le domande delle banche (posizioni delle history compatte), uno per processo."""
+    ids = []
+    for bank in banks.SOURCES:
+        if bank == "Raccordo": continue
+        bank_data = load_bank(*banks.source_paths(bank))
+        if 'ID Progressivo' in bank_data.columns: ids.extend(bank_data.ids)
+    return QuestionRegistry(ids)
 
-    return df
+def compact_history(user_history):
+    """History {id: {'score', 'date'}} -> CompactHistory sul registro di processo."""
+    return CompactHistory.from_dict(load_history_registry(), user_history)
 
 
 # --- 2. LOGICA SRS (SPACED REPETITION) ---
@@ -85,151 +99,254 @@ def is_due_for_review(item_data):
     interval = SRS_INTERVALS.get(min(score, 3), 15)
     return days_passed >= interval
 
+def next_score(old_score, is_correct):
+    """
+    Punteggio dopo una risposta (old_score None se mai fatta): giusta +1, da 1 se non era positivo;
+    sbagliata -1. Limitato a SCORE_MAX (int8 della history compatta) prima di salvarlo ovunque.
+    """
+    if not is_correct: return -1
+    return min(old_score + 1, SCORE_MAX) if old_score is not None and old_score > 0 else 1
+
 
 # --- 3. GENERAZIONE QUIZ ---
-def get_balanced_exam_questions(df):
-    """Genera una scheda esame bilanciata secondo le regole ministeriali"""
-    if df is None or df.empty: return pd.DataFrame()
-    
-    exam_questions = []
-    work_df = df.copy()
-    
-    # Se non c'è la colonna Argomento, pesca a caso
-    if 'Argomento' not in df.columns:
-        return df.sample(min(len(df), 30))
-
-    # Pesca per argomento
-    for keyword, count in RULES_BASE.items():
-        # Filtra le domande che contengono la parola chiave nell'Argomento
-        subset = work_df[work_df['Argomento'].astype(str).str.contains(keyword, case=False, na=False)]
-        
-        if len(subset) >= count:
-            exam_questions.append(subset.sample(n=count))
-        else:
-            # Se ce ne sono meno del necessario, prendile tutte
-            if not subset.empty: exam_questions.append(subset)
-    
-    # Unisce tutto e mescola
-    if exam_questions:
-        final_exam = pd.concat(exam_questions)
-        # Se mancano domande per arrivare a 30, riempi con casuali
-        if len(final_exam) < 30:
-            remaining = 30 - len(final_exam)
-            # Esclude quelle già prese
-            already_ids = final_exam['ID Progressivo'].tolist()
-            pool_rest = work_df[~work_df['ID Progressivo'].isin(already_ids)]
-            if not pool_rest.empty:
-                extra = pool_rest.sample(min(len(pool_rest), remaining))
-                final_exam = pd.concat([final_exam, extra])
-        
-        return final_exam.sample(frac=1).reset_index(drop=True)
-    else:
-        return df.sample(min(len(df), 30))
+@st.cache_resource(show_spinner=False)
+def load_exam_index(file_path_parquet, file_path_excel):
+    """Indice esami condiviso dal processo per la banca con queste sorgenti."""
+    return build_exam_index(smart_load_data(file_path_parquet, file_path_excel))
+
+def empty_session():
+    return np.empty(0, dtype=SESSION_POS_DTYPE)
 
-def get_next_session_questions(full_db, user_history, mode="Allenamento", num_questions=20):
+def get_balanced_exam_positions(exam_index, rng=None):
+    """Scheda esame bilanciata come posizioni di riga nella banca."""
+    return sample_exam_positions(exam_index, rng).astype(SESSION_POS_DTYPE)
+
+def get_vela_exam_positions(n, rng=None):
+    """Scheda Vela (5 domande a caso tra n righe) come posizioni di riga."""
+    return sample_vela_positions(n, rng).astype(SESSION_POS_DTYPE)
+
+def history_to_arrays(ids, user_history, with_dates=True):
+    """
+    Converte la history {id: {'score', 'date'}} in array allineati alle righe della banca:
+    (answered bool, score int16, giorno dell'ultima revisione come ordinale dal 1970, -1 se assente).
+    """
+    if isinstance(user_history, CompactHistory):
+        return user_history.arrays(ids, with_dates)
+    n = len(ids)
+    answered = np.zeros(n, dtype=bool)
+    scores = np.zeros(n, dtype=np.int16)
+    last_day = np.full(n, -1, dtype=np.int32)
+    if not user_history or n == 0: return answered, scores, last_day
+
+    # Pulisce le chiavi della history per il confronto (come il vecchio replace('.0',''))
+    keys = pd.Index([str(k) for k in user_history.keys()]).str.replace('.0', '', regex=False).str.strip()
+    bank_ids = pd.Index(ids)
+    first = ~bank_ids.duplicated()
+    pos = bank_ids[first].get_indexer(keys)
+    found = pos >= 0
+    pos = np.flatnonzero(first)[pos[found]]
+
+    items = [v for v, ok in zip(user_history.values(), found) if ok]
+    answered[pos] = True
+    scores[pos] = np.fromiter((v.get('score', 0) for v in items), dtype=np.int16, count=len(items))
+
+    if with_dates:
+        # Gestisce sia "YYYY-MM-DD HH:MM:SS" che "YYYY-MM-DD" (conta solo il giorno)
+        dates = pd.to_datetime(pd.Series([str(v.get('date') or '')[:10] for v in items], dtype=object),
+                               format="%Y-%m-%d", errors="coerce")
+        last_day[pos] = ((dates - EPOCH).dt.days).fillna(-1).to_numpy(dtype=np.int32)
+    return answered, scores, last_day
+
+def srs_masks(answered, scores, last_day, today=None):
+    """Maschere vettoriali (due, new, error) con la stessa regola di is_due_for_review."""
+    if today is None: today = (pd.Timestamp(datetime.date.today()) - EPOCH).days
+    days_passed = np.where(last_day >= 0, today - last_day, NO_DATE_DAYS)
+    interval = SRS_INTERVALS_ARR[np.clip(scores, 0, 3)]
+    error = answered & (scores < 0)
+    due = answered & (scores >= 0) & ((scores <= 0) | (days_passed >= interval))
+    return due, ~answered, error
+
+def get_next_session_questions(full_db, user_history, mode="Allenamento", num_questions=20, rng=None):
     """Seleziona le prossime domande per allenamento o ripasso"""
     if full_db is None or full_db.empty: return pd.DataFrame()
-    
-    all_ids = full_db['ID Progressivo'].astype(str).tolist()
-    
-    # Pulisce le chiavi della history per il confronto
-    clean_history = {str(k).replace('.0','').strip(): v for k, v in user_history.items()}
-    
-    due_ids = []  # Domande scadute (SRS)
-    new_ids = []  # Domande mai viste
-    error_ids = [] # Domande sbagliate (score < 0)
-
-    for q_id in all_ids:
-        if q_id in clean_history:
-            item = clean_history[q_id]
-            if item['score'] < 0:
-                error_ids.append(q_id)
-            elif is_due_for_review(item): 
-                due_ids.append(q_id)
-        else:
-            new_ids.append(q_id)
-            
-    final_pool = []
-    
+    positions = get_next_session_positions(full_db, user_history, mode, num_questions, rng)
+    if positions.size == 0: return pd.DataFrame()
+    return full_db.iloc[positions].reset_index(drop=True)
+
+@metrics.traced("logic.get_next_session_positions")
+def get_next_session_positions(full_db, user_history, mode="Allenamento", num_questions=20, rng=None):
+    """Come get_next_session_questions, ma restituisce solo le posizioni di riga in full_db."""
+    if full_db is None or full_db.empty: return empty_session()
+    rng = rng or _rng
+
+    all_ids = full_db['ID Progressivo'].astype(str).to_numpy()
+    answered, scores, last_day = history_to_arrays(all_ids, user_history)
+    due, new, error = srs_masks(answered, scores, last_day)
+
+    due_pos = np.flatnonzero(due)      # Domande scadute (SRS)
+    new_pos = np.flatnonzero(new)      # Domande mai viste
+    error_pos = np.flatnonzero(error)  # Domande sbagliate (score < 0)
+
     if mode == "Ripasso":
         # Priorità assoluta agli errori, poi alle scadenze SRS
-        pool = list(set(error_ids + due_ids))
-        if not pool: return pd.DataFrame() # Nulla da ripassare
-        final_pool = pool
+        final_pos = np.union1d(error_pos, due_pos)
+        if final_pos.size == 0: return empty_session() # Nulla da ripassare
     else:
         # Modalità Allenamento Misto (Nuove + SRS)
         # 70% Nuove, 30% Ripasso
         n_review = int(num_questions * 0.3)
-        n_new = num_questions - n_review
-        
+
         # Prende un po' di ripasso se c'è
-        if due_ids:
-            final_pool.extend(random.sample(due_ids, min(len(due_ids), n_review)))
-        
+        picked = [rng.choice(due_pos, min(due_pos.size, n_review), replace=False)]
+
         # Riempie il resto con nuove
-        needed = num_questions - len(final_pool)
-        if new_ids:
-            final_pool.extend(random.sample(new_ids, min(len(new_ids), needed)))
-            
-        # Se ancora non basta (es. finite le nuove), ripesca dal ripasso o a caso
-        if len(final_pool) < num_questions:
-            remaining = num_questions - len(final_pool)
-            pool_all = all_ids
-            final_pool.extend(random.sample(pool_all, min(len(pool_all), remaining)))
-
-    # Estrae le righe dal DB corrispondenti agli ID scelti
-    final_df = full_db[full_db['ID Progressivo'].isin(final_pool)]
-    
-    # Mescola e restituisce
-    if len(final_df) > num_questions:
-        return final_df.sample(num_questions).reset_index(drop=True)
-    return final_df.sample(frac=1).reset_index(drop=True)
+        needed = num_questions - picked[0].size
+        picked.append(rng.choice(new_pos, min(new_pos.size, needed), replace=False))
+
+        # Se ancora non basta (es. finite le nuove), ripesca a caso da tutta la banca
+        final_pos = np.unique(np.concatenate(picked))
+        if final_pos.size < num_questions:
+            remaining = num_questions - final_pos.size
+            extra = rng.choice(len(all_ids), min(len(all_ids), remaining), replace=False)
+            final_pos = np.union1d(final_pos, extra)
+
+    # Mescola e restituisce (al massimo num_questions righe)
+    return rng.permutation(final_pos)[:num_questions].astype(SESSION_POS_DTYPE)
 
 
 # --- 4. STATISTICHE ---
-def calculate_topic_stats(full_db, user_history):
-    """Calcola le statistiche aggregate per Argomento"""
+STATS_CACHE_ENTRIES = 512  # Aggregati in cache (utente, materia, versione history)
+
+def _stats_frame(labels, totali, svolte, giuste):
+    """DataFrame delle statistiche (Errate e percentuali ricavate dai conteggi)."""
+    totali, svolte, giuste = (np.asarray(x, dtype=np.int64) for x in (totali, svolte, giuste))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        perc_comp = np.where(totali > 0, svolte / totali * 100, 0)
+        perc_acc = np.where(svolte > 0, giuste / svolte * 100, 0)
+    return pd.DataFrame({
+        **labels,
+        "Totali": totali,
+        "Svolte": svolte,
+        "Giuste": giuste,
+        "Errate": svolte - giuste,
+        "% Completamento": np.round(perc_comp, 1),
+        "% Precisione": np.round(perc_acc, 1),
+    })
+
+def _aggregate_stats(full_db, user_history):
+    """
+    Un solo passaggio sulle righe: la banca viene unita alla history (array allineati) e
+    contata per coppia (Argomento, Voce); i totali per Argomento si ricavano dalle coppie.
+    """
+    answered, scores, _ = history_to_arrays(full_db['ID Progressivo'].astype(str).to_numpy(), user_history, with_dates=False)
+    # Consideriamo "giusta" se lo score è > 0 (cioè almeno 1 volta corretta consecutiva)
+    correct = answered & (scores > 0)
+
+    topic_codes, topics = pd.factorize(full_db['Argomento'], use_na_sentinel=False)
+    if 'Voce' in full_db.columns:
+        voce_codes, voci = pd.factorize(full_db['Voce'], use_na_sentinel=False)
+    else:
+        voce_codes, voci = np.zeros(len(full_db), dtype=np.intp), pd.Index([""])
+
+    pairs, pair_codes = np.unique(topic_codes * len(voci) + voce_codes, return_inverse=True)
+    pair_tot = np.bincount(pair_codes, minlength=len(pairs))
+    pair_done = np.bincount(pair_codes, weights=answered, minlength=len(pairs))
+    pair_ok = np.bincount(pair_codes, weights=correct, minlength=len(pairs))
+
+    pair_topic = pairs // len(voci)
+    topic_df = _stats_frame(
+        {"Argomento": np.asarray(topics, dtype=object)},
+        *(np.bincount(pair_topic, weights=w, minlength=len(topics)) for w in (pair_tot, pair_done, pair_ok)))
+    voce_df = _stats_frame(
+        {"Argomento": np.asarray(topics, dtype=object)[pair_topic], "Voce": np.asarray(voci, dtype=object)[pairs % len(voci)]},
+        pair_tot, pair_done, pair_ok)
+    if 'Voce' not in full_db.columns: voce_df = voce_df.drop(columns="Voce")
+
+    return (topic_df.sort_values(by="% Completamento", ascending=False).reset_index(drop=True),
+            voce_df.sort_values(by=["Argomento", "% Completamento"], ascending=[True, False]).reset_index(drop=True))
+
+@st.cache_data(show_spinner=False, max_entries=STATS_CACHE_ENTRIES)
+def _cached_stats(_full_db, _user_history, cache_key):
+    # Banca e history non vengono hashate: basta la chiave (vedi stats_cache_key)
+    return _aggregate_stats(_full_db, _user_history)
+
+def new_history_token():
+    """Identificativo unico della history di una sessione (due tablet dello stesso allievo ne hanno due diversi)."""
+    return uuid.uuid4().hex
+
+def stats_cache_key(state):
+    """
+    Chiave delle statistiche in cache, condivisa dal processo: utente, materia, token della
+    history della sessione e sua versione. La versione da sola è un contatore per sessione
+    (riparte da 0): senza il token due sessioni dello stesso allievo si scambierebbero i risultati.
+    """
+    return (state.current_user, state.quiz_mode, state.history_token, state.history_version)
+
+def _get_stats(full_db, user_history, cache_key):
+    if cache_key is None: return _aggregate_stats(full_db, user_history)
+    return _cached_stats(full_db, user_history, cache_key)
+
+def calculate_topic_stats(full_db, user_history, cache_key=None):
+    """
+    Calcola le statistiche aggregate per Argomento.
+    Con cache_key (es. utente, materia, versione della history) il risultato resta in cache
+    finché non arriva una nuova risposta.
+    """
     if full_db is None or full_db.empty or 'Argomento' not in full_db.columns:
         return pd.DataFrame()
+    return _get_stats(full_db, user_history, cache_key)[0]
 
-    stats_data = []
-    grouped = full_db.groupby('Argomento')
-    
-    # Pulisce la history una volta per tutte
-    clean_history = {str(k).replace('.0','').strip(): v for k, v in user_history.items()}
+def calculate_subtopic_stats(full_db, user_history, cache_key=None):
+    """Come calculate_topic_stats, con il dettaglio per Voce (stessa aggregazione)."""
+    if full_db is None or full_db.empty or 'Argomento' not in full_db.columns:
+        return pd.DataFrame()
+    return _get_stats(full_db, user_history, cache_key)[1]
 
-    for topic, group in grouped:
-        total = len(group)
-        # Lista ID puliti per questo argomento
-        ids = group['ID Progressivo'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip().tolist()
-        
-        answered = 0
-        correct = 0
-        
-        for qid in ids:
-            if qid in clean_history:
-                answered += 1
-                # Consideriamo "giusta" se lo score è > 0 (cioè almeno 1 volta corretta consecutiva)
-                if clean_history[qid].get('score', 0) > 0: 
-                    correct += 1
-        
-        wrong = answered - correct
-        
-        # Percentuali
-        perc_comp = (answered / total * 100) if total > 0 else 0
-        perc_acc = (correct / answered * 100) if answered > 0 else 0
-        
-        stats_data.append({
-            "Argomento": topic,
-            "Totali": total,
-            "Svolte": answered,
-            "Giuste": correct,
-            "Errate": wrong,
-            "% Completamento": round(perc_comp, 1),
-            "% Precisione": round(perc_acc, 1)
-        })
-        
-    return pd.DataFrame(stats_data).sort_values(by="% Completamento", ascending=False)
+
+# --- 5. CONTATORI DI SESSIONE ---
+@st.cache_resource(show_spinner=False)
+def load_topic_map(file_path_parquet, file_path_excel):
+    """ID domanda -> Argomento per la banca con queste sorgenti (condiviso dal processo, da non modificare)."""
+    bank = load_bank(file_path_parquet, file_path_excel)
+    if bank.empty or 'ID Progressivo' not in bank.columns: return {}
+    return dict(zip(bank.ids, bank.topics))
+
+def _apply_score_change(counters, topic_maps, q_id, old_score, new_score):
+    """Aggiorna i contatori per una domanda che passa da old_score (None = mai fatta) a new_score."""
+    was_ok = old_score is not None and old_score > 0
+    was_err = old_score == -1
+    counters["mastered"] += (new_score > 0) - was_ok
+    for bank, topics in topic_maps.items():
+        topic = topics.get(q_id)
+        if topic is None: continue
+        counters["errors"][bank] += (new_score == -1) - was_err
+        t = counters["topics"][bank].setdefault(topic, {"svolte": 0, "giuste": 0, "errori": 0})
+        t["svolte"] += old_score is None
+        t["giuste"] += (new_score > 0) - was_ok
+        t["errori"] += (new_score == -1) - was_err
+
+def build_session_counters(user_history, topic_maps):
+    """
+    Contatori della sessione, calcolati una volta (al login) scorrendo la history:
+    domande dominate (score > 0), errori in sospeso (score == -1) per banca e, per banca e
+    Argomento, domande svolte/giuste/errate. topic_maps: {banca: load_topic_map(...)}.
+    """
+    counters = {"mastered": 0, "errors": {b: 0 for b in topic_maps}, "topics": {b: {} for b in topic_maps}}
+    if isinstance(user_history, CompactHistory): pairs = user_history.iter_scores()
+    else: pairs = ((q_id, item['score']) for q_id, item in user_history.items())
+    for q_id, score in pairs:
+        _apply_score_change(counters, topic_maps, q_id, None, score)
+    return counters
+
+def update_session_counters(counters, topic_maps, q_id, old_score, new_score):
+    """Aggiornamento O(1) dopo una risposta (old_score None se la domanda non era nella history)."""
+    _apply_score_change(counters, topic_maps, q_id, old_score, new_score)
+
+# --- 6. RICERCA TESTUALE ---
+@st.cache_resource(show_spinner=False)
+def load_search_index(file_path_parquet, file_path_excel):
+    """Indice invertito della banca con queste sorgenti (search.SearchIndex), uno per processo."""
+    return SearchIndex(load_bank(file_path_parquet, file_path_excel).frame)
 
 # FILE: logic.py
 import streamlit as st
@@ -246,7 +363,7 @@ def initialize_app_state():
         st.session_state.score_ok = 0
         st.session_state.score_ko = 0
         st.session_state.exam_index = 0
-        st.session_state.exam_questions = []
+        st.session_state.exam_questions = empty_session()  # Posizioni nella banca; exam_index è il cursore
         st.session_state.current_row = None
         st.session_state.answered = False
         st.session_state.last_answer_correct = False 
@@ -256,8 +373,21 @@ def initialize_app_state():
         st.session_state.start_time = 0     
         st.session_state.exam_finished = False
         
-        # Caricamento storico iniziale
-        raw_hist = db_engine.fetch_user_history("Comandante")
-        st.session_state.history = {str(k).replace('.0','').strip(): v for k, v in raw_hist.items()}
+        # Caricamento storico iniziale, in parallelo con la lista utenti chiesta subito dopo dalla sidebar
+        pending_hist = db_engine.prefetch_history("Comandante")
+        db_engine.get_all_users()  # Cache condivisa: la sidebar la trova già pronta
+        try:
+            raw_hist = pending_hist.result(timeout=db_engine.HISTORY_PREFETCH_TIMEOUT)
+        except Exception as e:
+            # Lettura in background bloccata o fallita: si riprova qui, con i timeout per pagina
+            print(f"⚠️ Storico in background non disponibile ({e!r}), lettura diretta")
+            pending_hist.cancel()
+            raw_hist = db_engine.get_user_history("Comandante")
+        st.session_state.history = compact_history({str(k).replace('.0','').strip(): v for k, v in raw_hist.items()})
+        # Token unico della sessione e versione incrementata a ogni modifica della history (chiave delle cache)
+        st.session_state.history_token = new_history_token()
+        st.session_state.history_version = 0
+        # Contatori (dominate, errori, per argomento): ricalcolati alla prima lettura dopo ogni login
+        st.session_state.counters = None
         
         st.session_state.init = True
\ No newline at end of file
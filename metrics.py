@@ -0,0 +1,178 @@
+# FILE: metrics.py
+# VERSION: v1.0 (Hot Path Metrics)
+# DATE: 2026-10-18
+#
+# Misure dei tempi degli hot path (run dello script, fragment, caricamenti, chiamate Supabase):
+# istogrammi cumulativi e finestra mobile degli ultimi campioni, per processo, esposti in
+# formato Prometheus e JSON su un endpoint locale (http://127.0.0.1:9464/metrics).
+# Attive solo con PATENTE_METRICS=1: altrimenti traced() restituisce la funzione originale
+# e span()/record() non fanno nulla.
+
+import os
+import json
+import time
+import bisect
+import threading
+import functools
+from collections import deque
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURAZIONE COSTANTI ---
+ENABLED = os.environ.get("PATENTE_METRICS", "").strip().lower() in ("1", "true", "yes", "on")
+PORT = int(os.environ.get("PATENTE_METRICS_PORT", "9464"))
+HOST = "127.0.0.1"  # Solo locale: le metriche non escono dalla macchina
+PREFIX = "patente"
+# Limiti superiori dei bucket (secondi), come gli istogrammi Prometheus
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WINDOW = 1024  # Campioni recenti per i percentili (finestra mobile)
+PERCENTILES = (50, 95, 99)
+
+
+# --- 1. ISTOGRAMMI ---
+class _Histogram:
+    __slots__ = ("counts", "total", "sum", "recent")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Ultimo = +Inf
+        self.total = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def percentiles(self):
+        ordered = sorted(self.recent)
+        if not ordered: return {f"p{q}": 0.0 for q in PERCENTILES}
+        return {f"p{q}": ordered[min(len(ordered) - 1, len(ordered) * q // 100)] for q in PERCENTILES}
+
+_histograms = {}  # (nome, esito) -> _Histogram
+_lock = threading.Lock()
+
+def record(name, seconds, outcome="ok"):
+    """Registra una durata (secondi) per `name` con il suo esito."""
+    if not ENABLED: return
+    with _lock:
+        hist = _histograms.get((name, outcome))
+        if hist is None: hist = _histograms[(name, outcome)] = _Histogram()
+        hist.observe(seconds)
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+# --- 2. SPAN E DECORATORE ---
+class _Span:
+    """Misura il blocco `with`; l'esito è il nome dell'eccezione che lo interrompe (es. RerunException)."""
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.start, "ok" if exc_type is None else exc_type.__name__)
+        return False
+
+_NULL_SPAN = nullcontext()
+
+def span(name):
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+def traced(name):
+    """Decoratore: misura ogni chiamata. Senza metriche attive restituisce la funzione invariata."""
+    def decorate(fn):
+        if not ENABLED: return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def start_run():
+    """Inizio di un run completo dello script (None se le metriche sono spente)."""
+    return time.perf_counter() if ENABLED else None
+
+def end_run(started, name="app.run"):
+    """Fine di un run iniziato con start_run (i run interrotti da st.rerun non vengono contati)."""
+    if started is not None: record(name, time.perf_counter() - started)
+
+
+# --- 3. ESPORTAZIONE ---
+def snapshot():
+    """Una riga per (nome, esito): chiamate, tempo totale e medio, percentili della finestra (ms)."""
+    with _lock:
+        items = [(key, hist.total, hist.sum, hist.percentiles()) for key, hist in _histograms.items()]
+    rows = []
+    for (name, outcome), total, seconds, pct in sorted(items):
+        rows.append({"nome": name, "esito": outcome, "chiamate": total, "totale_ms": seconds * 1000,
+                     "media_ms": seconds * 1000 / total if total else 0.0,
+                     **{k: v * 1000 for k, v in pct.items()}})
+    return rows
+
+def to_prometheus():
+    """Istogrammi in formato testo Prometheus (patente_span_seconds)."""
+    metric = f"{PREFIX}_span_seconds"
+    lines = [f"# HELP {metric} Durata degli hot path dell'app", f"# TYPE {metric} histogram"]
+    with _lock:
+        items = [(key, list(hist.counts), hist.total, hist.sum) for key, hist in _histograms.items()]
+    for (name, outcome), counts, total, seconds in sorted(items):
+        labels = f'name="{name}",outcome="{outcome}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {total}')
+        lines.append(f"{metric}_sum{{{labels}}} {seconds:.6f}")
+        lines.append(f"{metric}_count{{{labels}}} {total}")
+    return "\n".join(lines) + "\n"
+
+
+# --- 4. ENDPOINT LOCALE ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body, ctype = to_prometheus().encode(), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body, ctype = json.dumps(snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Niente log a ogni richiesta dello scraper
+
+_server = {"httpd": None, "tried": False}
+
+def serve(port=PORT):
+    """Avvia (una volta per processo) l'endpoint /metrics e /metrics.json. Restituisce l'URL o None."""
+    if not ENABLED: return None
+    with _lock:
+        if not _server["tried"]:
+            _server["tried"] = True  # Porta occupata (es. un altro processo): non si riprova a ogni rerun
+            try:
+                httpd = ThreadingHTTPServer((HOST, port), _MetricsHandler)
+            except OSError as e:
+                print(f"⚠️ Endpoint metriche non disponibile sulla porta {port}: {e}")
+                return None
+            httpd.daemon_threads = True
+            threading.Thread(target=httpd.serve_forever, name="metrics-endpoint", daemon=True).start()
+            _server["httpd"] = httpd
+        if _server["httpd"] is None: return None
+        host, bound_port = _server["httpd"].server_address[:2]
+    return f"http://{host}:{bound_port}/metrics"
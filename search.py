@@ -0,0 +1,170 @@
+# FILE: search.py
+# VERSION: v1.1 (Source Fallback)
+# DATE: 2026-10-18
+#
+# Ricerca testuale nelle banche (Domanda, Risposte, Argomento, Voce; Scenario e Soluzioni
+# del Carteggio) con un indice invertito costruito una volta per banca.
+# Normalizzazione per l'italiano: minuscole, accenti ("unità" = "unita"), apostrofi
+# ("dell'ancora" -> "ancora"), parole vuote e stemming leggero (singolare/plurale,
+# maschile/femminile: "vela" e "vele" -> "vel"). L'ultima parola vale anche come prefisso
+# (si trova "ancoraggio" scrivendo "ancor"). Risultati ordinati per pertinenza (BM25).
+# Uso: python search.py "ancora di rispetto"
+
+import re
+import sys
+import math
+import bisect
+import unicodedata
+import numpy as np
+
+# --- CONFIGURAZIONE COSTANTI ---
+# Colonne indicizzate e peso di una parola trovata in ciascuna
+FIELD_WEIGHTS = {
+    "Domanda": 3.0, "Scenario": 3.0, "Voce": 2.0, "Argomento": 1.5,
+    "Risposta A": 1.0, "Risposta B": 1.0, "Risposta C": 1.0,
+    "Soluzione 1": 1.0, "Soluzione 2": 1.0, "Soluzione 3": 1.0, "Soluzione 4": 1.0, "Soluzione 5": 1.0,
+}
+BM25_K1 = 1.2           # Saturazione delle ripetizioni di una parola
+BM25_B = 0.75           # Peso della lunghezza della domanda
+PREFIX_MIN = 2          # Lettere minime perché l'ultima parola valga come prefisso
+PREFIX_MAX_TERMS = 64   # Parole dell'indice al massimo per un prefisso
+PREFIX_WEIGHT = 0.7     # Una parola trovata solo per prefisso vale meno di una trovata intera
+SEARCH_LIMIT = 20       # Risultati restituiti di default
+
+# Parole vuote (già normalizzate: senza accenti, forme con apostrofo comprese)
+STOPWORDS = frozenset("""
+    a ad al all alla alle allo agli ai c che chi ci come con cui d da dal dall dalla dalle dallo dagli dai
+    degli dei del dell della delle dello di e ed gli i il in l la le lo ma ne negli nei nel nell nella
+    nelle nello non o per piu quale quali quando quello quella questa questo quest se si sia sono su sua
+    sue sui sul sull sulla sulle sullo suo tra fra un una uno
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+# --- 1. NORMALIZZAZIONE ---
+def normalize(text):
+    """Minuscole e senza accenti ("Unità" -> "unita")."""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+def stem(word):
+    """Stemming leggero: toglie la vocale finale (e l'h di -che/-chi, -ghe/-ghi) dalle parole di 4+ lettere."""
+    if len(word) < 4 or not word.isalpha(): return word
+    if word.endswith(("che", "chi", "ghe", "ghi")): return word[:-2]
+    if word[-1] in "aeio": return word[:-1]
+    return word
+
+def tokenize(text):
+    """Parole normalizzate, senza parole vuote, nell'ordine del testo."""
+    return [w for w in _WORD.findall(normalize(text)) if w not in STOPWORDS]
+
+
+# --- 2. INDICE INVERTITO ---
+class SearchIndex:
+    """
+    Indice di una banca: per ogni radice le posizioni di riga in cui compare e il suo peso
+    BM25 già calcolato (IDF compreso), come array numpy. Una ricerca somma i pesi delle
+    parole cercate sulle sole righe che le contengono tutte.
+    """
+
+    __slots__ = ("n", "vocab", "postings")
+
+    def __init__(self, df):
+        self.n = 0 if df is None else len(df)
+        counts = {}   # radice -> {posizione: frequenza pesata per colonna}
+        lengths = np.zeros(self.n, dtype=np.float64)
+        columns = [] if df is None else [c for c in FIELD_WEIGHTS if c in df.columns]
+        for column in columns:
+            weight = FIELD_WEIGHTS[column]
+            for pos, text in enumerate(df[column].tolist()):
+                if text is None or text != text: continue  # None / NaN
+                for word in tokenize(text):
+                    term = counts.setdefault(stem(word), {})
+                    term[pos] = term.get(pos, 0.0) + weight
+                    lengths[pos] += weight
+
+        avg_length = lengths.mean() if self.n and lengths.any() else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_length)
+        self.postings = {}
+        for term, docs in counts.items():
+            positions = np.fromiter(docs.keys(), dtype=np.int32, count=len(docs))
+            tf = np.fromiter(docs.values(), dtype=np.float64, count=len(docs))
+            idf = math.log(1 + (self.n - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores = idf * tf * (BM25_K1 + 1) / (tf + norm[positions])
+            self.postings[term] = (positions, scores.astype(np.float32))
+        self.vocab = sorted(self.postings)  # Per i prefissi (ricerca binaria)
+
+    def _prefix_terms(self, prefix):
+        start = bisect.bisect_left(self.vocab, prefix)
+        terms = []
+        for term in self.vocab[start:start + PREFIX_MAX_TERMS]:
+            if not term.startswith(prefix): break
+            terms.append(term)
+        return terms
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """(posizioni, punteggi) delle righe più pertinenti, in ordine di punteggio decrescente."""
+        words = tokenize(query)
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+        if not words or self.n == 0: return empty
+        # Mentre si scrive l'ultima parola è incompleta: vale anche come prefisso
+        typing = not query[-1:].isspace()
+        total = np.zeros(self.n, dtype=np.float32)
+        matched = np.ones(self.n, dtype=bool)
+        for i, word in enumerate(words):
+            group = np.zeros(self.n, dtype=np.float32)
+            exact = stem(word)
+            if exact in self.postings:
+                positions, scores = self.postings[exact]
+                group[positions] = scores
+            if typing and i == len(words) - 1 and len(word) >= PREFIX_MIN:
+                for term in self._prefix_terms(word):
+                    if term == exact: continue
+                    positions, scores = self.postings[term]
+                    group[positions] = np.maximum(group[positions], scores * PREFIX_WEIGHT)
+            matched &= group > 0  # Tutte le parole cercate devono comparire
+            total += group
+        hits = np.flatnonzero(matched)
+        if hits.size == 0: return empty
+        if hits.size > limit: hits = hits[np.argpartition(-total[hits], limit - 1)[:limit]]
+        hits = hits[np.argsort(-total[hits], kind="stable")]
+        return hits.astype(np.int32), total[hits]
+
+    def __len__(self):
+        return len(self.postings)
+
+
+# --- 3. RICERCA SU PIÙ BANCHE ---
+def search_banks(indexes, query, limit=SEARCH_LIMIT):
+    """Ricerca su {nome banca: SearchIndex}: [(banca, posizione, punteggio), ...] dal più pertinente."""
+    results = []
+    for bank, index in indexes.items():
+        positions, scores = index.search(query, limit)
+        results.extend(zip([bank] * len(positions), positions.tolist(), scores.tolist()))
+    results.sort(key=lambda r: -r[2])
+    return results[:limit]
+
+
+if __name__ == "__main__":
+    import time
+    import banks
+    query = " ".join(sys.argv[1:]) or "ancora"
+    frames = {}
+    for bank in ("Base", "Vela", "Carteggio"):
+        # Archivio compilato (banks.py) o, in ripiego, le sorgenti
+        paths = banks.source_paths(bank)
+        df = banks.load_compiled_bank(*paths)
+        if df is None: df = banks.read_bank_file(*paths)
+        if df is not None and not df.empty: frames[bank] = df.reset_index(drop=True)
+    start = time.perf_counter()
+    indexes = {bank: SearchIndex(df) for bank, df in frames.items()}
+    print(f"Indici costruiti in {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({', '.join(f'{b}: {len(i)} radici' for b, i in indexes.items())})")
+    start = time.perf_counter()
+    results = search_banks(indexes, query)
+    print(f"{len(results)} risultati per {query!r} in {(time.perf_counter() - start) * 1000:.2f} ms")
+    for bank, pos, score in results:
+        df = frames[bank]
+        text = df["Domanda"].iloc[pos] if "Domanda" in df.columns else df["Scenario"].iloc[pos]
+        print(f"{score:6.2f}  {bank:<9} {df['ID Progressivo'].iloc[pos]:<12} {str(text)[:80]}")
@@ -0,0 +1,168 @@
+# FILE: session_client.py
+# VERSION: v1.2 (Custom Launcher)
+# DATE: 2026-10-18
+#
+# Client minimale del protocollo websocket di Streamlit, per sessioni "scriptate"
+# contro un server reale (benchmark e test di carico), senza browser:
+#   async with ScriptedSession("http://localhost:8501") as s:
+#       await s.run(); await s.click("ENTRA")
+# Con un server reale i fragment si rieseguono da soli: qui si misura il costo vero di un click.
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import subprocess
+
+# --- CONFIGURAZIONE COSTANTI ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RUN_TIMEOUT = 60  # Secondi massimi per un singolo rerun
+
+# Tipi di widget riconosciuti -> campo di WidgetState usato per il valore
+WIDGET_TYPES = {"button": "trigger_value", "selectbox": "string_value", "radio": "string_value",
+                "text_input": "string_value", "text_area": "string_value"}
+
+
+# --- 1. SERVER LOCALE ---
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(app_path=os.path.join(BASE_DIR, "app.py"), port=None, env=None, command=None):
+    """
+    Avvia `streamlit run` headless su una porta libera. Restituisce (processo, url).
+    `command` sostituisce `streamlit run app_path` (es. [python, "warmup.py"]): le opzioni del server seguono.
+    """
+    port = port or free_port()
+    command = command or [sys.executable, "-m", "streamlit", "run", app_path]
+    cmd = [*command, "--server.headless", "true",
+           "--server.port", str(port), "--server.enableXsrfProtection", "false",
+           "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"]
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(app_path), env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return proc, url
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"Server Streamlit non avviato su {url}")
+
+def process_cpu_seconds(pid):
+    """Tempo CPU (utente + sistema) consumato finora dal processo (Linux, da /proc)."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def process_status(pid):
+    """Thread attivi e memoria residente (byte) del processo (Linux, da /proc)."""
+    status = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            status[key] = value.split()
+    return {"threads": int(status["Threads"][0]), "rss": int(status["VmRSS"][0]) * 1024}
+
+
+# --- 2. SESSIONE SCRIPTATA ---
+class ScriptedSession:
+    """
+    Una sessione browser simulata: invia rerun con lo stato dei widget e raccoglie gli
+    elementi restituiti. I widget dentro un fragment vengono cliccati come farebbe il
+    frontend, cioè chiedendo il rerun del solo fragment.
+    """
+
+    def __init__(self, url):
+        self.url = url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+        self.ws = None
+        self.page_hash = ""
+        self.elements = {}   # delta_path -> (tipo, proto del widget/elemento, fragment_id)
+        self.values = {}     # id widget -> WidgetState (valori impostati dallo script)
+        self.last_run = {"seconds": 0.0, "deltas": 0, "fragment": ""}
+
+    async def __aenter__(self):
+        import websockets
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    # --- Ricerca elementi ---
+    def widgets(self, kind=None):
+        out = []
+        for path in sorted(self.elements):
+            etype, element, fragment_id = self.elements[path]
+            if etype in WIDGET_TYPES and (kind is None or etype == kind):
+                out.append((etype, element, fragment_id))
+        return out
+
+    def find(self, label, kind=None):
+        for etype, element, fragment_id in self.widgets(kind):
+            if label in element.label: return etype, element, fragment_id
+        raise LookupError(f"Widget non trovato: {label!r}")
+
+    def texts(self):
+        """Testo dei markdown visibili (per controlli nello script)."""
+        return [e.body for t, e, _ in (self.elements[p] for p in sorted(self.elements)) if t == "markdown"]
+
+    # --- Interazioni ---
+    async def run(self, trigger_id=None, fragment_id=""):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.page_script_hash = self.page_hash
+        state.fragment_id = fragment_id
+        for widget_id, value in self.values.items():
+            state.widget_states.widgets.add().CopyFrom(value)
+        if trigger_id:
+            state.widget_states.widgets.add(id=trigger_id, trigger_value=True)
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        seen, deltas, run_fragments = set(), 0, []
+        while True:
+            raw = await asyncio.wait_for(self.ws.recv(), RUN_TIMEOUT)
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session":
+                # Un rerun può concatenarne un altro (st.rerun): conta l'ultimo
+                self.page_hash = fwd.new_session.page_script_hash
+                run_fragments = list(fwd.new_session.fragment_ids_this_run)
+                seen = set()
+                if not run_fragments: self.elements.clear()
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                etype = element.WhichOneof("type")
+                path = tuple(fwd.metadata.delta_path)
+                self.elements[path] = (etype, getattr(element, etype), fwd.delta.fragment_id)
+                seen.add(path)
+                deltas += 1
+            elif kind == "script_finished" and fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        # Elementi dei fragment rieseguiti che non sono stati ridisegnati
+        for path in [p for p, (_, _, f) in self.elements.items() if f in run_fragments and p not in seen]:
+            del self.elements[path]
+        self.last_run = {"seconds": time.perf_counter() - start, "deltas": deltas,
+                         "fragment": ",".join(run_fragments)}
+        return self.last_run
+
+    async def click(self, label):
+        _, element, fragment_id = self.find(label, "button")
+        return await self.run(trigger_id=element.id, fragment_id=fragment_id)
+
+    async def set_value(self, label, value, kind=None, rerun=True):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        etype, element, fragment_id = self.find(label, kind)
+        state = WidgetState(id=element.id)
+        setattr(state, WIDGET_TYPES[etype], value)
+        self.values[element.id] = state
+        if rerun: return await self.run(fragment_id=fragment_id)
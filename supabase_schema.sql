@@ -0,0 +1,51 @@
+-- FILE: supabase_schema.sql
+-- Schema Supabase (da eseguire nell'SQL Editor del progetto)
+
+-- --- 1. STORICO RISPOSTE ---
+create table if not exists history (
+    user_id     text not null,
+    question_id text not null,
+    score       integer not null default 0,
+    timestamp   text,
+    updated_at  timestamptz not null default now(),
+    primary key (user_id, question_id)
+);
+
+-- Ora di scrittura assegnata dal server (database.py legge per differenza da qui, non dal
+-- `timestamp` del client, che può essere vecchio: giornale rinviato, orologio indietro)
+alter table history add column if not exists updated_at timestamptz not null default now();
+
+create or replace function history_set_updated_at() returns trigger as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists history_updated_at on history;
+create trigger history_updated_at before update on history
+for each row execute function history_set_updated_at();
+
+create index if not exists history_user_updated_at on history (user_id, updated_at);
+
+-- --- 2. REGISTRO UTENTI (MENU A TENDINA DEL LOGIN) ---
+-- Una riga per allievo: la lista si legge già distinta e ordinata dall'indice della PK,
+-- senza scansionare la history (una riga per utente per domanda).
+create table if not exists users (
+    user_id    text primary key,
+    created_at timestamptz not null default now()
+);
+
+-- Popola il registro con gli allievi già presenti nella history
+insert into users (user_id)
+select distinct user_id from history
+on conflict (user_id) do nothing;
+
+-- --- 3. SEGNALAZIONI DI ERRORI NELLE DOMANDE (database.save_report) ---
+create table if not exists reports (
+    id          bigint generated always as identity primary key,
+    user_id     text not null,
+    question_id text not null,
+    message     text not null,
+    timestamp   text not null
+);
@@ -0,0 +1,50 @@
+# FILE: tests/conftest.py
+# VERSION: v1.2 (Isolated Process State)
+# DATE: 2026-10-18
+#
+# Test del percorso dei dati (giornale, writer, cache history, archivio locale, history compatta)
+# senza rete né Streamlit in esecuzione: Supabase è sostituito da fake_supabase.FakeSupabase.
+# Uso (dalla cartella del progetto): python -m pytest -q
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import fake_supabase
+from journal import AnswerJournal
+
+
+@pytest.fixture(autouse=True)
+def fresh_process_state(monkeypatch):
+    """Ogni test parte come un processo nuovo: cache history e registro utenti vuoti."""
+    monkeypatch.setattr(database, "_history_cache", database._HistoryCache())
+    monkeypatch.setattr(database, "_registered_users", set())
+
+def _row(user, q_id, score, ts="2026-01-01 10:00:00"):
+    return {"user_id": user, "question_id": q_id, "score": score, "timestamp": ts}
+
+@pytest.fixture
+def row():
+    """Fabbrica di righe history: row(user, question_id, score, timestamp)."""
+    return _row
+
+@pytest.fixture
+def fake():
+    return fake_supabase.FakeSupabase()
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "journal.sqlite3")
+
+@pytest.fixture
+def connected(fake, journal_path):
+    """database.py collegato al client finto, con giornale temporaneo e cache history vuota."""
+    database.use_journal(AnswerJournal(journal_path))
+    database.use_connection(fake)
+    database.invalidate_history_cache()
+    yield fake
+    database.use_connection(None)
+    database.invalidate_history_cache()
@@ -0,0 +1,78 @@
+# FILE: tests/test_answer_writer.py
+# VERSION: v1.1 (Journal Errors)
+# DATE: 2026-10-18
+#
+# Writer a lotti di database.py: fusione delle risposte alla stessa domanda,
+# backoff quando Supabase rifiuta gli upsert o il giornale SQLite dà errore.
+
+import sqlite3
+import database
+from journal import AnswerJournal
+
+
+def _server_rows(fake, user):
+    return {r["question_id"]: r["score"] for r in fake.tables.get("history", []) if r["user_id"] == user}
+
+
+# --- 1. FUSIONE PER DOMANDA ---
+def test_duplicate_question_ids_are_coalesced(fake, journal_path, row):
+    writer = database._AnswerWriter(journal=AnswerJournal(journal_path))
+    writer.start(fake)
+    assert writer.flush(timeout=5)  # Writer avviato (e giornale già compattato)
+    # Entro l'intervallo di scrittura: tre risposte alla stessa domanda finiscono nello stesso lotto
+    for score in (1, -1, 1):
+        writer.submit(row("luigi", "2.1-7", score))
+    writer.submit(row("luigi", "2.1-8", 1))
+    assert writer.flush(timeout=5)
+
+    stats = writer.get_stats()
+    assert stats["enqueued"] == 4
+    assert stats["coalesced"] == 2
+    assert stats["rows_written"] == 2
+    assert _server_rows(fake, "luigi") == {"2.1-7": 1, "2.1-8": 1}
+    assert stats["pending"] == 0
+
+
+# --- 2. BACKOFF SUGLI ERRORI ---
+def test_failed_upserts_back_off_and_keep_rows(fake, journal_path, row):
+    fake.failure_rate = 1.0
+    journal = AnswerJournal(journal_path)
+    writer = database._AnswerWriter(journal=journal)
+    writer.start(fake)
+    writer.submit(row("anna", "3.1-1", 1))
+
+    assert not writer.flush(timeout=5)
+    assert writer.retry_delay == database.WRITE_RETRY_BASE
+    assert not writer.flush(timeout=5)
+    assert writer.retry_delay == 2 * database.WRITE_RETRY_BASE  # Raddoppia a ogni errore
+    assert writer.get_stats()["failures"] >= 2
+    assert journal.count() == 1  # La risposta non esce dal giornale finché il server non conferma
+
+    fake.failure_rate = 0.0
+    assert writer.flush(timeout=5)
+    assert writer.retry_delay == 0.0
+    assert journal.count() == 0
+    assert _server_rows(fake, "anna") == {"3.1-1": 1}
+
+def test_journal_errors_back_off_and_keep_writer_alive(fake, journal_path, row):
+    journal = AnswerJournal(journal_path)
+    writer = database._AnswerWriter(journal=journal)
+    writer.start(fake)
+    ack = journal.ack
+
+    def broken(seqs):
+        raise sqlite3.OperationalError("database is locked")
+    journal.ack = broken
+    writer.submit(row("anna", "3.1-2", 1))
+
+    assert not writer.flush(timeout=5)
+    assert writer.thread.is_alive()  # Il writer non muore con l'errore SQLite
+    assert writer.get_stats()["failures"] == 1
+    assert writer.retry_delay == database.WRITE_RETRY_BASE
+    assert journal.count() == 1  # Scritta sul server ma non confermata: resta nel giornale
+
+    journal.ack = ack
+    assert writer.flush(timeout=5)  # Il nuovo upsert della stessa riga è innocuo
+    assert writer.retry_delay == 0.0
+    assert journal.count() == 0
+    assert _server_rows(fake, "anna") == {"3.1-2": 1}
@@ -0,0 +1,47 @@
+# FILE: tests/test_banks.py
+# VERSION: v1.0 (Test Suite)
+# DATE: 2026-10-18
+#
+# Banca condivisa (banks.QuestionBank): i chiamanti lavorano su viste e copie, mai sulla banca.
+
+import pandas as pd
+import pytest
+import banks
+import exams
+import logic
+
+
+def _bank():
+    return banks.QuestionBank(pd.DataFrame({
+        "ID Progressivo": ["1.1-1", "1.1-2", "2.1-1", "2.1-2"],
+        "Argomento": ["TEORIA DELLO SCAFO", "TEORIA DELLO SCAFO", "MOTORI", "MOTORI"],
+        "Voce": ["Carena", "Carena", "Diesel", "Diesel"],
+        "Domanda": ["Cos'è la carena?", "Cos'è l'opera viva?", "Cos'è l'iniettore?", "Cos'è il carter?"],
+    }))
+
+
+def test_copy_on_write_is_on():
+    assert int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+def test_callers_cannot_mutate_shared_bank():
+    bank = _bank()
+    df, history = bank.frame, {}
+    # I chiamanti reali lavorano sulle viste
+    logic.get_next_session_questions(df[df['Argomento'] == "MOTORI"], history, mode="Allenamento")
+    logic._aggregate_stats(df, history)
+    exams.build_exam_index(df)
+
+    # Anche chi prova a scriverci non tocca la banca
+    view = bank.frame
+    view.loc[view.index[0], 'Domanda'] = "modificata"
+    view['Argomento'] = "x"
+    record = bank.record(0)
+    record['Domanda'] = "modificata"
+    with pytest.raises(ValueError):
+        bank.ids[0] = "x"
+    with pytest.raises(ValueError):
+        bank.topics[0] = "x"
+
+    assert bank.verify()
+    assert bank.frame.loc[0, 'Domanda'] == "Cos'è la carena?"
+    assert bank.position("1.1-2") == 1 and bank.position("9.9-9") == -1
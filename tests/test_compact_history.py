@@ -0,0 +1,73 @@
+# FILE: tests/test_compact_history.py
+# VERSION: v1.1 (Score Limit Round Trip)
+# DATE: 2026-10-18
+#
+# History compatta (history.CompactHistory): andata e ritorno dal formato {id: {'score', 'date'}}
+# e, per gli score oltre il limite int8, fino a Supabase e ritorno.
+
+import numpy as np
+import database
+import logic
+from history import QuestionRegistry, CompactHistory, SCORE_MAX
+
+
+def _registry():
+    return QuestionRegistry(["1.1-1", "1.1-2", "1.1-3", "2.1-1"])
+
+
+def test_round_trip_from_dict():
+    source = {
+        "1.1-1": {"score": 2, "date": "2026-01-01 10:00:00"},
+        "1.1-2": {"score": -1, "date": "2026-01-02"},          # Solo giorno
+        "2.1-1": {"score": 1, "date": ""},                     # Senza data
+        "9.9-9": {"score": 3, "date": "2025-12-31 08:00:00"},  # Fuori registro (domanda rimossa)
+    }
+    history = CompactHistory.from_dict(_registry(), source)
+
+    assert len(history) == 4
+    assert "1.1-3" not in history
+    assert dict(history) == {
+        "1.1-1": {"score": 2, "date": "2026-01-01 10:00:00"},
+        "1.1-2": {"score": -1, "date": "2026-01-02 00:00:00"},
+        "2.1-1": {"score": 1, "date": ""},
+        "9.9-9": {"score": 3, "date": "2025-12-31 08:00:00"},
+    }
+    # Ricostruita dal proprio dict resta identica
+    again = CompactHistory.from_dict(_registry(), dict(history))
+    assert np.array_equal(again.scores, history.scores) and np.array_equal(again.seconds, history.seconds)
+    assert again.extra == history.extra
+
+def test_mapping_updates_and_clipping():
+    history = CompactHistory(_registry())
+    history["1.1-3"] = {"score": 1000, "date": "2026-03-01 12:30:00"}
+    assert history["1.1-3"] == {"score": SCORE_MAX, "date": "2026-03-01 12:30:00"}
+
+    item = history["1.1-3"]
+    item["score"] = 0  # Copia: non cambia lo storico
+    assert history["1.1-3"]["score"] == SCORE_MAX
+
+    del history["1.1-3"]
+    assert "1.1-3" not in history and len(history) == 0
+
+def test_arrays_match_bank_order():
+    history = CompactHistory.from_dict(_registry(), {
+        "1.1-2": {"score": -1, "date": "1970-01-03 00:00:00"},
+        "9.9-9": {"score": 2, "date": ""},
+    })
+    answered, scores, last_day = history.arrays(np.array(["9.9-9", "1.1-1", "1.1-2"], dtype=object))
+    assert answered.tolist() == [True, False, True]
+    assert scores.tolist() == [2, 0, -1]
+    assert last_day.tolist() == [-1, -1, 2]  # Giorni dal 1970; -1 se senza data
+
+def test_score_past_limit_round_trips_through_server(connected):
+    history = CompactHistory.from_dict(_registry(), {"1.1-1": {"score": SCORE_MAX - 1, "date": ""}})
+    for _ in range(3):  # Come app.answer: lo score salvato è quello della history locale
+        new_score = logic.next_score(history["1.1-1"]["score"], True)
+        history["1.1-1"] = {"score": new_score, "date": "2026-03-01 12:30:00"}
+        database.upsert_answer("mario", "1.1-1", new_score)
+    assert database.flush_answers(timeout=5)
+
+    assert [r["score"] for r in connected.tables["history"]] == [SCORE_MAX]
+    database.invalidate_history_cache()
+    reloaded = CompactHistory.from_dict(_registry(), database.get_user_history("mario"))
+    assert reloaded["1.1-1"]["score"] == history["1.1-1"]["score"] == SCORE_MAX
@@ -0,0 +1,70 @@
+# FILE: tests/test_exam_sheets.py
+# VERSION: v1.0 (Test Suite)
+# DATE: 2026-10-18
+#
+# Generazione di schede in blocco (exams.generate_sheets): sovrapposizione minima tra schede
+# e stesse schede a parità di seme, comunque si dividano blocchi e processi.
+
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+import exams
+
+# Ogni argomento con 5 volte la sua quota, senza nomi che cadano in due categorie
+SHEETS_PER_CYCLE = 5
+
+
+def _bank():
+    names = [k.upper() for k, count in exams.RULES_BASE.items() for _ in range(count * SHEETS_PER_CYCLE)]
+    names += ["VARIE"] * 60
+    return pd.DataFrame({"ID Progressivo": [f"q{i}" for i in range(len(names))], "Argomento": names})
+
+def _overlap(sheets):
+    return sum(len(a & b) for a, b in itertools.combinations(sheets, 2))
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(exams, "_worker", {})
+    return exams._worker
+
+
+# --- 1. SOVRAPPOSIZIONE MINIMA ---
+def test_spread_sheets_use_each_topic_question_once_per_cycle():
+    index = exams.build_exam_index(_bank())
+    perms = exams.make_spread_permutations(index, seed=3)
+    quotas = sum(exams.RULES_BASE.values())
+    # Senza riempimento (size = somma delle quote) le schede di un ciclo non hanno domande in comune
+    sheets = [exams.spread_exam_positions(index, perms, i, size=quotas) for i in range(SHEETS_PER_CYCLE)]
+    assert all(len(s) == quotas for s in sheets)
+    assert np.unique(np.concatenate(sheets)).size == quotas * SHEETS_PER_CYCLE
+
+def test_spread_overlaps_less_than_random_sampling():
+    index = exams.build_exam_index(_bank())
+    perms = exams.make_spread_permutations(index, seed=3)
+    spread = [set(exams.spread_exam_positions(index, perms, i).tolist()) for i in range(SHEETS_PER_CYCLE)]
+    sampled = [set(exams.sample_exam_positions(index, np.random.default_rng([3, i])).tolist())
+               for i in range(SHEETS_PER_CYCLE)]
+    assert all(len(s) == exams.EXAM_SIZE_BASE for s in spread)
+    assert _overlap(spread) < _overlap(sampled)
+
+
+# --- 2. RIPRODUCIBILITÀ ---
+@pytest.mark.parametrize("bank", ["Base", "Vela"])
+@pytest.mark.parametrize("spread", [False, True])
+def test_chunk_split_does_not_change_sheets(worker, bank, spread):
+    exams._worker_init(bank, 42, spread)
+    _, whole = exams._worker_chunk(0, 12)
+    parts = [exams._worker_chunk(start, stop)[1] for start, stop in ((0, 5), (5, 6), (6, 12))]
+    assert np.array_equal(whole, np.concatenate(parts))
+    exams._worker_init(bank, 43, spread)
+    assert not np.array_equal(whole, exams._worker_chunk(0, 12)[1])  # Altro seme, altre schede
+
+def test_same_seed_same_file_for_any_worker_split(tmp_path, monkeypatch):
+    single = tmp_path / "uno.csv"
+    exams.generate_sheets("Base", 25, str(single), seed=42, workers=1)
+    monkeypatch.setattr(exams, "CHUNK_SHEETS", 4)
+    split = tmp_path / "due.csv"
+    rows = exams.generate_sheets("Base", 25, str(split), seed=42, workers=2)
+    assert rows == 25 * exams.EXAM_SIZE_BASE
+    assert split.read_bytes() == single.read_bytes()
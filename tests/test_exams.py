@@ -0,0 +1,51 @@
+# FILE: tests/test_exams.py
+# VERSION: v1.0 (Test Suite)
+# DATE: 2026-10-18
+#
+# Schede d'esame bilanciate dall'indice per argomento (exams.build_exam_index, sample_exam_positions).
+
+import numpy as np
+import pandas as pd
+import exams
+
+# Argomenti come nella banca Base: la parola chiave della regola è dentro il nome
+TOPICS = {
+    "TEORIA DELLO SCAFO": 6, "MOTORI": 6, "SICUREZZA DELLA NAVIGAZIONE": 10, "MANOVRA E CONDOTTA": 12,
+    "COLREG E SEGNALAMENTI": 8, "METEOROLOGIA": 8, "NAVIGAZIONE ESTIMATIVA": 12, "NORMATIVA DIPORTISTICA": 9,
+}
+
+
+def _bank(topics=TOPICS):
+    names = [t for t, count in topics.items() for _ in range(count)]
+    return pd.DataFrame({"ID Progressivo": [f"q{i}" for i in range(len(names))], "Argomento": names})
+
+def _categories(df, positions):
+    topics = df['Argomento'].iloc[positions].str.lower()
+    return {k: int(topics.str.contains(k.lower()).sum()) for k in exams.RULES_BASE}
+
+
+def test_index_matches_substring_scan():
+    df = _bank()
+    index = exams.build_exam_index(df)
+    assert index["n"] == len(df)
+    for keyword in exams.RULES_BASE:
+        scan = np.flatnonzero(df['Argomento'].str.contains(keyword, case=False).to_numpy())
+        assert index["topics"][keyword].tolist() == scan.tolist()
+
+def test_sheet_has_30_unique_questions_and_quotas():
+    df = _bank()
+    index = exams.build_exam_index(df)
+    rng = np.random.default_rng(7)
+    for _ in range(200):
+        positions = exams.sample_exam_positions(index, rng)
+        assert len(positions) == exams.EXAM_SIZE_BASE
+        assert len(set(positions.tolist())) == len(positions)
+        # "Navigazione" compare anche in "Sicurezza della navigazione": la quota è un minimo
+        for keyword, found in _categories(df, positions).items():
+            assert found >= exams.RULES_BASE[keyword], keyword
+
+def test_small_bank_takes_what_it_has():
+    df = _bank({"MOTORI": 3, "MANOVRA": 2, "VARIE": 5})
+    positions = exams.sample_exam_positions(exams.build_exam_index(df), np.random.default_rng(1))
+    assert sorted(positions.tolist()) == list(range(len(df)))  # Meno di 30 righe: tutte, una volta
+    assert exams.sample_exam_positions(exams.build_exam_index(None)).size == 0
@@ -0,0 +1,52 @@
+# FILE: tests/test_history_cache.py
+# VERSION: v1.1 (Shared Row Factory)
+# DATE: 2026-10-18
+#
+# Cache history di database.py: lettura completa, poi per differenza dal watermark updated_at
+# assegnato dal server.
+
+import database
+
+
+def _server_upsert(fake, rows):
+    """Scrittura sul server da un altro client (altro dispositivo, giornale rinviato da un altro processo)."""
+    fake.table("history").upsert(rows, on_conflict="user_id, question_id").execute()
+
+
+def test_delta_fetches_rows_with_old_client_timestamp(connected, row):
+    _server_upsert(connected, [row("mario", "1.1-1", 1, "2026-01-02 10:00:00"), row("mario", "1.1-2", 1, "2026-01-02 10:00:00")])
+    first = database.get_user_history("Mario")
+    assert set(first) == {"1.1-1", "1.1-2"}
+
+    # Risposta scritta dopo la lettura ma con l'orologio del client indietro
+    _server_upsert(connected, [row("mario", "1.1-3", -1, "2020-01-01 00:00:00")])
+    second = database.get_user_history("mario")
+
+    assert second["1.1-3"] == {"score": -1, "date": "2020-01-01 00:00:00"}
+    stats = database.get_history_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["full_rows"] == 2
+    assert stats["delta_rows"] >= 1
+
+def test_local_answer_newer_than_server_wins(connected, row):
+    _server_upsert(connected, [row("mario", "1.1-1", 1, "2026-01-02 10:00:00")])
+    database.get_user_history("mario")
+    database._history_cache.write_through(row("mario", "1.1-1", 2, "2026-01-03 09:00:00"))
+
+    # Il server rimanda la versione più vecchia (es. riletta nel margine del watermark)
+    _server_upsert(connected, [row("mario", "1.1-1", 1, "2026-01-02 10:00:00")])
+    assert database.get_user_history("mario")["1.1-1"] == {"score": 2, "date": "2026-01-03 09:00:00"}
+
+def test_watermark_follows_server_time_only():
+    cache = database._HistoryCache()
+    cache.reset("u")
+    newest = cache.merge("u", [
+        {"question_id": "q1", "score": 1, "timestamp": "2030-01-01 00:00:00", "updated_at": "2026-10-18T10:00:00+00:00"},
+        {"question_id": "q2", "score": 1, "timestamp": "2001-01-01 00:00:00", "updated_at": "2026-10-18T12:00:00.5+02:00"},
+    ], full=True)
+    # Normalizzato in UTC: le 12:00:00.5 a +02:00 sono le 10:00:00.5 UTC, dopo le 10:00:00
+    assert newest == "2026-10-18T10:00:00.500000+00:00"
+    cache.set_watermark("u", newest)
+    cache.set_watermark("u", "2026-10-18T09:00:00.000000+00:00")  # Mai all'indietro
+    assert cache.lookup("u") == newest
+    assert database._delta_since(newest) == "2026-10-18T09:59:00.500000+00:00"
@@ -0,0 +1,16 @@
+# FILE: tests/test_history_pages.py
+# VERSION: v1.0 (Test Suite)
+# DATE: 2026-10-18
+#
+# Lettura della history a pagine per chiave (database.iter_history_pages).
+
+import database
+
+
+def test_keyset_pages_cover_every_row_once(fake, row):
+    rows = [row("mario", f"q{i:04d}", 1) for i in range(25)]
+    fake.table("history").upsert(rows, on_conflict="user_id, question_id").execute()
+    pages = list(database.iter_history_pages(fake, "mario", page_size=10))
+    assert [len(p) for p in pages] == [10, 10, 5]
+    ids = [r["question_id"] for page in pages for r in page]
+    assert ids == sorted(ids) and len(set(ids)) == 25
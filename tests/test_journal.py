@@ -0,0 +1,29 @@
+# FILE: tests/test_journal.py
+# VERSION: v1.0 (Test Suite)
+# DATE: 2026-10-18
+#
+# Giornale locale delle risposte (journal.AnswerJournal): replay dopo una caduta del processo.
+
+import database
+from journal import AnswerJournal
+
+
+def test_journal_replay_after_crash(fake, journal_path, row):
+    # Processo caduto prima dell'invio: le risposte sono solo nel giornale
+    journal = AnswerJournal(journal_path)
+    journal.append(row("mario", "1.1-1", 1))
+    journal.append(row("mario", "1.1-2", -1))
+    journal.append(row("mario", "1.1-1", 2, "2026-01-01 10:05:00"))
+    journal.close()
+
+    # Riavvio: il writer riparte da ciò che è rimasto nel giornale
+    reopened = AnswerJournal(journal_path)
+    assert reopened.unacked_for_user("mario")["1.1-1"]["score"] == 2
+    writer = database._AnswerWriter(journal=reopened)
+    writer.start(fake)
+    assert writer.flush(timeout=5)
+
+    server = {r["question_id"]: r["score"] for r in fake.tables["history"] if r["user_id"] == "mario"}
+    assert server == {"1.1-1": 2, "1.1-2": -1}
+    assert reopened.count() == 0
+    assert [r["user_id"] for r in fake.tables["users"]] == ["mario"]  # Nuovo allievo nel registro
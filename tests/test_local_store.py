@@ -0,0 +1,79 @@
+# FILE: tests/test_local_store.py
+# VERSION: v1.1 (Shared Row Factory)
+# DATE: 2026-10-18
+#
+# Archivio locale SQLite (local_store.LocalStore): andata e ritorno su disco, import dal
+# giornale, scarti dopo errori ripetuti, chiusura con la coda ancora piena.
+
+import json
+import pytest
+import local_store
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "store.sqlite3")
+
+
+def test_round_trip_survives_reopen(store_path, row):
+    store = local_store.LocalStore(store_path)
+    store.upsert_answer(row("mario", "1.1-1", 1))
+    store.upsert_answer(row("mario", "1.1-1", 2, "2026-01-01 10:01:00"))  # Vince l'ultima
+    store.upsert_answer(row("luigi", "2.1-1", -1))
+    assert store.save_report({"user_id": "mario", "question_id": "1.1-1", "message": "refuso",
+                              "timestamp": "2026-01-01 10:02:00"})
+    store.close()
+
+    reopened = local_store.LocalStore(store_path)
+    assert reopened.get_user_history("mario") == {"1.1-1": {"score": 2, "date": "2026-01-01 10:01:00"}}
+    assert reopened.get_all_users() == ["luigi", "mario"]
+    with reopened._reader() as conn:
+        assert conn.execute("SELECT message FROM reports").fetchall() == [("refuso",)]
+    reopened.close()
+
+def test_import_keeps_newer_local_answers(store_path, row):
+    store = local_store.LocalStore(store_path)
+    store.upsert_answer(row("mario", "1.1-2", -1, "2026-01-02 10:00:00"))
+    journal_rows = [row("mario", "1.1-1", 2), row("mario", "1.1-2", 1)]  # 1.1-2 più vecchia
+    assert store.import_answers(journal_rows)
+    assert store.import_answers(journal_rows)  # Ripetere l'import non cambia nulla
+    assert store.get_user_history("mario") == {
+        "1.1-1": {"score": 2, "date": "2026-01-01 10:00:00"},
+        "1.1-2": {"score": -1, "date": "2026-01-02 10:00:00"},
+    }
+    store.close()
+
+def test_failing_batch_goes_to_dead_letter(store_path, monkeypatch, row):
+    monkeypatch.setattr(local_store, "WRITE_RETRY_DELAY", 0.0)
+    store = local_store.LocalStore(store_path)
+    write = store._write
+
+    def broken(*args):
+        raise OSError("disco pieno")
+    store._write = broken
+    store.upsert_answer(row("mario", "1.1-1", 1))
+    assert not store.flush(timeout=5)
+    assert store.thread.is_alive()  # Il writer non si ferma
+    assert store.get_stats()["failures"] == local_store.WRITE_MAX_RETRIES
+    assert [r["question_id"] for r in store.dead_letter] == ["1.1-1"]
+    with open(store_path + local_store.DEAD_LETTER_SUFFIX, encoding="utf-8") as f:
+        assert json.loads(f.readline())["question_id"] == "1.1-1"
+
+    # Le risposte successive non restano bloccate dietro il lotto scartato
+    store._write = write
+    store.upsert_answer(row("mario", "1.1-2", 1))
+    assert store.flush(timeout=5)
+    assert set(store.get_user_history("mario")) == {"1.1-2"}
+    store.close()
+
+def test_close_drains_queue_and_stops_writer(store_path, row):
+    store = local_store.LocalStore(store_path)
+    for i in range(200):
+        store.upsert_answer(row("anna", f"3.1-{i}", 1))
+    store.close()
+    store.close()  # Seconda chiamata (es. da atexit): nessun effetto
+    assert not store.thread.is_alive()
+
+    reopened = local_store.LocalStore(store_path)
+    assert len(reopened.get_user_history("anna")) == 200
+    reopened.close()
@@ -0,0 +1,148 @@
+# FILE: tests/test_scheduler.py
+# VERSION: v1.0 (Test Suite)
+# DATE: 2026-10-18
+#
+# Scheduler SRS vettoriale (logic.srs_masks, logic.get_next_session_positions) confrontato con
+# il ciclo per domanda della v104.0, riportato qui com'era come riferimento.
+
+import random
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+import logic
+from history import QuestionRegistry, CompactHistory
+
+SEED = 20261018
+N_QUESTIONS = 400
+
+
+# --- 1. RIFERIMENTO (logic.py v104.0) ---
+def _legacy_pools(full_db, user_history):
+    all_ids = full_db['ID Progressivo'].astype(str).tolist()
+    clean_history = {str(k).replace('.0', '').strip(): v for k, v in user_history.items()}
+    due_ids, new_ids, error_ids = [], [], []
+    for q_id in all_ids:
+        if q_id in clean_history:
+            item = clean_history[q_id]
+            if item['score'] < 0:
+                error_ids.append(q_id)
+            elif logic.is_due_for_review(item):
+                due_ids.append(q_id)
+        else:
+            new_ids.append(q_id)
+    return due_ids, new_ids, error_ids
+
+def _legacy_session(full_db, user_history, mode, num_questions, rnd):
+    all_ids = full_db['ID Progressivo'].astype(str).tolist()
+    due_ids, new_ids, error_ids = _legacy_pools(full_db, user_history)
+    final_pool = []
+    if mode == "Ripasso":
+        pool = list(set(error_ids + due_ids))
+        if not pool: return pd.DataFrame()
+        final_pool = pool
+    else:
+        n_review = int(num_questions * 0.3)
+        if due_ids:
+            final_pool.extend(rnd.sample(due_ids, min(len(due_ids), n_review)))
+        needed = num_questions - len(final_pool)
+        if new_ids:
+            final_pool.extend(rnd.sample(new_ids, min(len(new_ids), needed)))
+        if len(final_pool) < num_questions:
+            remaining = num_questions - len(final_pool)
+            final_pool.extend(rnd.sample(all_ids, min(len(all_ids), remaining)))
+    final_df = full_db[full_db['ID Progressivo'].isin(final_pool)]
+    if len(final_df) > num_questions:
+        return final_df.sample(num_questions, random_state=rnd.randrange(2**32)).reset_index(drop=True)
+    return final_df.sample(frac=1, random_state=rnd.randrange(2**32)).reset_index(drop=True)
+
+
+# --- 2. DATI DI PROVA ---
+def _bank():
+    ids = [f"{1 + i // 50}.{1 + (i // 10) % 5}-{i % 10 + 1}" for i in range(N_QUESTIONS)]
+    return pd.DataFrame({"ID Progressivo": ids, "Argomento": ["SCAFO"] * N_QUESTIONS})
+
+def _history(ids, rng, answered_share, dirty=False):
+    """History casuale: punteggi da -3 a 5, date da oggi a 40 giorni fa, alcune senza data."""
+    today = datetime.date.today()
+    history = {}
+    for q_id in rng.choice(ids, int(len(ids) * answered_share), replace=False):
+        date = (today - datetime.timedelta(days=int(rng.integers(0, 40)))).strftime("%Y-%m-%d %H:%M:%S")
+        if rng.random() < 0.05: date = ""
+        history[str(q_id)] = {"score": int(rng.integers(-3, 6)), "date": date}
+    if dirty and len(history) >= 3:
+        # Chiavi come arrivano dai vecchi export (float, spazi) e date illeggibili
+        first = sorted(history)[:3]
+        history[" " + first[0] + " "] = history.pop(first[0])
+        history[first[1]]["date"] = "ieri"
+        history["999.0"] = {"score": 1, "date": ""}
+    return history
+
+def _inputs(share, dirty=False):
+    df = _bank()
+    ids = df['ID Progressivo'].tolist()
+    history = _history(ids, np.random.default_rng(SEED), share, dirty)
+    return df, history
+
+def _as(kind, df, history):
+    if kind == "dict": return history
+    return CompactHistory.from_dict(QuestionRegistry(df['ID Progressivo'].tolist()), history)
+
+
+# --- 3. EQUIVALENZA ---
+@pytest.mark.parametrize("kind", ["dict", "compact"])
+@pytest.mark.parametrize("share", [0.0, 0.3, 0.95, 1.0])
+def test_masks_match_legacy_pools(kind, share):
+    df, history = _inputs(share, dirty=(kind == "dict"))
+    due_ids, new_ids, error_ids = _legacy_pools(df, history)
+
+    ids = df['ID Progressivo'].astype(str).to_numpy()
+    due, new, error = logic.srs_masks(*logic.history_to_arrays(ids, _as(kind, df, history)))
+
+    assert ids[due].tolist() == due_ids
+    assert ids[new].tolist() == new_ids
+    assert ids[error].tolist() == error_ids
+
+@pytest.mark.parametrize("kind", ["dict", "compact"])
+@pytest.mark.parametrize("share", [0.05, 0.3, 1.0])
+def test_ripasso_matches_legacy(kind, share):
+    df, history = _inputs(share)
+    due_ids, _, error_ids = _legacy_pools(df, history)
+    pool = set(due_ids) | set(error_ids)
+
+    legacy = _legacy_session(df, history, "Ripasso", 20, random.Random(SEED))
+    positions = logic.get_next_session_positions(df, _as(kind, df, history), mode="Ripasso",
+                                                 rng=np.random.default_rng(SEED))
+    picked = df['ID Progressivo'].iloc[positions].tolist()
+
+    assert len(picked) == len(legacy) == min(20, len(pool))
+    assert len(set(picked)) == len(picked) and set(picked) <= pool
+    if len(pool) <= 20: assert set(picked) == set(legacy['ID Progressivo'])
+
+@pytest.mark.parametrize("kind", ["dict", "compact"])
+@pytest.mark.parametrize("share", [0.0, 0.3, 0.98, 1.0])
+def test_allenamento_matches_legacy(kind, share):
+    df, history = _inputs(share)
+    due_ids, new_ids, _ = _legacy_pools(df, history)
+    n_due = min(len(due_ids), int(20 * 0.3))
+    n_new = min(len(new_ids), 20 - n_due)
+
+    legacy = _legacy_session(df, history, "Allenamento", 20, random.Random(SEED))
+    positions = logic.get_next_session_positions(df, _as(kind, df, history), mode="Allenamento",
+                                                 rng=np.random.default_rng(SEED))
+    picked = df['ID Progressivo'].iloc[positions].tolist()
+
+    assert len(set(picked)) == len(picked) <= 20
+    for session in (picked, legacy['ID Progressivo'].tolist()):
+        # Stessa composizione: prima il ripasso (30%), poi le nuove, poi il ripescaggio a caso
+        assert len(set(session) & set(new_ids)) >= n_new
+        if n_due + n_new == 20:
+            assert len(session) == 20
+            assert len(set(session) & set(due_ids)) == n_due
+            assert len(set(session) & set(new_ids)) == n_new
+
+def test_same_seed_same_session():
+    df, history = _inputs(0.3)
+    first = logic.get_next_session_positions(df, history, rng=np.random.default_rng(SEED))
+    again = logic.get_next_session_positions(df, _as("compact", df, history), rng=np.random.default_rng(SEED))
+    assert first.tolist() == again.tolist()
@@ -0,0 +1,65 @@
+# FILE: tests/test_search.py
+# VERSION: v1.0 (Test Suite)
+# DATE: 2026-10-18
+#
+# Ricerca testuale (search.py): normalizzazione e stemming, ultima parola come prefisso,
+# ordinamento BM25, su una piccola banca scritta a mano.
+
+import pandas as pd
+import search
+
+
+def _bank():
+    return pd.DataFrame({
+        "ID Progressivo": ["1.1-1", "1.1-2", "1.1-3", "2.1-1"],
+        "Argomento": ["MANOVRA", "MANOVRA", "SICUREZZA", "METEOROLOGIA"],
+        "Domanda": [
+            "Come si dà fondo all'ancora?",
+            "Quale catena serve per l'ancoraggio in rada?",
+            "Dove si tengono le dotazioni di sicurezza? Ancora: le cinture si indossano in coperta.",
+            "Che cosa indica la scala Beaufort?",
+        ],
+        "Risposta A": ["Filando la catena", "Almeno tre volte il fondale", "In un gavone", "La forza del vento"],
+    })
+
+
+# --- 1. NORMALIZZAZIONE ---
+def test_normalize_and_stem():
+    assert search.normalize("Unità VELE") == "unita vele"
+    assert search.tokenize("Dell'ancora e la Vela") == ["ancora", "vela"]  # Parole vuote e apostrofi
+    assert search.stem("vela") == search.stem("vele") == "vel"
+    assert search.stem("barche") == search.stem("barca") == "barc"
+    assert search.stem("nodo") == "nod" and search.stem("via") == "via"  # Sotto le 4 lettere resta
+    assert search.stem("abc1") == "abc1"
+
+
+# --- 2. PREFISSO DELL'ULTIMA PAROLA ---
+def test_last_word_matches_as_prefix_while_typing():
+    index = search.SearchIndex(_bank())
+    positions, _ = index.search("ancor")
+    assert set(positions.tolist()) == {0, 1, 2}  # "ancora" e "ancoraggio"
+    assert index.search("ancorag")[0].tolist() == [1]
+    # Con lo spazio finale la parola è completa: niente prefissi
+    assert index.search("ancorag ")[0].size == 0
+    # Il prefisso vale solo per l'ultima parola
+    assert index.search("ancorag catena")[0].size == 0
+    assert index.search("catena ancorag")[0].tolist() == [1]
+
+
+# --- 3. ORDINAMENTO BM25 ---
+def test_bm25_ranking():
+    index = search.SearchIndex(_bank())
+    positions, scores = index.search("ancora ")
+    # In Domanda (peso 3) in una domanda corta vale più che in una lunga; intera più che per prefisso
+    assert positions.tolist() == [0, 2]
+    assert scores[0] > scores[1] > 0
+    positions, scores = index.search("vento beaufort")
+    assert positions.tolist() == [3]  # Tutte le parole cercate devono comparire
+    assert index.search("ancora ", limit=1)[0].tolist() == [0]
+    assert index.search("della")[0].size == 0  # Solo parole vuote
+
+def test_search_banks_merges_by_score():
+    indexes = {"Base": search.SearchIndex(_bank()), "Vuota": search.SearchIndex(None)}
+    results = search.search_banks(indexes, "catena", limit=5)
+    assert {(bank, pos) for bank, pos, _ in results} == {("Base", 0), ("Base", 1)}
+    assert results[0][2] >= results[1][2]
@@ -0,0 +1,47 @@
+# FILE: tests/test_session_counters.py
+# VERSION: v1.0 (Test Suite)
+# DATE: 2026-10-18
+#
+# Contatori di sessione (logic.update_session_counters): l'aggiornamento dopo ogni risposta
+# deve dare gli stessi numeri del ricalcolo completo (logic.build_session_counters).
+
+import numpy as np
+import pytest
+import logic
+from history import QuestionRegistry, CompactHistory
+
+IDS = [f"1.{t}-{i}" for t in range(1, 4) for i in range(1, 6)] + ["9.9-1"]  # 9.9-1: in nessuna banca
+TOPIC_MAPS = {
+    "Quiz Base": {q_id: f"ARGOMENTO {q_id[2]}" for q_id in IDS[:10]},
+    "Quiz Vela": {q_id: "VELA" for q_id in IDS[5:15]},  # 1.2-x in entrambe le banche
+}
+
+
+@pytest.mark.parametrize("kind", ["dict", "compact"])
+def test_incremental_counters_match_full_recount(kind):
+    history = {"1.1-1": {"score": 2, "date": "2026-01-01 10:00:00"}, "1.3-5": {"score": -1, "date": ""}}
+    if kind == "compact": history = CompactHistory.from_dict(QuestionRegistry(IDS), history)
+    counters = logic.build_session_counters(history, TOPIC_MAPS)
+
+    rng = np.random.default_rng(16)
+    for step in range(400):
+        q_id = IDS[rng.integers(len(IDS))]
+        action = rng.choice(["giusta", "sbagliata", "saltata"])
+        if action == "saltata": continue  # Domanda saltata: history e contatori restano com'erano
+        previous = history.get(q_id)
+        old_score = None if previous is None else previous['score']
+        new_score = logic.next_score(old_score, action == "giusta")
+        history[q_id] = {"score": new_score, "date": "2026-01-02 10:00:00"}
+        logic.update_session_counters(counters, TOPIC_MAPS, q_id, old_score, new_score)
+        assert counters == logic.build_session_counters(history, TOPIC_MAPS), step
+
+    assert counters["mastered"] == sum(1 for item in history.values() if item['score'] > 0)
+    assert counters["errors"]["Quiz Base"] == sum(
+        1 for q_id, item in history.items() if item['score'] == -1 and q_id in TOPIC_MAPS["Quiz Base"])
+
+def test_next_score():
+    assert logic.next_score(None, True) == 1
+    assert logic.next_score(-1, True) == 1
+    assert logic.next_score(0, True) == 1
+    assert logic.next_score(3, True) == 4
+    assert logic.next_score(3, False) == -1
@@ -0,0 +1,44 @@
+# FILE: tests/test_stats.py
+# VERSION: v1.0 (Test Suite)
+# DATE: 2026-10-18
+#
+# Statistiche per argomento (logic.calculate_topic_stats) e loro cache condivisa dal processo.
+
+from types import SimpleNamespace
+import pandas as pd
+import logic
+
+
+def _bank():
+    return pd.DataFrame({
+        "ID Progressivo": ["1.1-1", "1.1-2", "2.1-1", "2.1-2"],
+        "Argomento": ["SCAFO", "SCAFO", "MOTORI", "MOTORI"],
+        "Voce": ["Carena", "Carena", "Diesel", "Diesel"],
+    })
+
+def _session(history):
+    # Stesso allievo, stessa materia, stessa versione: cambia solo la sessione (es. due tablet)
+    return SimpleNamespace(current_user="mario", quiz_mode="Quiz Base", history_version=1,
+                           history_token=logic.new_history_token(), history=history)
+
+
+def test_sessions_with_same_version_do_not_share_stats():
+    bank = _bank()
+    tablet = _session({"1.1-1": {"score": 1, "date": "2026-01-01 10:00:00"}})
+    reloaded = _session({"2.1-1": {"score": -1, "date": "2026-01-01 10:00:00"}})
+    assert logic.stats_cache_key(tablet)[:2] == logic.stats_cache_key(reloaded)[:2]
+
+    first = logic.calculate_topic_stats(bank, tablet.history, cache_key=logic.stats_cache_key(tablet))
+    second = logic.calculate_topic_stats(bank, reloaded.history, cache_key=logic.stats_cache_key(reloaded))
+
+    assert not first.equals(second)
+    assert second.equals(logic.calculate_topic_stats(bank, reloaded.history))  # Come senza cache
+
+def test_same_session_key_is_served_from_cache():
+    bank = _bank()
+    session = _session({"1.1-1": {"score": 1, "date": "2026-01-01 10:00:00"}})
+    key = logic.stats_cache_key(session)
+    first = logic.calculate_topic_stats(bank, session.history, cache_key=key)
+    # Stessa chiave: la history non viene riletta (per questo la versione cambia a ogni risposta)
+    cached = logic.calculate_topic_stats(bank, {}, cache_key=key)
+    assert cached.equals(first)
@@ -1,29 +1,22 @@
 # FILE: ui.py
-# VERSION: v111.0 (Tablet & Visibility Optimization)
-# DATE: 2026-01-11
+# VERSION: v116.0 (Question Search)
+# DATE: 2026-10-18
 
 import streamlit as st
-import base64
-import os
+import assets
+import metrics
 
 # --- GESTIONE SFONDI ---
-def get_base64_of_bin_file(bin_file):
-    try:
-        with open(bin_file, 'rb') as f: data = f.read()
-        return base64.b64encode(data).decode()
-    except FileNotFoundError: return None
-
+@metrics.traced("ui.set_backgrounds")
 def set_backgrounds(main_bg, sidebar_bg):
-    """Imposta lo sfondo per la pagina principale e la sidebar"""
-    if os.path.exists(main_bg):
-        bin_str = get_base64_of_bin_file(main_bg)
-        if bin_str:
-            st.markdown(f"""<style>.stApp {{ background-image: url(data:image/jpg;base64,{bin_str}) !important; background-size: cover !important; background-attachment: fixed !important; }}</style>""", unsafe_allow_html=True)
-    
-    if os.path.exists(sidebar_bg):
-        bin_str_side = get_base64_of_bin_file(sidebar_bg)
-        if bin_str_side:
-            st.markdown(f"""<style>section[data-testid="stSidebar"] {{ background-image: url(data:image/jpg;base64,{bin_str_side}) !important; background-size: cover !important; }} section[data-testid="stSidebar"] > div:first-child {{ background-color: rgba(255, 255, 255, 0.95); }}</style>""", unsafe_allow_html=True)
+    """
+    Imposta lo sfondo per la pagina principale e la sidebar.
+    Il CSS (con URL statici a hash di contenuto) è generato una sola volta per processo:
+    a ogni rerun viaggia solo un piccolo blocco <style>, le immagini restano nella cache del browser.
+    """
+    css = assets.get_background_css(main_bg, sidebar_bg)
+    if css:
+        st.markdown(css, unsafe_allow_html=True)
 
 def load_css():
     """
@@ -128,6 +121,12 @@ def load_css():
         .exam-pass { text-align: center; color: #28a745 !important; padding: 20px; background: #e8f5e9 !important; border-radius: 15px; border: 1px solid #c3e6cb; }
         .exam-fail { text-align: center; color: #dc3545 !important; padding: 20px; background: #fbe9eb !important; border-radius: 15px; border: 1px solid #f5c6cb; }
         .review-end { text-align: center; color: #004085 !important; padding: 20px; background: #cce5ff !important; border-radius: 15px; border: 1px solid #b8daff; }
+
+        .timer-box {
+            font-family: monospace; display: flex; justify-content: center; align-items: center;
+            background: #fffbf0 !important; padding: 8px 15px; border-radius: 8px; border: 2px solid #ff9800;
+            white-space: nowrap; color: #d32f2f !important; font-weight: bold; font-size: 1.2em;
+        }
     </style>
     """, unsafe_allow_html=True)
 
@@ -163,8 +162,42 @@ def draw_result_option(text, is_correct, is_selected, last_answer_was_correct):
     
     st.markdown(f'<div class="res-box {style}">{icon} {text}</div>', unsafe_allow_html=True)
 
+def draw_exam_timer(seconds_left):
+    """Timer dell'esame (testo semplice, ridisegnato dal fragment del timer in app.py)."""
+    if seconds_left <= 0: label = "SCADUTO"
+    else:
+        m, s = divmod(int(seconds_left), 60)
+        label = f"{m:02d}:{s:02d}"
+    st.markdown(f'<div class="timer-box"><span style="margin-right:8px; font-size:0.9em; color:#555;">⏱️</span>{label}</div>', unsafe_allow_html=True)
+
+# --- RICERCA DOMANDE ---
+def search_label(q_id, text, max_chars=60):
+    """Etichetta di un risultato della ricerca: ID e inizio del testo."""
+    text = " ".join(str(text).split())
+    if len(text) > max_chars: text = text[:max_chars - 1].rstrip() + "…"
+    return f"{q_id} • {text}"
+
+def draw_carteggio_result(row):
+    """Esercizio di carteggio trovato con la ricerca: scenario e soluzioni (non c'è un allenamento a quiz)."""
+    with st.expander(f"🗺️ {search_label(row.get('ID Progressivo'), row.get('Scenario', ''), 40)}"):
+        st.markdown(str(row.get('Scenario', '')).replace("\n", "  \n"))
+        for i in range(1, 6):
+            solution = row.get(f'Soluzione {i}')
+            if solution is not None and str(solution).strip(): st.markdown(f"**{i}.** {solution}".replace("\n", "  \n"))
+
+# --- PANNELLO METRICHE (ADMIN) ---
+def draw_metrics_panel(rows, endpoint=None):
+    """Tempi degli hot path del processo (metrics.snapshot), per chi amministra il server."""
+    with st.expander("📈 Metriche hot path"):
+        if endpoint: st.caption(f"Prometheus: {endpoint} • JSON: {endpoint}.json")
+        if not rows:
+            st.info("Nessuna misura ancora.")
+            return
+        st.dataframe([{k: round(v, 2) if isinstance(v, float) else v for k, v in r.items()} for r in rows],
+                     use_container_width=True, hide_index=True)
+
 # --- FUNZIONE STATISTICHE BLINDATA ---
-def draw_stats_dashboard_advanced(df_stats):
+def draw_stats_dashboard_advanced(df_stats, df_voce=None):
     st.markdown("## 📊 Il Tuo Libretto")
     
     if df_stats is None or df_stats.empty:
@@ -201,48 +234,6 @@ def draw_stats_dashboard_advanced(df_stats):
     except Exception:
         st.dataframe(df_stats, use_container_width=True, hide_index=True)
 
-# FILE: ui.py
-import streamlit as st
-import streamlit.components.v1 as components
-import time
-
-def display_exam_timer(end_timestamp):
-    """Visualizza il timer HTML/JS per l'esame."""
-    end_js = int(end_timestamp * 1000)
-    timer_html = f"""
-    <style>
-        body {{ margin: 0; padding: 0; display:flex; justify-content:center; }}
-        .timer-box {{
-            font-family: monospace; 
-            display: flex; 
-            justify-content: center; 
-            align-items: center; 
-            background: #fffbf0; 
-            padding: 8px 15px; 
-            border-radius: 8px; 
-            border: 2px solid #ff9800; 
-            width: 95%;
-            box-sizing: border-box;
-            white-space: nowrap;
-            color: #d32f2f;
-            font-weight: bold;
-            font-size: 1.2em;
-        }}
-    </style>
-    <div class="timer-box">
-        <span style="margin-right:8px; font-size:0.9em; color:#555;">⏱️</span>
-        <span id="cnt">--:--</span>
-    </div>
-    <script>
-    setInterval(function(){{
-        var dist={end_js}-new Date().getTime(); 
-        if(dist<0) document.getElementById("cnt").innerHTML="SCADUTO"; 
-        else {{ 
-            var m=Math.floor((dist%(1000*60*60))/(1000*60)); 
-            var s=Math.floor((dist%(1000*60))/1000); 
-            document.getElementById("cnt").innerHTML=(m<10?"0"+m:m)+":"+(s<10?"0"+s:s); 
-        }} 
-    }}, 1000);
-    </script>
-    """
-    components.html(timer_html, height=70)
\ No newline at end of file
+    if df_voce is not None and not df_voce.empty and 'Voce' in df_voce.columns:
+        with st.expander("🔎 Dettaglio per Voce"):
+            st.dataframe(df_voce, use_container_width=True, hide_index=True)
@@ -0,0 +1,106 @@
+# FILE: warmup.py
+# VERSION: v1.2 (Question Search)
+# DATE: 2026-10-18
+#
+# Avvio "a caldo": prepara nel processo del server tutto ciò che il primo visitatore
+# pagherebbe nel suo primo run (banche, indici, ricerca, sfondi, figure, archivio dati),
+# poi avvia Streamlit nello stesso processo, così le cache sono già piene quando
+# il server accetta connessioni.
+# Uso: python warmup.py [opzioni di streamlit run]   (es. --server.port 8502)
+#      python warmup.py --solo-cache                  (solo preparazione e tempi)
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIGURAZIONE COSTANTI ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(BASE_DIR, "app.py")
+# Stessi argomenti usati da app.py: le chiavi delle cache devono coincidere
+BG_MAIN = os.path.join(BASE_DIR, "background.jpg")
+BG_SIDE = os.path.join(BASE_DIR, "background2.jpg")
+IMAGES_DIR = os.path.join(BASE_DIR, "Immagini_Quiz")
+QUIZ_BANKS = ("Base", "Vela")
+SEARCH_BANKS = ("Base", "Vela", "Carteggio")  # Banche della ricerca nella sidebar
+FIGURE_WORKERS = min(8, os.cpu_count() or 1)  # Figure ridimensionate in parallelo
+
+
+# --- 1. PASSI DI PREPARAZIONE ---
+def _import_modules():
+    import logic, database, assets, ui  # noqa: F401  (import condivisi con app.py)
+
+def _warm_banks():
+    import banks
+    import logic
+    banks.compile_banks()
+    for bank in QUIZ_BANKS:
+        paths = banks.source_paths(bank)
+        logic.load_bank(*paths)
+        logic.load_topic_map(*paths)
+    logic.load_exam_index(*banks.source_paths("Base"))
+    for bank in SEARCH_BANKS:
+        logic.load_search_index(*banks.source_paths(bank))
+    logic.load_history_registry()
+
+def _warm_backgrounds():
+    import assets
+    assets.get_background_css(BG_MAIN, BG_SIDE)
+
+def _warm_figures():
+    """Indice delle immagini e figure già ridimensionate (larghezza desktop) nella cache LRU."""
+    import banks
+    import logic
+    import assets
+    index = assets.get_image_index(IMAGES_DIR, lambda: logic.load_raccordo_map(*banks.source_paths("Raccordo")))
+    with ThreadPoolExecutor(FIGURE_WORKERS, thread_name_prefix="warmup-figure") as pool:
+        list(pool.map(assets.get_figure_bytes, sorted(set(index.values()))))
+    return f"{len(index)} domande con figura"
+
+def _warm_storage():
+    """Backend di archiviazione (Supabase o SQLite locale) e lista utenti del login."""
+    import database
+    backend = database.get_backend()
+    database.get_all_users()
+    return backend.name
+
+STEPS = (
+    ("import moduli", _import_modules),
+    ("banche e indici", _warm_banks),
+    ("sfondi", _warm_backgrounds),
+    ("figure", _warm_figures),
+    ("archivio", _warm_storage),
+)
+
+def warm_up(verbose=True):
+    """Esegue tutti i passi; restituisce {passo: secondi}. Un passo fallito non blocca l'avvio."""
+    import metrics
+    timings = {}
+    for name, step in STEPS:
+        start = time.perf_counter()
+        try:
+            note = step()
+        except Exception as e:
+            note = f"errore: {e}"
+        timings[name] = time.perf_counter() - start
+        metrics.record(f"warmup.{name}", timings[name])
+        if verbose: print(f"   {name:<18}{timings[name] * 1000:>8.0f} ms" + (f"  ({note})" if note is not None else ""))
+    if verbose: print(f"🔥 Preparazione completata in {sum(timings.values()):.2f} s")
+    return timings
+
+
+# --- 2. AVVIO DEL SERVER NELLO STESSO PROCESSO ---
+def run_server(streamlit_args):
+    from streamlit.web import cli as stcli
+    sys.argv = ["streamlit", "run", APP_PATH, *streamlit_args]
+    return stcli.main()
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, BASE_DIR)
+    args = sys.argv[1:]
+    only_cache = "--solo-cache" in args
+    print("🔥 Preparazione cache prima dell'avvio del server...")
+    warm_up()
+    if only_cache: sys.exit(0)
+    sys.exit(run_server([a for a in args if a != "--solo-cache"]))